@@ -0,0 +1,119 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the DRF viewsets.
+
+Validators are derived from ``max(<timestamp>)`` and ``count(*)`` of the
+filtered queryset, computed in a single aggregate query, so an unchanged
+collection can be answered with ``304 Not Modified`` before any row is
+fetched or serialised.
+
+Collections only get an ETag. A ``Last-Modified`` of ``max(<timestamp>)``
+in whole seconds misses deletes of older rows and a second edit within the
+same second, so ``If-Modified-Since`` alone would answer with a stale 304.
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def _make_etag(*parts):
+    digest = hashlib.sha256(
+        ':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def collection_validators(queryset, field='updated_at', user=None):
+    """
+    Return ``(etag, last_modified)`` for a queryset using one aggregate.
+
+    ``last_modified`` is always None: the row count only fits in the ETag.
+    """
+    stats = queryset.order_by().aggregate(
+        last_modified=Max(field), count=Count('pk'))
+    last_modified = stats['last_modified']
+    etag = _make_etag(
+        queryset.model._meta.label_lower,
+        getattr(user, 'pk', None),
+        stats['count'],
+        last_modified.isoformat() if last_modified else '',
+    )
+    return etag, None
+
+
+def combine_validators(*validators):
+    """
+    ``(etag, last_modified)`` for a response built from several collections:
+    it changes when any of them does.
+    """
+    return _make_etag(*(etag for etag, _ in validators)), None
+
+
+def object_validators(instance, field='updated_at', user=None):
+    """Return ``(etag, last_modified)`` for a single model instance."""
+    last_modified = getattr(instance, field)
+    etag = _make_etag(
+        instance._meta.label_lower,
+        getattr(user, 'pk', None),
+        instance.pk,
+        last_modified.isoformat() if last_modified else '',
+    )
+    return etag, (last_modified.timestamp() if last_modified else None)
+
+
+def conditional_response(request, validators, render):
+    """
+    Answer a conditional GET.
+
+    Returns a 304 when the client's ``If-None-Match``/``If-Modified-Since``
+    still match, otherwise calls ``render()`` and stamps the validators on
+    the response it returns.
+    """
+    etag, last_modified = validators
+    if last_modified is not None:
+        last_modified = int(last_modified)
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        patch_vary_headers(not_modified, ('Authorization',))
+        return not_modified
+
+    response = render()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Add ETag handling to ``list`` and ETag/Last-Modified handling to
+    ``retrieve``.
+
+    Set ``last_modified_field`` to the model's change timestamp.
+    """
+    last_modified_field = 'updated_at'
+
+    def conditional_list(self, request, queryset, render):
+        validators = collection_validators(
+            queryset, field=self.last_modified_field, user=request.user)
+        return conditional_response(request, validators, render)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_list(
+            request, queryset,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        validators = object_validators(
+            instance, field=self.last_modified_field, user=request.user)
+        return conditional_response(
+            request, validators,
+            lambda: Response(self.get_serializer(instance).data))
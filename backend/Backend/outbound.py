@@ -0,0 +1,240 @@
+"""
+Pooled, retrying HTTP client for calls to third-party APIs.
+
+One ``OutboundClient`` per upstream service, created at import time and
+shared by every thread of the process, so connections are kept alive and
+reused instead of paying a TCP + TLS handshake per call. Each call has
+separate connect and read timeouts, idempotent requests are retried a
+bounded number of times with jittered exponential backoff, and a circuit
+breaker fails calls immediately while the upstream keeps failing, so a dead
+API can't tie up every worker.
+
+``AsyncOutboundClient`` does the same for async views on ``httpx``, so a
+request waiting on the upstream doesn't hold a thread. Its connections last
+for one call (retries included): an ``httpx.AsyncClient`` is bound to an
+event loop, and nothing in Django closes one at loop or app shutdown.
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+import httpx
+import requests
+from prometheus_client import Counter, Histogram
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OUTBOUND_LATENCY = Histogram(
+    'greencare_outbound_request_seconds',
+    'Outbound HTTP call duration, retries included', ['service'])
+OUTBOUND_ERRORS = Counter(
+    'greencare_outbound_errors_total',
+    'Failed outbound HTTP calls by kind', ['service', 'kind'])
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures. While open,
+    calls fail fast; after ``reset_timeout`` seconds one trial call is let
+    through, which closes the circuit on success or re-opens it on failure.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class OutboundClient:
+    def __init__(self, service, connect_timeout, read_timeout, max_retries,
+                 backoff_factor, backoff_jitter, pool_size, failure_threshold,
+                 reset_timeout):
+        self.service = service
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            # A read timeout means the upstream is hung; retrying only
+            # multiplies the time the worker is blocked
+            read=False,
+            # Retry-After can ask for minutes; keep to our own short backoff
+            respect_retry_after_header=False,
+            # Hand the last response back instead of raising MaxRetryError
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """
+        ``session.get`` with the client's timeouts; raises for error
+        statuses and ``CircuitOpenError`` while the circuit is open.
+        """
+        if not self.breaker.allow():
+            OUTBOUND_ERRORS.labels(self.service, 'circuit_open').inc()
+            raise CircuitOpenError(f'{self.service} circuit is open')
+
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            OUTBOUND_ERRORS.labels(self.service, self._error_kind(e)).inc()
+            if self._upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            OUTBOUND_LATENCY.labels(self.service).observe(time.perf_counter() - started)
+        self.breaker.record_success()
+        return response
+
+    @staticmethod
+    def _upstream_failure(error):
+        """Whether ``error`` says the upstream is unhealthy (not a bad request)"""
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code
+            return status >= 500 or status == 429
+        return True
+
+    @staticmethod
+    def _error_kind(error):
+        if isinstance(error, requests.Timeout):
+            return 'timeout'
+        if isinstance(error, requests.ConnectionError):
+            return 'connection'
+        if isinstance(error, requests.HTTPError):
+            return f'http_{error.response.status_code}'
+        return 'other'
+
+
+class AsyncOutboundClient:
+    """
+    ``OutboundClient`` for async code: same timeouts, retry policy, circuit
+    breaker and metrics, on an ``httpx.AsyncClient`` opened per call.
+    """
+
+    def __init__(self, service, connect_timeout, read_timeout, max_retries,
+                 backoff_factor, backoff_jitter, pool_size, failure_threshold,
+                 reset_timeout):
+        self.service = service
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def _backoff(self, retry):
+        # urllib3's schedule: the first retry is immediate, then it doubles
+        if retry <= 1:
+            return 0
+        return (self.backoff_factor * 2 ** (retry - 1)
+                + random.uniform(0, self.backoff_jitter))
+
+    async def _send(self, client, url, **kwargs):
+        """GET with bounded retries of connect errors and retryable statuses"""
+        retry = 0
+        while True:
+            try:
+                response = await client.get(url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                # Like OutboundClient, read timeouts are never retried
+                if retry >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or retry >= self.max_retries:
+                    return response
+            retry += 1
+            await asyncio.sleep(self._backoff(retry))
+
+    async def get(self, url, **kwargs):
+        """
+        GET with the client's timeouts; raises for error statuses and
+        ``CircuitOpenError`` while the circuit is open.
+        """
+        if not self.breaker.allow():
+            OUTBOUND_ERRORS.labels(self.service, 'circuit_open').inc()
+            raise CircuitOpenError(f'{self.service} circuit is open')
+
+        started = time.perf_counter()
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout, limits=self.limits) as client:
+                response = await self._send(client, url, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            OUTBOUND_ERRORS.labels(self.service, self._error_kind(e)).inc()
+            if self._upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        finally:
+            OUTBOUND_LATENCY.labels(self.service).observe(time.perf_counter() - started)
+        self.breaker.record_success()
+        return response
+
+    @staticmethod
+    def _upstream_failure(error):
+        if isinstance(error, httpx.HTTPStatusError):
+            status = error.response.status_code
+            return status >= 500 or status == 429
+        return True
+
+    @staticmethod
+    def _error_kind(error):
+        if isinstance(error, httpx.TimeoutException):
+            return 'timeout'
+        if isinstance(error, httpx.NetworkError):
+            return 'connection'
+        if isinstance(error, httpx.HTTPStatusError):
+            return f'http_{error.response.status_code}'
+        return 'other'
@@ -0,0 +1,29 @@
+"""
+Keyset (cursor) pagination for the large, append-mostly feeds.
+
+Every page is a single range scan on the ordering index
+(``WHERE created_at < <cursor> ORDER BY created_at DESC LIMIT n``), so
+deep pages cost the same as the first one, unlike ``OFFSET`` paging.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on ``-created_at`` (``id`` breaks ties).
+
+    Opt-in: clients that send neither ``cursor`` nor ``page_size`` still get
+    the plain list they always did; the response is then
+    ``{"next", "previous", "results"}``.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,31 @@
+"""Parsing of optional query string parameters shared by the API views."""
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+
+def query_datetime(params, name):
+    """
+    Optional ISO 8601 datetime query param (naive values are taken in the
+    current time zone); raises ValueError when malformed
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f'{name} must be an ISO 8601 datetime')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def query_date(params, name):
+    """Optional YYYY-MM-DD query param; raises ValueError when malformed"""
+    value = params.get(name)
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return day
@@ -0,0 +1,69 @@
+"""
+Query plan checks for the hot read paths.
+
+``assert_indexed_queries`` captures the SELECTs run inside it, EXPLAINs each
+one and fails if any plan reads a table without an index: SQLite's bare
+``SCAN <table>`` or PostgreSQL's ``Seq Scan`` (planned with sequential scans
+disabled, so tiny test tables don't hide a missing index). The endpoint
+tests use it so an unindexed filter fails CI instead of showing up as a slow
+page once the table is large.
+
+Walking a whole index in order (``SCAN <table> USING INDEX``) is also
+reported unless the table is passed in ``ordered_scans``, for unfiltered
+list endpoints that read every row anyway.
+"""
+
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?P<table>\w+)(?P<index> USING (?:COVERING )?INDEX \w+)?')
+_POSTGRES_SCAN = re.compile(r'Seq Scan on (?P<table>\w+)')
+
+
+def query_plan(sql, using='default'):
+    """The plan lines for ``sql`` (with parameters already inlined)"""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                cursor.execute(f'EXPLAIN {sql}')
+                return [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.execute('RESET enable_seqscan')
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def table_scans(sql, using='default', ordered_scans=()):
+    """Plan lines of ``sql`` that read a table without an index lookup"""
+    scans = []
+    for line in query_plan(sql, using):
+        sqlite = _SQLITE_SCAN.match(line.strip())
+        if sqlite:
+            if not (sqlite['index'] and sqlite['table'] in ordered_scans):
+                scans.append(line.strip())
+        elif _POSTGRES_SCAN.search(line):
+            scans.append(line.strip())
+    return scans
+
+
+@contextmanager
+def assert_indexed_queries(using='default', ordered_scans=()):
+    """Fail if a SELECT run inside the block scans a table"""
+    connection = connections[using]
+    with CaptureQueriesContext(connection) as context:
+        yield context
+
+    problems = []
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT'):
+            continue
+        scans = table_scans(sql, using, ordered_scans)
+        if scans:
+            problems.append(f"{sql}\n    -> {'; '.join(scans)}")
+    assert not problems, 'Queries without a usable index:\n' + '\n'.join(problems)
@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     'products',
     'predict',
     'plant_watering.apps.PlantWateringConfig',
+    'uploads',
 ]
 
 SWAGGER_SETTINGS = {
@@ -113,6 +114,22 @@ DATABASES = {
     }
 }
 
+# Shared cache (forecasts, ...). Without REDIS_URL each process keeps its own.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -236,6 +253,48 @@ cloudinary.config(
     secure=True
 )
 
+# Concurrent image uploads (bounded thread pool, per-file timeout in seconds)
+IMAGE_UPLOAD_MAX_WORKERS = int(os.getenv('IMAGE_UPLOAD_MAX_WORKERS', 8))
+IMAGE_UPLOAD_TIMEOUT = float(os.getenv('IMAGE_UPLOAD_TIMEOUT', 30))
+
+# Server-side image processing before upload (see uploads/processing.py).
+# IMAGE_OUTPUT_FORMAT is WEBP or AVIF (AVIF falls back to WEBP if Pillow lacks it).
+IMAGE_PROCESSING_MAX_WORKERS = int(os.getenv('IMAGE_PROCESSING_MAX_WORKERS', 8))
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 1600))
+IMAGE_OUTPUT_FORMAT = os.getenv('IMAGE_OUTPUT_FORMAT', 'WEBP')
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', 80))
+IMAGE_VARIANTS = {
+    'thumb': int(os.getenv('IMAGE_THUMB_DIMENSION', 320)),
+    'medium': int(os.getenv('IMAGE_MEDIUM_DIMENSION', 800)),
+}
+
+# Signed direct-to-Cloudinary uploads
+DIRECT_UPLOAD_TTL = int(os.getenv('DIRECT_UPLOAD_TTL', 15 * 60))
+DIRECT_UPLOAD_MAX_BYTES = int(os.getenv('DIRECT_UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+
+# Buffered product view counters (see products/counters.py): seconds between
+# flushes (0 writes every view through) and the trending score's half-life
+VIEW_COUNTER_FLUSH_INTERVAL = float(os.getenv('VIEW_COUNTER_FLUSH_INTERVAL', 5))
+POPULARITY_HALF_LIFE_HOURS = float(os.getenv('POPULARITY_HALF_LIFE_HOURS', 24))
+
+# Outbound weather API client (see Backend/outbound.py); timeouts in seconds
+WEATHER_CONNECT_TIMEOUT = float(os.getenv('WEATHER_CONNECT_TIMEOUT', 3.05))
+WEATHER_READ_TIMEOUT = float(os.getenv('WEATHER_READ_TIMEOUT', 5))
+WEATHER_MAX_RETRIES = int(os.getenv('WEATHER_MAX_RETRIES', 2))
+WEATHER_BACKOFF_FACTOR = float(os.getenv('WEATHER_BACKOFF_FACTOR', 0.3))
+WEATHER_BACKOFF_JITTER = float(os.getenv('WEATHER_BACKOFF_JITTER', 0.3))
+WEATHER_POOL_SIZE = int(os.getenv('WEATHER_POOL_SIZE', 10))
+WEATHER_CIRCUIT_FAILURES = int(os.getenv('WEATHER_CIRCUIT_FAILURES', 5))
+WEATHER_CIRCUIT_RESET = float(os.getenv('WEATHER_CIRCUIT_RESET', 30))
+
+# Weather forecast cache (see plant_watering/forecasts.py), in seconds; kept per
+# FORECAST_GRID_DEGREES grid cell and fetched FORECAST_BATCH_SIZE cells per request
+FORECAST_TTL = int(os.getenv('FORECAST_TTL', 60 * 60))
+FORECAST_STALE_TTL = int(os.getenv('FORECAST_STALE_TTL', 6 * 60 * 60))
+FORECAST_LOCK_TIMEOUT = int(os.getenv('FORECAST_LOCK_TIMEOUT', 15))
+FORECAST_GRID_DEGREES = float(os.getenv('FORECAST_GRID_DEGREES', 0.1))
+FORECAST_BATCH_SIZE = int(os.getenv('FORECAST_BATCH_SIZE', 100))
+
 # Default file storage
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
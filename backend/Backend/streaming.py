@@ -0,0 +1,42 @@
+"""
+Streaming responses that stream under both WSGI and ASGI.
+
+Django's ASGI handler can't iterate a synchronous iterator from the event
+loop, so it reads it to the end with ``sync_to_async(list)`` before sending
+the first byte; an export would sit in memory in full. Under ASGI,
+``streaming_response`` hands Django an async iterator instead. It pulls
+``CHUNKS_PER_HOP`` chunks at a time from the generator on the request's sync
+thread, where its database cursor lives.
+"""
+
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+# Chunks fetched per hop to the sync thread
+CHUNKS_PER_HOP = 16
+
+
+async def _async_chunks(chunks):
+    chunks = iter(chunks)
+    take = sync_to_async(lambda: list(islice(chunks, CHUNKS_PER_HOP)))
+    try:
+        while batch := await take():
+            for chunk in batch:
+                yield chunk
+    finally:
+        # Close the generator (and its cursor) on its own thread, also when
+        # the client went away mid-download
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, chunks, **kwargs):
+    """``StreamingHttpResponse`` of the ``chunks`` iterator for ``request``"""
+    # DRF wraps the Django request
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _async_chunks(chunks)
+    return StreamingHttpResponse(chunks, **kwargs)
@@ -27,6 +27,7 @@ urlpatterns = [
     path('api/products/', include('products.urls')),
     path('api/watering/', include('plant_watering.urls')),
     path('api/predict/', include('predict.urls')),
+    path('api/uploads/', include('uploads.urls')),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -8,6 +8,7 @@ from authentication.models import CustomUser
 from authentication.serializers import *
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework_simplejwt.tokens import RefreshToken
+from uploads.processing import processed_file
 
 
 @swagger_auto_schema(request_body=LoginSerializer, method="post")
@@ -69,7 +70,10 @@ def register_view(request):
             first_name=data["first_name"],
             last_name=data["last_name"],
             email=data['email'],
-            profile_picture=data.get("profile_picture"),
+            profile_picture=(
+                processed_file(data["profile_picture"])
+                if data.get("profile_picture") else None
+            ),
             role=data.get("role", "plant_owner"),
         )
         user.set_password(data["password"])
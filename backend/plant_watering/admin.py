@@ -1,8 +1,40 @@
 from django.contrib import admin
-from .models import PlantWatering
+from django.db import transaction
+from .models import PlantWatering, WateringRollup
+from .services import WateringRollupService
 
 @admin.register(PlantWatering)
 class PlantWateringAdmin(admin.ModelAdmin):
     list_display = ('plant', 'watering_date', 'next_watering_date', 'is_completed')
     list_filter = ('is_completed', 'plant')
     search_fields = ('plant__name', 'notes')
+
+    def save_model(self, request, obj, form, change):
+        # Keep the watering rollups in step with waterings edited here
+        with transaction.atomic():
+            if change:
+                old = PlantWatering.objects.select_for_update().filter(
+                    pk=obj.pk).values_list('plant_id', 'watering_date', 'amount_ml').get()
+            super().save_model(request, obj, form, change)
+            if change:
+                WateringRollupService.change([(old, obj)])
+            else:
+                WateringRollupService.record([obj])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            WateringRollupService.remove([obj])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            waterings = list(queryset)
+            super().delete_queryset(request, queryset)
+            WateringRollupService.remove(waterings)
+
+
+@admin.register(WateringRollup)
+class WateringRollupAdmin(admin.ModelAdmin):
+    list_display = ('plant', 'day', 'watering_count', 'amount_ml')
+    list_filter = ('day',)
+    search_fields = ('plant__name',)
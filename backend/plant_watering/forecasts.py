@@ -0,0 +1,235 @@
+"""
+Shared cache for weather forecasts on a geographic grid.
+
+Locations are snapped to the nearest point of a ``FORECAST_GRID_DEGREES``
+grid (0.1 degrees is about 11 km, finer than the forecast model) and
+forecasts are kept per grid cell in Django's default cache (Redis when
+``REDIS_URL`` is set, so all workers share them). Cells missing from the
+cache are fetched ``FORECAST_BATCH_SIZE`` at a time in multi-location
+requests, so forecasting for N locations costs at most
+``ceil(cells / FORECAST_BATCH_SIZE)`` upstream calls.
+
+An entry is fresh for ``FORECAST_TTL`` seconds. For ``FORECAST_STALE_TTL``
+seconds after that it is still served while a single background refresh
+replaces it. On a miss only one caller per cell goes upstream (a lock key in
+the shared cache); the others wait for its result.
+
+``acached_forecasts`` is the same lookup for async views: cache calls and
+upstream fetches are awaited, so waiting on them doesn't hold a thread.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+FORECAST_LOOKUPS = Counter(
+    'greencare_forecast_cache_lookups_total',
+    'Forecast lookups per grid cell by cache result (hit, stale or miss)', ['result'])
+UPSTREAM_LATENCY = Histogram(
+    'greencare_forecast_upstream_seconds',
+    'Time spent fetching a batch of forecasts from the weather API')
+
+# How often callers waiting on another worker's fetch re-check the cache
+POLL_INTERVAL = 0.05
+
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='forecast-refresh')
+
+
+def grid_cell(latitude, longitude):
+    """``(latitude, longitude)`` of the grid point nearest to a location"""
+    step = settings.FORECAST_GRID_DEGREES
+    # round() again to drop float noise such as 36.800000000000004
+    return (round(round(latitude / step) * step, 6),
+            round(round(longitude / step) * step, 6))
+
+
+def cache_key(cell):
+    return f'forecast:{cell[0]}:{cell[1]}'
+
+
+def _lock_key(cell):
+    return f'{cache_key(cell)}:lock'
+
+
+def _cache_entries(forecasts):
+    """Cache entries for the fetched ``{cell: forecast}``, failures left out"""
+    fetched_at = time.time()
+    return {cache_key(cell): {'data': data, 'fetched_at': fetched_at}
+            for cell, data in forecasts.items() if data is not None}
+
+
+def _batches(cells):
+    size = settings.FORECAST_BATCH_SIZE
+    return [cells[start:start + size] for start in range(0, len(cells), size)]
+
+
+def _classify(cells, entries):
+    """
+    Split ``cells`` by their cached ``entries`` into ``(forecasts, stale,
+    missing)``: the cached forecasts (fresh or stale), the cells to refresh
+    in the background and the cells to fetch now. Counts the lookups.
+    """
+    now = time.time()
+    forecasts, stale, missing = {}, [], []
+    for cell in cells:
+        entry = entries.get(cache_key(cell))
+        if entry is None:
+            missing.append(cell)
+            continue
+        forecasts[cell] = entry['data']
+        if now - entry['fetched_at'] < settings.FORECAST_TTL:
+            FORECAST_LOOKUPS.labels('hit').inc()
+        else:
+            FORECAST_LOOKUPS.labels('stale').inc()
+            stale.append(cell)
+    FORECAST_LOOKUPS.labels('miss').inc(len(missing))
+    return forecasts, stale, missing
+
+
+def _take_cached(pending, entries, forecasts):
+    """Move the ``pending`` cells found in ``entries`` into ``forecasts``; returns the rest"""
+    for cell in pending:
+        entry = entries.get(cache_key(cell))
+        if entry is not None:
+            forecasts[cell] = entry['data']
+    return [cell for cell in pending if cell not in forecasts]
+
+
+def _fetch_and_store(cells, fetch_many):
+    """Fetch ``cells`` in batches and cache what came back"""
+    forecasts = {}
+    for batch in _batches(cells):
+        started = time.perf_counter()
+        try:
+            results = fetch_many(batch)
+        finally:
+            UPSTREAM_LATENCY.observe(time.perf_counter() - started)
+        forecasts.update(zip(batch, results))
+
+    # Failures aren't cached; the next caller retries
+    cache.set_many(_cache_entries(forecasts), settings.FORECAST_TTL + settings.FORECAST_STALE_TTL)
+    return forecasts
+
+
+def _refresh(cells, fetch_many):
+    try:
+        _fetch_and_store(cells, fetch_many)
+    except Exception:
+        logger.exception("Refreshing forecasts for %d cells failed", len(cells))
+    finally:
+        cache.delete_many([_lock_key(cell) for cell in cells])
+
+
+def _fetch_missing(cells, fetch_many):
+    """Single-flight fetch: each cell is fetched by whoever takes its lock"""
+    lock_timeout = settings.FORECAST_LOCK_TIMEOUT
+    deadline = time.monotonic() + lock_timeout
+    forecasts, pending = {}, cells
+    while pending:
+        # Another thread or worker may have stored some in the meantime
+        pending = _take_cached(
+            pending, cache.get_many([cache_key(cell) for cell in pending]), forecasts)
+
+        if time.monotonic() >= deadline:
+            # The fetching worker is stuck or died; go upstream ourselves
+            owned = pending
+        else:
+            owned = [cell for cell in pending if cache.add(_lock_key(cell), 1, lock_timeout)]
+        if owned:
+            try:
+                forecasts.update(_fetch_and_store(owned, fetch_many))
+            finally:
+                cache.delete_many([_lock_key(cell) for cell in owned])
+        pending = [cell for cell in pending if cell not in forecasts and cell not in owned]
+        if pending:
+            time.sleep(POLL_INTERVAL)
+    return forecasts
+
+
+def cached_forecasts(cells, fetch_many):
+    """
+    Forecasts for grid ``cells`` as ``{cell: forecast}``, with None for
+    cells that couldn't be fetched.
+
+    ``fetch_many(cells)`` is only called for cells without a usable cached
+    copy and must return their forecasts (or None) in the same order.
+    """
+    cells = list(dict.fromkeys(cells))
+    forecasts, stale, missing = _classify(
+        cells, cache.get_many([cache_key(cell) for cell in cells]))
+
+    lock_timeout = settings.FORECAST_LOCK_TIMEOUT
+    stale = [cell for cell in stale if cache.add(_lock_key(cell), 1, lock_timeout)]
+    if stale:
+        _refresh_executor.submit(_refresh, stale, fetch_many)
+    if missing:
+        forecasts.update(_fetch_missing(missing, fetch_many))
+    return forecasts
+
+
+async def _afetch_and_store(cells, afetch_many):
+    forecasts = {}
+    batches = _batches(cells)
+    started = time.perf_counter()
+    try:
+        # The batches are independent, so they go upstream concurrently
+        results = await asyncio.gather(*(afetch_many(batch) for batch in batches))
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started)
+    for batch, batch_results in zip(batches, results):
+        forecasts.update(zip(batch, batch_results))
+
+    await cache.aset_many(
+        _cache_entries(forecasts), settings.FORECAST_TTL + settings.FORECAST_STALE_TTL)
+    return forecasts
+
+
+async def _afetch_missing(cells, afetch_many):
+    """``_fetch_missing`` for async callers, polling with ``asyncio.sleep``"""
+    lock_timeout = settings.FORECAST_LOCK_TIMEOUT
+    deadline = time.monotonic() + lock_timeout
+    forecasts, pending = {}, cells
+    while pending:
+        pending = _take_cached(
+            pending, await cache.aget_many([cache_key(cell) for cell in pending]), forecasts)
+
+        if time.monotonic() >= deadline:
+            owned = pending
+        else:
+            owned = [cell for cell in pending
+                     if await cache.aadd(_lock_key(cell), 1, lock_timeout)]
+        if owned:
+            try:
+                forecasts.update(await _afetch_and_store(owned, afetch_many))
+            finally:
+                await cache.adelete_many([_lock_key(cell) for cell in owned])
+        pending = [cell for cell in pending if cell not in forecasts and cell not in owned]
+        if pending:
+            await asyncio.sleep(POLL_INTERVAL)
+    return forecasts
+
+
+async def acached_forecasts(cells, afetch_many, fetch_many):
+    """
+    ``cached_forecasts`` for async callers: misses are fetched with the
+    coroutine ``afetch_many(cells)``. Stale entries are refreshed in the
+    background pool with ``fetch_many``, which outlives the request.
+    """
+    cells = list(dict.fromkeys(cells))
+    forecasts, stale, missing = _classify(
+        cells, await cache.aget_many([cache_key(cell) for cell in cells]))
+
+    lock_timeout = settings.FORECAST_LOCK_TIMEOUT
+    stale = [cell for cell in stale if await cache.aadd(_lock_key(cell), 1, lock_timeout)]
+    if stale:
+        _refresh_executor.submit(_refresh, stale, fetch_many)
+    if missing:
+        forecasts.update(await _afetch_missing(missing, afetch_many))
+    return forecasts
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from plant_watering.services import ROLLUP_REBUILD_CHUNK_SIZE, WateringRollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily watering rollups from the waterings table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plant', type=int, action='append', dest='plants',
+                            help="Only rebuild this plant (id); repeatable")
+        parser.add_argument('--chunk-size', type=int, default=ROLLUP_REBUILD_CHUNK_SIZE,
+                            help='Plants recomputed per transaction')
+
+    def handle(self, *args, **options):
+        written = WateringRollupService.rebuild(
+            plant_ids=options['plants'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows"))
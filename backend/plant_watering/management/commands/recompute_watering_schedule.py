@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from plant_watering.scheduling import WRITE_CHUNK_SIZE, recompute_next_waterings
+
+
+class Command(BaseCommand):
+    help = ("Recompute next_watering_date of open waterings from the latest forecasts "
+            "(run periodically, e.g. hourly from cron)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=WRITE_CHUNK_SIZE,
+                            help='Waterings per UPDATE')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        changed = recompute_next_waterings(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {changed} waterings in {time.perf_counter() - started:.2f}s"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_watering', '0003_remove_plantwatering_latitude_and_more'),
+        ('plants', '0006_plants_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(fields=['-watering_date'], name='watering_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(fields=['plant', '-watering_date'], name='watering_plant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(fields=['next_watering_date', 'is_completed'], name='watering_next_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(fields=['updated_at'], name='watering_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_watering', '0004_hot_path_indexes'),
+        ('plants', '0006_plants_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='plantwatering',
+            name='watering_next_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['next_watering_date', 'id'], name='watering_due_idx'),
+        ),
+    ]
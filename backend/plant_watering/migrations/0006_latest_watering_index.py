@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_watering', '0005_due_partial_index'),
+        ('plants', '0006_plants_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='plantwatering',
+            name='watering_plant_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='plantwatering',
+            index=models.Index(fields=['plant', '-watering_date', '-id'], name='watering_plant_date_idx'),
+        ),
+    ]
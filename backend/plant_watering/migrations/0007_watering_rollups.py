@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    PlantWatering = apps.get_model('plant_watering', 'PlantWatering')
+    WateringRollup = apps.get_model('plant_watering', 'WateringRollup')
+    buckets = PlantWatering.objects.order_by().annotate(
+        day=TruncDate('watering_date')
+    ).values('plant_id', 'day').annotate(
+        watering_count=Count('id'), amount_ml=Sum('amount_ml'))
+    WateringRollup.objects.bulk_create(
+        (WateringRollup(**bucket) for bucket in buckets.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_watering', '0006_latest_watering_index'),
+        ('plants', '0006_plants_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WateringRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('watering_count', models.IntegerField(default=0)),
+                ('amount_ml', models.FloatField(default=0)),
+                ('plant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watering_rollups', to='plants.plants')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='watering_rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('plant', 'day'), name='unique_watering_rollup_day')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,19 @@ class PlantWatering(models.Model):
     class Meta:
         app_label = 'plant_watering'
         ordering = ['-watering_date']
+        indexes = [
+            # Watering list and per-plant history
+            models.Index(fields=['-watering_date'], name='watering_date_idx'),
+            # id breaks ties, so "latest watering" lookups read one entry
+            models.Index(fields=['plant', '-watering_date', '-id'],
+                         name='watering_plant_date_idx'),
+            # The due feed: open waterings only, in keyset order
+            models.Index(fields=['next_watering_date', 'id'],
+                         condition=models.Q(is_completed=False),
+                         name='watering_due_idx'),
+            # Index-only max(updated_at) for the list ETag
+            models.Index(fields=['updated_at'], name='watering_updated_idx'),
+        ]
         
     plant = models.ForeignKey(Plants, on_delete=models.CASCADE, related_name='watering_schedules')
     watering_date = models.DateTimeField()
@@ -23,4 +36,28 @@ class PlantWatering(models.Model):
         return f"{self.plant.name} - {self.watering_date.date()}"
 
 
-    
+class WateringRollup(models.Model):
+    """
+    Daily watering totals per plant, for the charts.
+
+    Maintained incrementally by ``WateringRollupService`` in the same
+    transaction as each watering change; ``rebuild_watering_rollups``
+    recomputes it from ``PlantWatering``.
+    """
+    class Meta:
+        app_label = 'plant_watering'
+        constraints = [
+            models.UniqueConstraint(fields=['plant', 'day'], name='unique_watering_rollup_day'),
+        ]
+        indexes = [
+            # Series across all plants
+            models.Index(fields=['day'], name='watering_rollup_day_idx'),
+        ]
+
+    plant = models.ForeignKey(Plants, on_delete=models.CASCADE, related_name='watering_rollups')
+    day = models.DateField()
+    watering_count = models.IntegerField(default=0)
+    amount_ml = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.plant_id} / {self.day}"
@@ -0,0 +1,24 @@
+"""Keyset pagination of the watering feeds."""
+
+from rest_framework.pagination import CursorPagination
+
+from Backend.pagination import KeysetPagination
+
+
+class DuePagination(CursorPagination):
+    """
+    Keyset pagination of the due feed, soonest first. Every page is one
+    range scan on ``watering_due_idx``.
+    """
+    ordering = ('next_watering_date', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class WateringHistoryPagination(KeysetPagination):
+    """
+    Opt-in keyset pagination of a plant's waterings, newest first, along
+    ``watering_plant_date_idx``
+    """
+    ordering = ('-watering_date', '-id')
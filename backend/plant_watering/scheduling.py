@@ -0,0 +1,136 @@
+"""
+Bulk recomputation of ``PlantWatering.next_watering_date``.
+
+``WeatherService.calculate_next_watering`` only runs when a watering is
+created, so open waterings keep the date computed from the forecast of that
+day. This job recomputes all of them from the cached forecasts.
+
+Forecasts are reduced to ``(cells, FORECAST_DAYS)`` precipitation and
+temperature arrays, and the rules of ``calculate_next_watering`` (the first
+rainy day pushes watering to the day after it; otherwise the last hot or
+cool day sets a 2 or 4 day interval; 3 days by default) are applied to all
+cells at once. Each open watering gets the interval of its grid cell,
+``next_watering_date = watering_date + interval``.
+
+New dates are compared with the stored ones in NumPy and only waterings
+whose date moves are written, ``WRITE_CHUNK_SIZE`` at a time with one UPDATE
+per interval that computes the date in SQL.
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PlantWatering
+
+FORECAST_DAYS = 7
+DEFAULT_INTERVAL = 3
+RAIN_THRESHOLD = 5.0
+HOT_THRESHOLD = 30
+COOL_THRESHOLD = 20
+HOT_INTERVAL = 2
+COOL_INTERVAL = 4
+FETCH_CHUNK_SIZE = 10000
+WRITE_CHUNK_SIZE = 5000
+
+
+def forecast_arrays(forecasts, days=FORECAST_DAYS):
+    """
+    ``(precipitation, temperature)`` float arrays of shape
+    ``(len(forecasts), days)``; days missing from a forecast, and every day
+    of a None forecast, are NaN.
+    """
+    precipitation = np.full((len(forecasts), days), np.nan)
+    temperature = np.full((len(forecasts), days), np.nan)
+    for row, forecast in enumerate(forecasts):
+        if not forecast:
+            continue
+        for target, key in ((precipitation, 'precipitation'), (temperature, 'temperature_max')):
+            values = np.array(forecast.get(key) or [], dtype=float)[:days]
+            target[row, :len(values)] = values
+    return precipitation, temperature
+
+
+def watering_intervals(precipitation, temperature):
+    """
+    Days until the next watering for each row of the forecast arrays,
+    matching ``WeatherService.calculate_next_watering``. NaN days change
+    nothing.
+    """
+    rows = np.arange(len(precipitation))
+    with np.errstate(invalid='ignore'):
+        rainy = precipitation > RAIN_THRESHOLD
+        adjustment = np.where(temperature > HOT_THRESHOLD, HOT_INTERVAL,
+                              np.where(temperature < COOL_THRESHOLD, COOL_INTERVAL, 0))
+
+    first_rain = rainy.argmax(axis=1)
+    any_rain = rainy.any(axis=1)
+    # Only days before the first rainy day are looked at
+    before_rain = np.arange(precipitation.shape[1]) < np.where(
+        any_rain, first_rain, precipitation.shape[1])[:, None]
+    adjusted = (adjustment > 0) & before_rain
+
+    # The last hot or cool day wins
+    last = adjusted.shape[1] - 1 - adjusted[:, ::-1].argmax(axis=1)
+    by_temperature = np.where(
+        adjusted.any(axis=1), adjustment[rows, last], DEFAULT_INTERVAL)
+    return np.where(any_rain, first_rain + 2, by_temperature)
+
+
+def _utc_naive(value):
+    # NumPy only takes naive datetimes
+    return value.astimezone(dt_timezone.utc).replace(tzinfo=None) if value else None
+
+
+def _open_waterings():
+    """
+    ``(ids, watering_dates, next_watering_dates)`` arrays of the open
+    waterings, dates as UTC ``datetime64[us]`` (NaT when unset)
+    """
+    rows = (PlantWatering.objects.filter(is_completed=False).order_by('id')
+            .values_list('id', 'watering_date', 'next_watering_date'))
+    rows = list(rows.iterator(chunk_size=FETCH_CHUNK_SIZE))
+    return (np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([_utc_naive(row[1]) for row in rows], dtype='datetime64[us]'),
+            np.array([_utc_naive(row[2]) for row in rows], dtype='datetime64[us]'))
+
+
+def recompute_next_waterings(chunk_size=WRITE_CHUNK_SIZE):
+    """
+    Recompute ``next_watering_date`` of every open watering from the cached
+    forecasts. Returns the number of rows that changed.
+    """
+    from .services import WeatherService
+
+    # Plants don't store a location, so every watering uses the default
+    # location's cell; ``cell_index`` maps each watering to its row in the
+    # forecast arrays
+    location = (WeatherService.DEFAULT_LATITUDE, WeatherService.DEFAULT_LONGITUDE)
+    forecasts = list(WeatherService.get_forecasts([location]).values())
+    intervals = watering_intervals(*forecast_arrays(forecasts))
+    # Keep the current dates where the forecast couldn't be fetched
+    available = np.array([forecast is not None for forecast in forecasts])
+
+    ids, watering_dates, next_dates = _open_waterings()
+    cell_index = np.zeros(len(ids), dtype=np.intp)
+    record_intervals = intervals[cell_index]
+    computed = watering_dates + record_intervals.astype('timedelta64[D]')
+    changed = available[cell_index] & (computed != next_dates)
+    ids, record_intervals = ids[changed], record_intervals[changed]
+
+    updated_at = timezone.now()
+    for start in range(0, len(ids), chunk_size):
+        chunk_ids = ids[start:start + chunk_size]
+        chunk_intervals = record_intervals[start:start + chunk_size]
+        for interval in np.unique(chunk_intervals):
+            PlantWatering.objects.filter(
+                id__in=chunk_ids[chunk_intervals == interval].tolist(),
+                is_completed=False,
+            ).update(
+                next_watering_date=F('watering_date') + timedelta(days=int(interval)),
+                # updated_at moves so list ETags change with the dates
+                updated_at=updated_at,
+            )
+    return len(ids)
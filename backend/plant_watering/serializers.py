@@ -1,5 +1,16 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
+from Backend.projections import ValuesSerializer
+from plants.models import Plants
 from .models import PlantWatering
+from .scheduling import forecast_arrays, watering_intervals
+from .services import WateringRollupService, WeatherService
+
+BULK_WATERING_MAX_ITEMS = 500
 
 
 class PlantWateringSerializer(serializers.ModelSerializer):
@@ -8,4 +19,86 @@ class PlantWateringSerializer(serializers.ModelSerializer):
     class Meta:
         model = PlantWatering
         fields = ['id', 'plant', 'plant_name', 'watering_date', 'next_watering_date', 'amount_ml', 'notes', 'is_completed', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+
+
+class PlantWateringValuesSerializer(ValuesSerializer):
+    """``PlantWateringSerializer`` output for list endpoints, from ``values()``"""
+    model = PlantWatering
+    fields = ('id', 'plant', 'watering_date', 'next_watering_date', 'amount_ml', 'notes',
+              'is_completed', 'created_at', 'updated_at')
+    annotations = {'plant_name': F('plant__name')}
+
+
+class BulkWateringItemSerializer(serializers.ModelSerializer):
+    # Checked for all items at once in BulkWateringSerializer
+    plant = serializers.IntegerField()
+
+    class Meta:
+        model = PlantWatering
+        fields = ['plant', 'watering_date', 'amount_ml', 'notes', 'is_completed']
+        extra_kwargs = {'watering_date': {'required': False}}
+
+
+def _per_item(errors, count):
+    """Errors keyed by item index as one dict per item (empty when valid)"""
+    return [errors.get(index, {}) for index in range(count)]
+
+
+class BulkWateringSerializer(serializers.Serializer):
+    """
+    Log many waterings at once (a whole bed). Either every item is saved
+    or none is; ``items`` errors are a list with one dict per item.
+    """
+    items = BulkWateringItemSerializer(
+        many=True, allow_empty=False, max_length=BULK_WATERING_MAX_ITEMS)
+
+    def to_internal_value(self, data):
+        try:
+            return super().to_internal_value(data)
+        except serializers.ValidationError as exc:
+            errors = exc.detail
+            # Newer DRF reports the nested item errors keyed by index
+            if isinstance(errors, dict) and isinstance(errors.get('items'), dict) \
+                    and all(isinstance(index, int) for index in errors['items']):
+                errors['items'] = _per_item(errors['items'], len(data['items']))
+            raise serializers.ValidationError(errors) from exc
+
+    def validate_items(self, items):
+        plants = Plants.objects.in_bulk({item['plant'] for item in items})
+        errors = {
+            index: {'plant': [f'Invalid pk "{item["plant"]}" - object does not exist.']}
+            for index, item in enumerate(items) if item['plant'] not in plants
+        }
+        if errors:
+            raise serializers.ValidationError(_per_item(errors, len(items)))
+        for item in items:
+            item['plant'] = plants[item['plant']]
+        return items
+
+    def create(self, validated_data):
+        # One forecast for the whole batch, same rules as a single create
+        forecast = WeatherService.get_weather_forecast()
+        interval = timedelta(days=int(watering_intervals(*forecast_arrays([forecast]))[0]))
+        now = timezone.now()
+
+        waterings = []
+        for item in validated_data['items']:
+            watering_date = item.pop('watering_date', None) or now
+            waterings.append(PlantWatering(
+                watering_date=watering_date,
+                next_watering_date=watering_date + interval,
+                **item))
+
+        with transaction.atomic():
+            waterings = PlantWatering.objects.bulk_create(waterings)
+            WateringRollupService.record(waterings)
+        return waterings
+
+
+class BulkCompleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_WATERING_MAX_ITEMS
+    )
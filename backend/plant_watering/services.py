@@ -1,21 +1,59 @@
 try:
     import requests
+    from Backend.outbound import AsyncOutboundClient, OutboundClient
 except Exception:
     requests = None
 
-from datetime import datetime, timedelta
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.utils import timezone
+from .forecasts import acached_forecasts, cached_forecasts, grid_cell
+from plants.models import Plants
+from .models import PlantWatering, WateringRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 1000
+# Plants whose rollups are recomputed per transaction by ``rebuild``
+ROLLUP_REBUILD_CHUNK_SIZE = 500
+SERIES_BUCKETS = ('day', 'week', 'month')
+SERIES_DEFAULT_BUCKETS = 30
+SERIES_MAX_BUCKETS = 366
+
+def _weather_client(client_class=None):
+    return (client_class or OutboundClient)(
+        'open-meteo',
+        connect_timeout=settings.WEATHER_CONNECT_TIMEOUT,
+        read_timeout=settings.WEATHER_READ_TIMEOUT,
+        max_retries=settings.WEATHER_MAX_RETRIES,
+        backoff_factor=settings.WEATHER_BACKOFF_FACTOR,
+        backoff_jitter=settings.WEATHER_BACKOFF_JITTER,
+        pool_size=settings.WEATHER_POOL_SIZE,
+        failure_threshold=settings.WEATHER_CIRCUIT_FAILURES,
+        reset_timeout=settings.WEATHER_CIRCUIT_RESET,
+    )
+
 
 class WeatherService:
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
     # Default location set to Tunisia, Tunis
     DEFAULT_LATITUDE = 36.8065
     DEFAULT_LONGITUDE = 10.1815
+    # Shared by every thread so connections to the API are reused
+    client = _weather_client() if requests is not None else None
+    # Async views get a client per call, closed when the call is done
+    async_client = _weather_client(AsyncOutboundClient) if requests is not None else None
 
     @staticmethod
     def get_weather_forecast(latitude: float = None, longitude: float = None):
         """
-        Get weather forecast from Open-Meteo API using default location
+        Get weather forecast for a location (default location if omitted),
+        served from the shared forecast cache
         """
         if requests is None:
             # requests library not available (tests/env). Return None so callers fall back to defaults.
@@ -23,10 +61,75 @@ class WeatherService:
 
         lat = latitude if latitude is not None else WeatherService.DEFAULT_LATITUDE
         lon = longitude if longitude is not None else WeatherService.DEFAULT_LONGITUDE
+        return WeatherService.get_forecasts([(lat, lon)])[grid_cell(lat, lon)]
+
+    @staticmethod
+    def get_forecasts(locations):
+        """
+        Forecasts for many ``(latitude, longitude)`` locations as
+        ``{grid cell: forecast or None}``; look a location up with
+        ``forecasts[grid_cell(lat, lon)]``. Uncached cells are fetched in
+        batched multi-location requests.
+        """
+        cells = [grid_cell(lat, lon) for lat, lon in locations]
+        if requests is None:
+            return dict.fromkeys(cells)
+        return cached_forecasts(cells, WeatherService.fetch_forecasts)
+
+    @staticmethod
+    def fetch_forecast(lat: float, lon: float):
+        """
+        Fetch one forecast from the Open-Meteo API, bypassing the cache
+        """
+        return WeatherService.fetch_forecasts([(lat, lon)])[0]
+
+    @staticmethod
+    def fetch_forecasts(locations):
+        """
+        Fetch forecasts for several locations in one Open-Meteo request,
+        bypassing the cache. Returns them in the order of ``locations``
+        (all None if the request fails).
+        """
+        try:
+            response = WeatherService.client.get(
+                WeatherService.BASE_URL, params=WeatherService._params(locations))
+            return WeatherService._parse_forecasts(response.json(), locations)
+
+        except Exception as e:
+            # Any error while fetching/parsing should cause a fallback to defaults
+            print(f"Error fetching weather data: {e}")
+            return [None] * len(locations)
+
+    @staticmethod
+    async def afetch_forecasts(locations):
+        """``fetch_forecasts`` on the async client"""
+        try:
+            response = await WeatherService.async_client.get(
+                WeatherService.BASE_URL, params=WeatherService._params(locations))
+            return WeatherService._parse_forecasts(response.json(), locations)
+
+        except Exception:
+            logger.exception("Fetching forecasts for %d locations failed", len(locations))
+            return [None] * len(locations)
+
+    @staticmethod
+    async def aget_weather_forecast(latitude: float = None, longitude: float = None):
+        """``get_weather_forecast`` for async views"""
+        if requests is None:
+            return None
+
+        lat = latitude if latitude is not None else WeatherService.DEFAULT_LATITUDE
+        lon = longitude if longitude is not None else WeatherService.DEFAULT_LONGITUDE
+        forecasts = await acached_forecasts(
+            [grid_cell(lat, lon)], WeatherService.afetch_forecasts,
+            WeatherService.fetch_forecasts)
+        return forecasts[grid_cell(lat, lon)]
 
-        params = {
-            'latitude': lat,
-            'longitude': lon,
+    @staticmethod
+    def _params(locations):
+        return {
+            'latitude': ','.join(str(lat) for lat, _ in locations),
+            'longitude': ','.join(str(lon) for _, lon in locations),
             'daily': [
                 'precipitation_sum',
                 'temperature_2m_max',
@@ -37,34 +140,38 @@ class WeatherService:
             'forecast_days': 7
         }
 
-        try:
-            response = requests.get(WeatherService.BASE_URL, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            daily = data.get('daily', {})  # safely get the 'daily' part
+    @staticmethod
+    def _parse_forecasts(data, locations):
+        # A list with one entry per location, or a bare object for one
+        results = data if isinstance(data, list) else [data]
+        if len(results) != len(locations):
+            raise ValueError(
+                f"expected {len(locations)} forecasts, got {len(results)}")
 
-            return {
+        forecasts = []
+        for result in results:
+            daily = result.get('daily', {})  # safely get the 'daily' part
+            forecasts.append({
                 'precipitation': daily.get('precipitation_sum', []),
                 'temperature_max': daily.get('temperature_2m_max', []),
                 'windspeed_max': daily.get('windspeed_10m_max', []),
                 'relative_humidity_max': daily.get('relative_humidity_2m_max', []),
                 'dates': daily.get('time', [])
-            }
-
-        except Exception as e:
-            # Any error while fetching/parsing should cause a fallback to defaults
-            print(f"Error fetching weather data: {e}")
-            return None
+            })
+        return forecasts
 
 
 
  #calculate_next_watering
     @staticmethod
-    def calculate_next_watering(current_date=None, latitude: float = None, longitude: float = None):
+    def calculate_next_watering(current_date=None, latitude: float = None, longitude: float = None,
+                                weather_data=None):
         """
         Calculate next watering date based on weather forecast
+        (``weather_data`` if the caller already has it)
         """
-        weather_data = WeatherService.get_weather_forecast(latitude=latitude, longitude=longitude)
+        if weather_data is None:
+            weather_data = WeatherService.get_weather_forecast(latitude=latitude, longitude=longitude)
         if not weather_data:
             # If weather data unavailable, default to 3 days
             return (current_date or datetime.now()) + timedelta(days=3)
@@ -87,3 +194,211 @@ class WeatherService:
                 days_to_add = 4  # Water less frequently
 
         return next_date + timedelta(days=days_to_add)
+
+
+class WateringService:
+
+    @staticmethod
+    def create(serializer, weather_data):
+        """
+        Save a validated ``PlantWateringSerializer`` with its next watering
+        date computed from ``weather_data`` (None falls back to the default
+        interval), and count it in the rollups.
+        """
+        next_watering = WeatherService.calculate_next_watering(
+            serializer.validated_data['watering_date'], weather_data=weather_data or {})
+        with transaction.atomic():
+            watering = serializer.save(next_watering_date=next_watering)
+            WateringRollupService.record([watering])
+        return watering
+
+    @staticmethod
+    def bulk_complete(watering_ids):
+        """
+        Mark many waterings completed with a single UPDATE.
+
+        Returns one outcome per requested id, in request order.
+        """
+        watering_ids = list(dict.fromkeys(watering_ids))
+        with transaction.atomic():
+            completed = dict(
+                PlantWatering.objects.select_for_update().filter(
+                    pk__in=watering_ids).values_list('pk', 'is_completed'))
+            pending = [pk for pk in watering_ids if completed.get(pk) is False]
+            if pending:
+                PlantWatering.objects.filter(
+                    pk__in=pending, is_completed=False
+                ).update(is_completed=True, updated_at=timezone.now())
+
+        outcomes = []
+        for pk in watering_ids:
+            if pk not in completed:
+                outcomes.append({'id': pk, 'ok': False, 'error': 'Not found'})
+            elif completed[pk]:
+                outcomes.append({'id': pk, 'ok': False, 'error': 'Already completed'})
+            else:
+                outcomes.append({'id': pk, 'ok': True})
+        return outcomes
+
+
+class WateringRollupService:
+    """
+    Keep ``WateringRollup`` in step with waterings.
+
+    Call it inside the transaction that changes the waterings. Deltas are
+    summed per (plant, day) bucket and applied as ``SET n = n + delta``
+    updates, so concurrent writers never lose counts.
+    """
+
+    @staticmethod
+    def _bucket(plant_id, watering_date):
+        return plant_id, timezone.localdate(watering_date)
+
+    @staticmethod
+    def _apply(deltas):
+        for (plant_id, day), (count, amount_ml) in deltas.items():
+            if not (count or amount_ml):
+                continue
+            bucket = WateringRollup.objects.filter(plant_id=plant_id, day=day)
+            changes = {
+                'watering_count': F('watering_count') + count,
+                'amount_ml': F('amount_ml') + amount_ml,
+            }
+            if bucket.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    WateringRollup.objects.create(
+                        plant_id=plant_id, day=day, watering_count=count,
+                        amount_ml=amount_ml)
+            except IntegrityError:
+                # Another transaction created the bucket first
+                bucket.update(**changes)
+
+    @staticmethod
+    def _add(deltas, plant_id, watering_date, amount_ml, sign):
+        delta = deltas[WateringRollupService._bucket(plant_id, watering_date)]
+        delta[0] += sign
+        delta[1] += sign * amount_ml
+
+    @staticmethod
+    def record(waterings):
+        """Add newly created waterings to their buckets"""
+        deltas = defaultdict(lambda: [0, 0.0])
+        for watering in waterings:
+            WateringRollupService._add(
+                deltas, watering.plant_id, watering.watering_date, watering.amount_ml, 1)
+        WateringRollupService._apply(deltas)
+
+    @staticmethod
+    def change(changes):
+        """
+        Move edited waterings between buckets: ``[(old, watering), ...]``
+        where ``old`` is ``(plant_id, watering_date, amount_ml)`` before
+        the edit
+        """
+        deltas = defaultdict(lambda: [0, 0.0])
+        for (plant_id, watering_date, amount_ml), watering in changes:
+            WateringRollupService._add(deltas, plant_id, watering_date, amount_ml, -1)
+            WateringRollupService._add(
+                deltas, watering.plant_id, watering.watering_date, watering.amount_ml, 1)
+        WateringRollupService._apply(deltas)
+
+    @staticmethod
+    def remove(waterings):
+        """Take deleted waterings out of their buckets"""
+        deltas = defaultdict(lambda: [0, 0.0])
+        for watering in waterings:
+            WateringRollupService._add(
+                deltas, watering.plant_id, watering.watering_date, watering.amount_ml, -1)
+        WateringRollupService._apply(deltas)
+
+    @staticmethod
+    def rebuild(plant_ids=None, chunk_size=ROLLUP_REBUILD_CHUNK_SIZE):
+        """
+        Recompute the rollups from ``PlantWatering`` for ``plant_ids`` (or
+        every plant), ``chunk_size`` plants per transaction so writers are
+        never blocked for long.
+
+        Returns the number of buckets written.
+        """
+        plants = Plants.objects.order_by('id')
+        if plant_ids is not None:
+            plants = plants.filter(id__in=plant_ids)
+        plant_ids = list(plants.values_list('id', flat=True))
+
+        written = 0
+        for start in range(0, len(plant_ids), chunk_size):
+            chunk = plant_ids[start:start + chunk_size]
+            buckets = PlantWatering.objects.filter(plant_id__in=chunk).order_by().annotate(
+                day=TruncDate('watering_date')
+            ).values('plant_id', 'day').annotate(
+                watering_count=Count('id'),
+                amount_ml=Sum('amount_ml'),
+            )
+            with transaction.atomic():
+                WateringRollup.objects.filter(plant_id__in=chunk).delete()
+                written += len(WateringRollup.objects.bulk_create(
+                    (WateringRollup(**bucket) for bucket in buckets.iterator()),
+                    batch_size=ROLLUP_BATCH_SIZE))
+        return written
+
+
+def bucket_start(day, bucket):
+    """First day of the ``bucket`` (day, week or month) holding ``day``"""
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day, bucket):
+    """First day of the bucket after the one starting on ``day``"""
+    if bucket == 'week':
+        return day + timedelta(weeks=1)
+    if bucket == 'month':
+        return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return day + timedelta(days=1)
+
+
+def series_buckets(start, end, bucket):
+    """Start days of the ``bucket``s from ``start``'s to ``end``'s"""
+    day = bucket_start(start, bucket)
+    days = []
+    while day <= end:
+        days.append(day)
+        day = next_bucket(day, bucket)
+    return days
+
+
+def watering_series(start, end, bucket='day', plant_id=None):
+    """
+    Water given per ``bucket`` between ``start`` and ``end`` (dates), for
+    one plant or all of them, answered from the daily rollups as columnar
+    arrays: ``timestamps`` (bucket start days), ``values`` (ml) and
+    ``counts`` (waterings), zero-filled.
+    """
+    timestamps = series_buckets(start, end, bucket)
+    rollups = WateringRollup.objects.filter(
+        day__gte=timestamps[0], day__lte=end).order_by()
+    if plant_id is not None:
+        rollups = rollups.filter(plant_id=plant_id)
+
+    totals = {
+        row['bucket']: row
+        for row in rollups.annotate(
+            bucket=Trunc('day', bucket, output_field=DateField())
+        ).values('bucket').annotate(
+            total_ml=Sum('amount_ml'), total_count=Sum('watering_count'))
+    }
+    empty = {'total_ml': 0, 'total_count': 0}
+    return {
+        'plant': plant_id,
+        'bucket': bucket,
+        'from': timestamps[0],
+        'to': end,
+        'timestamps': timestamps,
+        'values': [totals.get(day, empty)['total_ml'] for day in timestamps],
+        'counts': [totals.get(day, empty)['total_count'] for day in timestamps],
+    }
@@ -0,0 +1,217 @@
+import asyncio
+import math
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from django.core.cache import cache
+from prometheus_client import REGISTRY
+
+from plant_watering import forecasts
+from plant_watering.forecasts import acached_forecasts, cache_key, cached_forecasts, grid_cell
+from plant_watering.services import WeatherService
+
+FORECAST = {"precipitation": [0.0] * 7, "temperature_max": [25.0] * 7}
+TUNIS = (36.8, 10.2)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _fetch_many(data=FORECAST):
+    return Mock(side_effect=lambda cells: [data] * len(cells))
+
+
+def _lookups(result):
+    return REGISTRY.get_sample_value(
+        "greencare_forecast_cache_lookups_total", {"result": result}) or 0
+
+
+def _run_refresh_inline():
+    return patch.object(forecasts._refresh_executor, "submit",
+                        side_effect=lambda fn, *args: fn(*args))
+
+
+def _store(cell, data, age):
+    cache.set(cache_key(cell), {"data": data, "fetched_at": time.time() - age}, 3600)
+
+
+# ------------------------------------------------------
+# GRID
+# ------------------------------------------------------
+
+def test_grid_cell_snaps_to_nearest_point(settings):
+    settings.FORECAST_GRID_DEGREES = 0.1
+
+    assert grid_cell(36.8065, 10.1815) == (36.8, 10.2)
+    assert grid_cell(36.8449, 10.1499) == (36.8, 10.1)
+    assert grid_cell(-33.8688, 151.2093) == (-33.9, 151.2)
+    assert cache_key((36.8, 10.2)) == "forecast:36.8:10.2"
+
+
+# ------------------------------------------------------
+# HITS AND MISSES
+# ------------------------------------------------------
+
+def test_miss_then_hit_calls_upstream_once():
+    fetch_many = _fetch_many()
+    misses, hits = _lookups("miss"), _lookups("hit")
+
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: FORECAST}
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: FORECAST}
+
+    fetch_many.assert_called_once_with([TUNIS])
+    assert _lookups("miss") == misses + 1
+    assert _lookups("hit") == hits + 1
+
+
+def test_failed_fetch_is_not_cached():
+    fetch_many = Mock(side_effect=[[None], [FORECAST]])
+
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: None}
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: FORECAST}
+    assert fetch_many.call_count == 2
+
+
+def test_misses_are_fetched_in_batches(settings):
+    settings.FORECAST_GRID_DEGREES = 0.1
+    settings.FORECAST_BATCH_SIZE = 5
+    # 250 locations spread over 12 grid cells, two of them already cached
+    locations = [(36.0 + (i % 12) / 10 + 0.01, 10.0) for i in range(250)]
+    cells = list(dict.fromkeys(grid_cell(*location) for location in locations))
+    for cell in cells[:2]:
+        _store(cell, {"cached": True}, age=0)
+    fetch_many = _fetch_many()
+
+    result = cached_forecasts(cells, fetch_many)
+
+    assert len(cells) == 12
+    assert fetch_many.call_count == math.ceil(10 / 5)
+    assert [len(call.args[0]) for call in fetch_many.call_args_list] == [5, 5]
+    assert result[cells[0]] == {"cached": True}
+    assert result[cells[-1]] == FORECAST
+
+
+# ------------------------------------------------------
+# STALE-WHILE-REVALIDATE
+# ------------------------------------------------------
+
+def test_stale_entry_is_served_while_refreshed(settings):
+    settings.FORECAST_TTL = 60
+    _store(TUNIS, {"old": True}, age=120)
+    fetch_many = _fetch_many()
+
+    with _run_refresh_inline():
+        assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: {"old": True}}
+
+    fetch_many.assert_called_once()
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: FORECAST}
+    assert cache.get(f"{cache_key(TUNIS)}:lock") is None
+
+
+def test_only_one_refresh_runs_for_a_stale_entry(settings):
+    settings.FORECAST_TTL = 60
+    _store(TUNIS, {"old": True}, age=120)
+
+    with patch.object(forecasts._refresh_executor, "submit") as submit:
+        for _ in range(5):
+            assert cached_forecasts([TUNIS], Mock()) == {TUNIS: {"old": True}}
+
+    submit.assert_called_once()
+
+
+# ------------------------------------------------------
+# SINGLE FLIGHT
+# ------------------------------------------------------
+
+def test_concurrent_misses_fetch_once():
+    calls = []
+
+    def slow_fetch(cells):
+        calls.append(cells)
+        time.sleep(0.2)
+        return [FORECAST] * len(cells)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            cached_forecasts([TUNIS], slow_fetch)[TUNIS]))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [FORECAST] * 10
+
+
+def test_waits_for_another_workers_fetch(settings):
+    settings.FORECAST_LOCK_TIMEOUT = 5
+    # Another worker holds the lock and stores the result a moment later
+    cache.add(f"{cache_key(TUNIS)}:lock", 1, 5)
+    threading.Timer(0.1, lambda: _store(TUNIS, FORECAST, age=0)).start()
+    fetch_many = Mock()
+
+    assert cached_forecasts([TUNIS], fetch_many) == {TUNIS: FORECAST}
+    fetch_many.assert_not_called()
+
+
+# ------------------------------------------------------
+# ASYNC LOOKUPS
+# ------------------------------------------------------
+
+def test_async_miss_then_hit_calls_upstream_once():
+    afetch_many = AsyncMock(side_effect=lambda cells: [FORECAST] * len(cells))
+
+    async def lookup():
+        return [await acached_forecasts([TUNIS], afetch_many, Mock()) for _ in range(2)]
+
+    assert asyncio.run(lookup()) == [{TUNIS: FORECAST}] * 2
+    afetch_many.assert_awaited_once_with([TUNIS])
+    assert cache.get(f"{cache_key(TUNIS)}:lock") is None
+
+
+def test_async_failed_fetch_is_not_cached():
+    afetch_many = AsyncMock(side_effect=[[None], [FORECAST]])
+
+    async def lookup():
+        return [await acached_forecasts([TUNIS], afetch_many, Mock()) for _ in range(2)]
+
+    assert asyncio.run(lookup()) == [{TUNIS: None}, {TUNIS: FORECAST}]
+
+
+def test_async_stale_entry_is_refreshed_with_the_sync_fetch(settings):
+    settings.FORECAST_TTL = 60
+    _store(TUNIS, {"old": True}, age=120)
+    afetch_many, fetch_many = AsyncMock(), _fetch_many()
+
+    with _run_refresh_inline():
+        result = asyncio.run(acached_forecasts([TUNIS], afetch_many, fetch_many))
+
+    assert result == {TUNIS: {"old": True}}
+    fetch_many.assert_called_once_with([TUNIS])
+    afetch_many.assert_not_awaited()
+
+
+# ------------------------------------------------------
+# WEATHER SERVICE
+# ------------------------------------------------------
+
+def test_get_forecasts_keys_results_by_grid_cell(settings):
+    settings.FORECAST_GRID_DEGREES = 0.1
+    with patch.object(WeatherService, "fetch_forecasts",
+                      side_effect=lambda cells: [{"cell": cell} for cell in cells]) as fetch:
+        result = WeatherService.get_forecasts([(36.81, 10.18), (36.79, 10.21), (35.83, 10.64)])
+        forecast = WeatherService.get_weather_forecast(36.8065, 10.1815)
+
+    fetch.assert_called_once_with([(36.8, 10.2), (35.8, 10.6)])
+    assert result == {(36.8, 10.2): {"cell": (36.8, 10.2)},
+                      (35.8, 10.6): {"cell": (35.8, 10.6)}}
+    assert forecast == {"cell": (36.8, 10.2)}
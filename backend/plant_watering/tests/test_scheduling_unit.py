@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from plant_watering.models import PlantWatering
+from plant_watering.scheduling import (
+    _open_waterings, forecast_arrays, recompute_next_waterings, watering_intervals)
+from plant_watering.services import WeatherService
+from plants.models import Plants
+
+WATERED = datetime(2026, 10, 1, 8, 0, tzinfo=dt_timezone.utc)
+TUNIS = (36.8, 10.2)
+
+
+def _forecast(precipitation, temperature):
+    return {"precipitation": precipitation, "temperature_max": temperature}
+
+
+def _interval(forecast):
+    """Days added by the reference loop in ``calculate_next_watering``"""
+    return (WeatherService.calculate_next_watering(WATERED, weather_data=forecast)
+            - WATERED).days
+
+
+@pytest.fixture
+def plant(db):
+    return Plants.objects.create(
+        name="Basil", species="Ocimum", age=1, height=20, width=10,
+        description="Kitchen herb")
+
+
+def _forecasts_for(forecast):
+    return patch.object(WeatherService, "get_forecasts", return_value={TUNIS: forecast})
+
+
+# ------------------------------------------------------
+# ARRAY RULES
+# ------------------------------------------------------
+
+@pytest.mark.parametrize("precipitation, temperature, expected", [
+    ([0] * 7, [25] * 7, 3),
+    ([0] * 7, [25, 25, 35, 25, 25, 25, 25], 2),
+    ([0] * 7, [35, 35, 15, 25, 25, 25, 25], 4),
+    ([0, 0, 8, 0, 0, 0, 0], [15] * 7, 4),
+    ([6, 0, 0, 0, 0, 0, 0], [35] * 7, 2),
+    ([0, 0, 0, 0, 0, 0, 9], [25] * 7, 8),
+])
+def test_intervals_follow_the_watering_rules(precipitation, temperature, expected):
+    forecast = _forecast(precipitation, temperature)
+
+    intervals = watering_intervals(*forecast_arrays([forecast]))
+
+    assert intervals.tolist() == [expected]
+    assert _interval(forecast) == expected
+
+
+def test_intervals_match_the_reference_loop():
+    rng = np.random.default_rng(0)
+    forecasts = [
+        _forecast(rng.choice([0.0, 2.0, 5.0, 12.0], size=7).tolist(),
+                  rng.choice([15.0, 20.0, 25.0, 30.0, 33.0], size=7).tolist())
+        for _ in range(500)
+    ]
+
+    intervals = watering_intervals(*forecast_arrays(forecasts))
+
+    assert intervals.tolist() == [_interval(forecast) for forecast in forecasts]
+
+
+def test_missing_forecast_days_change_nothing():
+    precipitation, temperature = forecast_arrays([None, _forecast([0, 0], [35, 15])])
+
+    assert np.isnan(precipitation[0]).all()
+    assert watering_intervals(precipitation, temperature).tolist() == [3, 4]
+
+
+# ------------------------------------------------------
+# RECOMPUTATION
+# ------------------------------------------------------
+
+def test_open_waterings_reads_dates_as_utc(plant):
+    local = dt_timezone(timedelta(hours=1))
+    watered = datetime(2026, 10, 1, 9, 30, 15, 250, tzinfo=local)
+    watering = PlantWatering.objects.create(
+        plant=plant, watering_date=watered, amount_ml=100)
+
+    ids, watering_dates, next_dates = _open_waterings()
+
+    assert ids.tolist() == [watering.id]
+    assert watering_dates[0] == np.datetime64("2026-10-01T08:30:15.000250")
+    assert np.isnat(next_dates[0])
+
+
+def test_recompute_updates_open_waterings(plant):
+    stale = PlantWatering.objects.create(
+        plant=plant, watering_date=WATERED, amount_ml=100,
+        next_watering_date=WATERED + timedelta(days=3))
+    unscheduled = PlantWatering.objects.create(
+        plant=plant, watering_date=WATERED - timedelta(days=1), amount_ml=100)
+    done = PlantWatering.objects.create(
+        plant=plant, watering_date=WATERED, amount_ml=100, is_completed=True,
+        next_watering_date=WATERED + timedelta(days=3))
+    updated_at = stale.updated_at
+
+    with _forecasts_for(_forecast([0] * 7, [35] * 7)):
+        assert recompute_next_waterings(chunk_size=1) == 2
+        # Nothing left to change on a second run
+        assert recompute_next_waterings() == 0
+
+    stale.refresh_from_db()
+    unscheduled.refresh_from_db()
+    done.refresh_from_db()
+    assert stale.next_watering_date == WATERED + timedelta(days=2)
+    assert stale.updated_at > updated_at
+    assert unscheduled.next_watering_date == WATERED + timedelta(days=1)
+    assert done.next_watering_date == WATERED + timedelta(days=3)
+
+
+def test_recompute_without_open_waterings(db):
+    with _forecasts_for(_forecast([0] * 7, [35] * 7)):
+        assert recompute_next_waterings() == 0
+
+
+def test_recompute_keeps_dates_without_a_forecast(plant):
+    watering = PlantWatering.objects.create(
+        plant=plant, watering_date=WATERED, amount_ml=100,
+        next_watering_date=WATERED + timedelta(days=5))
+
+    with _forecasts_for(None):
+        assert recompute_next_waterings() == 0
+
+    watering.refresh_from_db()
+    assert watering.next_watering_date == WATERED + timedelta(days=5)
+
+
+def test_recompute_command(plant, capsys):
+    PlantWatering.objects.create(plant=plant, watering_date=WATERED, amount_ml=100)
+
+    with _forecasts_for(_forecast([0] * 7, [15] * 7)):
+        call_command("recompute_watering_schedule")
+
+    assert "Updated 1 waterings" in capsys.readouterr().out
+    assert PlantWatering.objects.get().next_watering_date == WATERED + timedelta(days=4)
@@ -1,7 +1,7 @@
 import pytest
 from rest_framework.test import APIClient
 from datetime import datetime, timedelta
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 from plant_watering.models import PlantWatering
 from plants.models import Plants
 from django.utils import timezone
@@ -46,8 +46,10 @@ def payload(plant):
 # CREATE
 # ------------------------------------------------------
 
+@patch("plant_watering.views.WeatherService.aget_weather_forecast",
+       new_callable=AsyncMock, return_value=None)
 @patch("plant_watering.views.WeatherService.calculate_next_watering")
-def test_create_watering_cycle(mock_weather, client, payload):
+def test_create_watering_cycle(mock_weather, mock_forecast, client, payload):
     fake_date = timezone.now() + timedelta(days=3)
     mock_weather.return_value = fake_date
 
@@ -64,6 +66,39 @@ def test_create_watering_cycle(mock_weather, client, payload):
     assert PlantWatering.objects.count() == 1
 
 
+def test_create_uses_the_forecast_for_the_next_date(client, payload):
+    watered = timezone.now()
+    # Rain on the first day pushes watering to two days later
+    rainy = {"precipitation": [9.0] + [0.0] * 6, "temperature_max": [25.0] * 7}
+
+    with patch("plant_watering.views.WeatherService.aget_weather_forecast",
+               new_callable=AsyncMock, return_value=rainy) as forecast:
+        response = client.post(reverse("plant-watering-list"),
+                               {**payload, "watering_date": watered.isoformat()},
+                               format="json")
+
+    assert response.status_code == 201
+    forecast.assert_awaited_once()
+    watering = PlantWatering.objects.get(id=response.json()["id"])
+    assert watering.next_watering_date == watered + timedelta(days=2)
+
+
+def test_create_rejects_a_malformed_date(client, payload):
+    response = client.post(reverse("plant-watering-list"),
+                           {**payload, "watering_date": "yesterday"}, format="json")
+
+    assert response.status_code == 400
+    assert "watering_date" in response.json()
+
+
+@pytest.mark.parametrize("body", [[], "x", 3])
+def test_create_rejects_a_non_object_body(client, body):
+    response = client.post(reverse("plant-watering-list"), body, format="json")
+
+    assert response.status_code == 400
+    assert not PlantWatering.objects.exists()
+
+
 # ------------------------------------------------------
 # LIST
 # ------------------------------------------------------
@@ -165,7 +200,7 @@ def test_delete_watering_cycle(client, plant):
 # WEATHER FORECAST
 # ------------------------------------------------------
 
-@patch("plant_watering.views.WeatherService.get_weather_forecast")
+@patch("plant_watering.views.WeatherService.aget_weather_forecast", new_callable=AsyncMock)
 @patch("plant_watering.views.WeatherService.calculate_next_watering")
 def test_weather_forecast(mock_calc, mock_weather, client):
     mock_weather.return_value = {"temp": 25, "humidity": 60}
@@ -186,7 +221,9 @@ def test_weather_forecast(mock_calc, mock_weather, client):
 # VALIDATION ERROR
 # ------------------------------------------------------
 
-def test_create_invalid_payload(client):
+@patch("plant_watering.views.WeatherService.aget_weather_forecast",
+       new_callable=AsyncMock, return_value=None)
+def test_create_invalid_payload(mock_forecast, client):
     url = reverse("plant-watering-list")
 
     bad_payload = {"amount_ml": 100}
@@ -194,3 +231,326 @@ def test_create_invalid_payload(client):
     response = client.post(url, bad_payload, format="json")
 
     assert response.status_code == 400
+
+
+# ------------------------------------------------------
+# CONDITIONAL GET
+# ------------------------------------------------------
+
+def test_list_watering_cycles_304(client, plant):
+    PlantWatering.objects.create(
+        plant=plant,
+        watering_date=timezone.now(),
+        amount_ml=100
+    )
+
+    url = reverse("plant-watering-list")
+    response = client.get(url)
+    etag = response["ETag"]
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Collections carry no Last-Modified, so If-Modified-Since alone can't 304
+    response = client.get(url)
+    assert not response.has_header("Last-Modified")
+
+
+# ------------------------------------------------------
+# QUERY PLANS
+# ------------------------------------------------------
+
+def test_list_watering_cycles_uses_indexes(client, plant):
+    from Backend.query_plans import assert_indexed_queries
+
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=100)
+
+    with assert_indexed_queries(ordered_scans=("plant_watering_plantwatering",)):
+        assert client.get(reverse("plant-watering-list")).status_code == 200
+
+
+def test_watering_values_serializer_matches_model_serializer(plant):
+    from plant_watering.serializers import (
+        PlantWateringSerializer, PlantWateringValuesSerializer)
+
+    now = timezone.now()
+    PlantWatering.objects.create(
+        plant=plant, watering_date=now, next_watering_date=now + timedelta(days=3),
+        amount_ml=100, notes="morning")
+    PlantWatering.objects.create(plant=plant, watering_date=now, amount_ml=50)
+
+    records = PlantWatering.objects.all()
+    expected = PlantWateringSerializer(records, many=True).data
+
+    assert PlantWateringValuesSerializer.serialize(records) == [dict(item) for item in expected]
+
+
+def test_weather_forecast_fetches_upstream_once(client):
+    from django.core.cache import cache
+
+    cache.clear()
+    forecast = {"precipitation": [0.0] * 7, "temperature_max": [25.0] * 7}
+    with patch("plant_watering.services.WeatherService.afetch_forecasts",
+               new_callable=AsyncMock, return_value=[forecast]) as fetch:
+        for _ in range(2):
+            response = client.get(reverse("plant-watering-weather-forecast"))
+            assert response.status_code == 200
+
+    fetch.assert_called_once()
+    assert response.json()["next_recommended_watering"]
+
+
+# ------------------------------------------------------
+# DUE FEED
+# ------------------------------------------------------
+
+def _due(plant, days, **kwargs):
+    now = timezone.now()
+    return PlantWatering.objects.create(
+        plant=plant, watering_date=now - timedelta(days=3),
+        next_watering_date=now + timedelta(days=days), amount_ml=100, **kwargs)
+
+
+def test_due_lists_open_waterings_up_to_now(client, plant):
+    overdue = _due(plant, -2)
+    today = _due(plant, -0.1)
+    _due(plant, 2)
+    _due(plant, -1, is_completed=True)
+
+    response = client.get(reverse("plant-watering-due"))
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [row["id"] for row in results] == [overdue.id, today.id]
+    assert results[0]["plant_name"] == "Test Plant"
+
+
+def test_due_filters_a_window(client, plant):
+    _due(plant, -2)
+    tomorrow = _due(plant, 1)
+    _due(plant, 5)
+    now = timezone.now()
+
+    response = client.get(reverse("plant-watering-due"), {
+        "from": now.isoformat(), "to": (now + timedelta(days=2)).isoformat()})
+
+    assert [row["id"] for row in response.json()["results"]] == [tomorrow.id]
+
+
+def test_due_pages_with_a_cursor(client, plant):
+    waterings = [_due(plant, -day) for day in range(5, 0, -1)]
+    url = reverse("plant-watering-due")
+
+    seen, params = [], {"page_size": 2}
+    while url:
+        data = client.get(url, params).json()
+        seen.extend(row["id"] for row in data["results"])
+        url, params = data["next"], None
+
+    assert seen == [watering.id for watering in waterings]
+
+
+def test_due_rejects_malformed_dates(client):
+    response = client.get(reverse("plant-watering-due"), {"to": "tomorrow"})
+
+    assert response.status_code == 400
+
+
+def test_due_uses_the_partial_index(client, plant):
+    from Backend.query_plans import assert_indexed_queries, query_plan
+
+    _due(plant, -1)
+
+    with assert_indexed_queries() as context:
+        assert client.get(reverse("plant-watering-due"), {"page_size": 10}).status_code == 200
+
+    assert len(context.captured_queries) == 1
+    assert "watering_due_idx" in " ".join(query_plan(context.captured_queries[0]["sql"]))
+
+
+# ------------------------------------------------------
+# ROLLUPS + TIME SERIES
+# ------------------------------------------------------
+
+def _rollups():
+    from plant_watering.models import WateringRollup
+
+    return {
+        (row.plant_id, row.day): (row.watering_count, row.amount_ml)
+        for row in WateringRollup.objects.filter(watering_count__gt=0)
+    }
+
+
+@patch("plant_watering.views.WeatherService.aget_weather_forecast",
+       new_callable=AsyncMock, return_value=None)
+@patch("plant_watering.views.WeatherService.calculate_next_watering")
+def test_rollups_follow_watering_changes(mock_weather, mock_forecast, client, plant, payload):
+    from io import StringIO
+    from django.core.management import call_command
+
+    mock_weather.return_value = timezone.now() + timedelta(days=3)
+    url = reverse("plant-watering-list")
+    today = timezone.localdate()
+    first = client.post(url, payload, format="json").json()
+    client.post(url, {**payload, "amount_ml": 50}, format="json")
+    assert _rollups() == {(plant.id, today): (2, 250.0)}
+
+    # Moving a watering to yesterday moves it between buckets
+    yesterday = timezone.now() - timedelta(days=1)
+    client.patch(reverse("plant-watering-detail", args=[first["id"]]),
+                 {"watering_date": yesterday.isoformat(), "amount_ml": 300}, format="json")
+    assert _rollups() == {
+        (plant.id, today): (1, 50.0),
+        (plant.id, timezone.localdate(yesterday)): (1, 300.0),
+    }
+
+    client.delete(reverse("plant-watering-detail", args=[first["id"]]))
+    incremental = _rollups()
+    assert incremental == {(plant.id, today): (1, 50.0)}
+
+    out = StringIO()
+    call_command("rebuild_watering_rollups", "--chunk-size", "1", stdout=out)
+    assert "Wrote 1 rollup rows" in out.getvalue()
+    assert _rollups() == incremental
+
+
+def test_watering_series_buckets(client, plant):
+    from plant_watering.services import WateringRollupService
+
+    # Monday 2026-09-28 .. Thursday 2026-10-08
+    days = [datetime(2026, 9, 28, 9), datetime(2026, 9, 30, 9), datetime(2026, 10, 8, 9)]
+    waterings = [
+        PlantWatering.objects.create(
+            plant=plant, watering_date=timezone.make_aware(day), amount_ml=100.0 * (i + 1))
+        for i, day in enumerate(days)
+    ]
+    WateringRollupService.record(waterings)
+    url = reverse("plant-watering-series")
+
+    daily = client.get(url, {"from": "2026-09-28", "to": "2026-10-01"}).json()
+    assert daily["timestamps"] == ["2026-09-28", "2026-09-29", "2026-09-30", "2026-10-01"]
+    assert daily["values"] == [100.0, 0, 200.0, 0]
+    assert daily["counts"] == [1, 0, 1, 0]
+
+    weekly = client.get(url, {"bucket": "week", "from": "2026-09-30",
+                              "to": "2026-10-08", "plant": plant.id}).json()
+    assert weekly["timestamps"] == ["2026-09-28", "2026-10-05"]
+    assert weekly["values"] == [300.0, 300.0]
+
+    monthly = client.get(url, {"bucket": "month", "to": "2026-10-31"}).json()
+    assert len(monthly["timestamps"]) == 30
+    assert monthly["timestamps"][-2:] == ["2026-09-01", "2026-10-01"]
+    assert monthly["values"][-2:] == [300.0, 300.0]
+
+
+def test_watering_series_rejects_bad_params(client):
+    url = reverse("plant-watering-series")
+
+    assert client.get(url, {"bucket": "hour"}).status_code == 400
+    assert client.get(url, {"plant": "fern"}).status_code == 400
+    assert client.get(url, {"from": "2026-10-02", "to": "2026-10-01"}).status_code == 400
+    assert client.get(url, {"from": "2020-01-01", "to": "2026-10-01"}).status_code == 400
+
+
+def test_watering_series_uses_indexes(client, plant):
+    from Backend.query_plans import assert_indexed_queries
+
+    url = reverse("plant-watering-series")
+    with assert_indexed_queries():
+        assert client.get(url).status_code == 200
+        assert client.get(url, {"plant": plant.id, "bucket": "week"}).status_code == 200
+
+
+# ------------------------------------------------------
+# BULK LOG + BULK COMPLETE
+# ------------------------------------------------------
+
+@pytest.fixture
+def bed(plant):
+    return [plant] + [
+        Plants.objects.create(
+            name=f"Tomato {i}", species="Solanum", age=1, height=40, width=20,
+            description="Raised bed")
+        for i in range(3)
+    ]
+
+
+def test_bulk_log_uses_one_forecast(client, bed):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    forecast = {"precipitation": [0.0] * 7, "temperature_max": [35.0] * 7}
+    watered = timezone.now() - timedelta(hours=1)
+    items = [{"plant": plant.id, "amount_ml": 100 + i, "watering_date": watered.isoformat()}
+             for i, plant in enumerate(bed)]
+
+    with patch("plant_watering.serializers.WeatherService.get_weather_forecast",
+               return_value=forecast) as get_forecast, \
+            CaptureQueriesContext(connection) as context:
+        response = client.post(reverse("plant-watering-bulk"), {"items": items}, format="json")
+
+    assert response.status_code == 201
+    get_forecast.assert_called_once()
+    data = response.json()
+    assert [row["plant_name"] for row in data] == [plant.name for plant in bed]
+    assert all(row["next_watering_date"].startswith(
+        (watered + timedelta(days=2)).date().isoformat()) for row in data)
+    assert PlantWatering.objects.count() == len(bed)
+    assert _rollups() == {(plant.id, timezone.localdate(watered)): (1, 100.0 + i)
+                          for i, plant in enumerate(bed)}
+    # One INSERT for all the waterings, whatever the bed size
+    inserts = [q for q in context.captured_queries
+               if q["sql"].startswith('INSERT INTO "plant_watering_plantwatering"')]
+    assert len(inserts) == 1
+
+
+def test_bulk_log_is_all_or_nothing(client, bed):
+    items = [{"plant": bed[0].id, "amount_ml": 100},
+             {"plant": 999999, "amount_ml": 100},
+             {"plant": bed[1].id}]
+
+    with patch("plant_watering.serializers.WeatherService.get_weather_forecast") as get_forecast:
+        response = client.post(reverse("plant-watering-bulk"), {"items": items}, format="json")
+
+    assert response.status_code == 400
+    errors = response.json()["items"]
+    assert errors[:2] == [{}, {}]
+    assert list(errors[2]) == ["amount_ml"]
+    assert not PlantWatering.objects.exists()
+    get_forecast.assert_not_called()
+
+    # Unknown plants come back in the same shape
+    items[2]["amount_ml"] = 100
+    response = client.post(reverse("plant-watering-bulk"), {"items": items}, format="json")
+    assert response.status_code == 400
+    errors = response.json()["items"]
+    assert [list(error) for error in errors] == [[], ["plant"], []]
+    assert not PlantWatering.objects.exists()
+
+
+def test_bulk_complete(client, plant):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    now = timezone.now()
+    open_waterings = [
+        PlantWatering.objects.create(plant=plant, watering_date=now, amount_ml=100)
+        for _ in range(3)
+    ]
+    done = PlantWatering.objects.create(
+        plant=plant, watering_date=now, amount_ml=100, is_completed=True)
+    ids = [watering.id for watering in open_waterings] + [done.id, 999999]
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.post(reverse("plant-watering-bulk-complete"), {"ids": ids}, format="json")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["updated"] == 3
+    assert [result["ok"] for result in data["results"]] == [True, True, True, False, False]
+    assert data["results"][3]["error"] == "Already completed"
+    assert data["results"][4]["error"] == "Not found"
+    assert not PlantWatering.objects.filter(is_completed=False).exists()
+    updates = [q for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+    assert len(updates) == 1
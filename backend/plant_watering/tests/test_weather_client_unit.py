@@ -0,0 +1,265 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+import pytest
+import requests
+from prometheus_client import REGISTRY
+
+from Backend.outbound import AsyncOutboundClient, CircuitOpenError, OutboundClient
+from plant_watering.services import WeatherService
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.client_address, self.path))
+        status, body, delay = server.responses.pop(0) if server.responses else (200, {}, 0)
+        if delay:
+            time.sleep(delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    """Local HTTP server answering with the queued ``(status, body, delay)``"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.requests, server.responses = [], []
+    server.url = f"http://127.0.0.1:{server.server_port}/v1/forecast"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(**overrides):
+    options = dict(
+        connect_timeout=1, read_timeout=1, max_retries=2, backoff_factor=0,
+        backoff_jitter=0, pool_size=2, failure_threshold=3, reset_timeout=30)
+    options.update(overrides)
+    return OutboundClient("stub", **options)
+
+
+def _async_client(**overrides):
+    options = dict(
+        connect_timeout=1, read_timeout=1, max_retries=2, backoff_factor=0,
+        backoff_jitter=0, pool_size=2, failure_threshold=3, reset_timeout=30)
+    options.update(overrides)
+    return AsyncOutboundClient("stub", **options)
+
+
+def _errors(kind):
+    return REGISTRY.get_sample_value(
+        "greencare_outbound_errors_total", {"service": "stub", "kind": kind}) or 0
+
+
+# ------------------------------------------------------
+# CONNECTION REUSE, TIMEOUTS, RETRIES
+# ------------------------------------------------------
+
+def test_connections_are_kept_alive(stub):
+    client = _client()
+
+    for _ in range(3):
+        assert client.get(stub.url).status_code == 200
+
+    assert len(stub.requests) == 3
+    assert len({address for address, _ in stub.requests}) == 1
+
+
+def test_retries_server_errors_then_succeeds(stub):
+    stub.responses = [(503, {}, 0), (502, {}, 0), (200, {"ok": True}, 0)]
+
+    assert _client().get(stub.url).json() == {"ok": True}
+    assert len(stub.requests) == 3
+
+
+def test_gives_up_after_bounded_retries(stub):
+    stub.responses = [(503, {}, 0)] * 5
+    before = _errors("http_503")
+
+    with pytest.raises(requests.HTTPError):
+        _client(max_retries=1).get(stub.url)
+
+    assert len(stub.requests) == 2
+    assert _errors("http_503") == before + 1
+
+
+def test_read_timeout_is_not_retried(stub):
+    stub.responses = [(200, {}, 0.5)]
+    started = time.monotonic()
+
+    with pytest.raises(requests.ReadTimeout):
+        _client(read_timeout=0.1).get(stub.url)
+
+    assert time.monotonic() - started < 0.45
+    assert len(stub.requests) == 1
+
+
+# ------------------------------------------------------
+# CIRCUIT BREAKER
+# ------------------------------------------------------
+
+def test_circuit_opens_after_consecutive_failures(stub):
+    client = _client(max_retries=0, failure_threshold=2, reset_timeout=0.2)
+    stub.responses = [(500, {}, 0), (500, {}, 0)]
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.get(stub.url)
+    with pytest.raises(CircuitOpenError):
+        client.get(stub.url)
+    assert len(stub.requests) == 2
+
+    # After the reset timeout one trial call closes it again
+    time.sleep(0.25)
+    assert client.get(stub.url).status_code == 200
+    assert not client.breaker.is_open
+
+
+def test_client_errors_do_not_open_the_circuit(stub):
+    client = _client(max_retries=0, failure_threshold=1)
+    stub.responses = [(400, {}, 0)]
+
+    with pytest.raises(requests.HTTPError):
+        client.get(stub.url)
+
+    assert not client.breaker.is_open
+
+
+# ------------------------------------------------------
+# WEATHER SERVICE
+# ------------------------------------------------------
+
+def test_fetch_forecast_uses_pooled_client(stub):
+    stub.responses = [(200, {"daily": {
+        "time": ["2026-01-01"], "precipitation_sum": [1.5],
+        "temperature_2m_max": [22.0], "windspeed_10m_max": [10.0],
+        "relative_humidity_2m_max": [70]}}, 0)]
+
+    with patch.object(WeatherService, "BASE_URL", stub.url), \
+            patch.object(WeatherService, "client", _client()):
+        forecast = WeatherService.fetch_forecast(36.8, 10.2)
+
+    assert forecast["dates"] == ["2026-01-01"]
+    assert forecast["precipitation"] == [1.5]
+    assert "latitude=36.8" in stub.requests[0][1]
+
+
+def test_fetch_forecast_returns_none_when_circuit_open(stub):
+    client = _client(max_retries=0, failure_threshold=1)
+    stub.responses = [(500, {}, 0)]
+
+    with patch.object(WeatherService, "BASE_URL", stub.url), \
+            patch.object(WeatherService, "client", client):
+        assert WeatherService.fetch_forecast(36.8, 10.2) is None
+        assert WeatherService.fetch_forecast(36.8, 10.2) is None
+
+    assert len(stub.requests) == 1
+
+
+def test_fetch_forecasts_requests_many_locations_at_once(stub):
+    def daily(rain):
+        return {"daily": {"time": ["2026-01-01"], "precipitation_sum": [rain]}}
+
+    stub.responses = [(200, [daily(1.0), daily(2.0), daily(3.0)], 0)]
+
+    with patch.object(WeatherService, "BASE_URL", stub.url), \
+            patch.object(WeatherService, "client", _client()):
+        forecasts = WeatherService.fetch_forecasts([(36.8, 10.2), (35.8, 10.6), (33.9, 10.1)])
+
+    assert [forecast["precipitation"] for forecast in forecasts] == [[1.0], [2.0], [3.0]]
+    assert len(stub.requests) == 1
+    assert "latitude=36.8%2C35.8%2C33.9" in stub.requests[0][1]
+
+
+# ------------------------------------------------------
+# ASYNC CLIENT
+# ------------------------------------------------------
+
+def test_async_client_is_closed_after_each_call(stub):
+    opened = []
+
+    class RecordingClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            opened.append(self)
+
+    stub.responses = [(503, {}, 0), (200, {}, 0)]
+    with patch("Backend.outbound.httpx.AsyncClient", RecordingClient):
+        response = asyncio.run(_async_client().get(stub.url))
+
+    assert response.status_code == 200
+    # The retry went over the same kept-alive connection
+    assert len({address for address, _ in stub.requests}) == 1
+    assert len(opened) == 1 and opened[0].is_closed
+
+
+def test_async_retries_server_errors_then_succeeds(stub):
+    stub.responses = [(503, {}, 0), (502, {}, 0), (200, {"ok": True}, 0)]
+
+    assert asyncio.run(_async_client().get(stub.url)).json() == {"ok": True}
+    assert len(stub.requests) == 3
+
+
+def test_async_read_timeout_is_not_retried(stub):
+    stub.responses = [(200, {}, 0.5)]
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(_async_client(read_timeout=0.1).get(stub.url))
+
+    assert len(stub.requests) == 1
+
+
+def test_async_circuit_opens_after_consecutive_failures(stub):
+    client = _async_client(max_retries=0, failure_threshold=2)
+    stub.responses = [(500, {}, 0), (500, {}, 0)]
+
+    async def fetch():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await client.get(stub.url)
+        with pytest.raises(CircuitOpenError):
+            await client.get(stub.url)
+
+    asyncio.run(fetch())
+    assert len(stub.requests) == 2
+
+
+def test_async_requests_run_concurrently(stub):
+    client = _async_client(pool_size=5)
+    stub.responses = [(200, {}, 0.2)] * 5
+
+    async def fetch():
+        return await asyncio.gather(*(client.get(stub.url) for _ in range(5)))
+
+    started = time.monotonic()
+    assert len(asyncio.run(fetch())) == 5
+    assert time.monotonic() - started < 0.6
+
+
+def test_afetch_forecasts_uses_async_client(stub):
+    stub.responses = [(200, {"daily": {"time": ["2026-01-01"], "precipitation_sum": [1.5]}}, 0)]
+
+    with patch.object(WeatherService, "BASE_URL", stub.url), \
+            patch.object(WeatherService, "async_client", _async_client()):
+        forecasts = asyncio.run(WeatherService.afetch_forecasts([(36.8, 10.2)]))
+
+    assert forecasts[0]["precipitation"] == [1.5]
+    assert "latitude=36.8" in stub.requests[0][1]
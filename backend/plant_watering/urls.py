@@ -8,6 +8,9 @@ router = DefaultRouter()
 router.register(r'', PlantWateringViewSet, basename='plant-watering')
 
 urlpatterns = [
+    # Async views, ahead of the router routes they replace
+    path('', views.watering_collection, name='plant-watering-list'),
+    path('weather_forecast/', views.weather_forecast, name='plant-watering-weather-forecast'),
     path('', include(router.urls)),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
   
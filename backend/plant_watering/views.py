@@ -1,70 +1,213 @@
-from rest_framework import viewsets, status
-from datetime import datetime
+import asyncio
+import json
+from rest_framework import mixins, viewsets, status
+from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 from .models import PlantWatering
-from .serializers import PlantWateringSerializer
+from .serializers import (
+    BulkCompleteSerializer, BulkWateringSerializer, PlantWateringSerializer,
+    PlantWateringValuesSerializer)
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .services import WeatherService
+from .pagination import DuePagination
+from .services import (
+    SERIES_BUCKETS, SERIES_DEFAULT_BUCKETS, SERIES_MAX_BUCKETS, WateringRollupService,
+    WateringService, WeatherService, bucket_start, series_buckets, watering_series)
+from Backend.conditional import ConditionalGetMixin
+from Backend.params import query_date, query_datetime
+from Backend.projections import ValuesListMixin
 
  #CRUD logic actually lives
-class PlantWateringViewSet(viewsets.ModelViewSet):
+# Creating is the async ``watering_collection`` view below, so the viewset
+# has no create action
+class PlantWateringViewSet(ConditionalGetMixin, ValuesListMixin,
+                           mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                           mixins.UpdateModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
     queryset = PlantWatering.objects.all()
     serializer_class = PlantWateringSerializer
+    values_serializer_class = PlantWateringValuesSerializer
     permission_classes = [AllowAny]
     authentication_classes = []  # Disable authentication temporarily for development
 
-    def create(self, request, *args, **kwargs):
-        # Get the data from the request
-        data = request.data.copy()
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old = PlantWatering.objects.select_for_update().filter(
+                pk=serializer.instance.pk
+            ).values_list('plant_id', 'watering_date', 'amount_ml').get()
+            WateringRollupService.change([(old, serializer.save())])
 
-        # If watering_date is not provided, use current time
-        if 'watering_date' not in data:
-            data['watering_date'] = datetime.now().isoformat()
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            WateringRollupService.remove([instance])
 
-        # Calculate next watering date based on weather
-        watering_date = datetime.fromisoformat(
-            data['watering_date'].replace('Z', '+00:00'))
-        next_watering = WeatherService.calculate_next_watering(watering_date)
-        data['next_watering_date'] = next_watering.isoformat()
-
-        # Create serializer with the modified data
-        serializer = self.get_serializer(data=data)
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request):
+        """
+        Log many waterings at once (e.g. a whole bed) with one forecast
+        lookup. Body: {"items": [{"plant": id, "amount_ml": n, ...}, ...]}.
+        All-or-nothing: a 400 lists the errors per item.
+        """
+        serializer = BulkWateringSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        waterings = serializer.save()
+        return Response(
+            PlantWateringSerializer(waterings, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
 
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    @action(detail=False, methods=['POST'])
+    def bulk_complete(self, request):
+        """
+        Mark many waterings completed. Body: {"ids": [1, 2, ...]}. Returns
+        one outcome per id; unknown or already completed ones are skipped.
+        """
+        serializer = BulkCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = WateringService.bulk_complete(serializer.validated_data['ids'])
+        return Response({
+            'updated': sum(1 for result in results if result['ok']),
+            'results': results,
+        })
 
-    
-    
+    @action(detail=False, methods=['GET'])
+    def due(self, request):
         """
-        Get weather forecast and watering recommendations
-        GET /api/watering/weather_forecast/
+        Open waterings due between ``from`` and ``to`` (ISO 8601 datetimes;
+        by default everything due up to now, overdue ones included), soonest
+        first, with the plant name. Always paginated:
+        ``{"next", "previous", "results"}``.
         """
+        params = request.query_params
+        try:
+            start = query_datetime(params, 'from')
+            end = query_datetime(params, 'to') or timezone.now()
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        waterings = PlantWatering.objects.filter(
+            is_completed=False, next_watering_date__lte=end)
+        if start is not None:
+            waterings = waterings.filter(next_watering_date__gte=start)
+
+        paginator = DuePagination()
+        page = paginator.paginate_queryset(
+            PlantWateringValuesSerializer.project(waterings), request, view=self)
+        return paginator.get_paginated_response(PlantWateringValuesSerializer(page).data)
+
     @action(detail=False, methods=['GET'])
-    def weather_forecast(self, request):
-        
-        
-        weather_data = WeatherService.get_weather_forecast()
-        if weather_data is None:
+    def series(self, request):
+        """
+        Water given per day, week or month, from the daily rollups, as
+        columnar arrays for charts:
+        ``{"timestamps": [...], "values": [...], "counts": [...]}``.
+
+        Query params: bucket (day|week|month, default day), from and to
+        (YYYY-MM-DD, default the last 30 buckets up to today) and plant
+        (id; all plants if omitted).
+        """
+        params = request.query_params
+        bucket = params.get('bucket', 'day')
+        if bucket not in SERIES_BUCKETS:
             return Response(
-                {"error": "Failed to fetch weather data"},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+                {'error': f'bucket must be one of {", ".join(SERIES_BUCKETS)}'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Add watering recommendation
-        next_watering = WeatherService.calculate_next_watering()
-        weather_data['next_recommended_watering'] = next_watering.strftime(
-            '%Y-%m-%d')
-
-        if weather_data is None:
+        plant_id = params.get('plant')
+        if plant_id is not None and not plant_id.isdigit():
             return Response(
-                {"error": "Failed to fetch weather data"},
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+                {'error': 'plant must be an id'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            end = query_date(params, 'to') or timezone.localdate()
+            start = query_date(params, 'from')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if start is None:
+            start = bucket_start(end, bucket)
+            for _ in range(SERIES_DEFAULT_BUCKETS - 1):
+                start = bucket_start(start - timedelta(days=1), bucket)
+        if start > end or len(series_buckets(start, end, bucket)) > SERIES_MAX_BUCKETS:
+            return Response(
+                {'error': f'Date range must be ascending and at most {SERIES_MAX_BUCKETS} buckets'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(watering_series(
+            start, end, bucket, plant_id=int(plant_id) if plant_id else None))
+
+
+
+_watering_list = PlantWateringViewSet.as_view({'get': 'list'})
+
+
+def _save_watering(serializer, weather_data):
+    WateringService.create(serializer, weather_data)
+    return serializer.data
+
+
+async def _create_watering(request):
+    """Log a watering, with the next date computed from the forecast"""
+    try:
+        data = (json.loads(request.body or b'{}') if request.content_type == 'application/json'
+                else request.POST.dict())
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(data, dict):
+        return JsonResponse(
+            {'error': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # If watering_date is not provided, use current time
+    if 'watering_date' not in data:
+        data['watering_date'] = timezone.now()
+
+    # Validation looks the plant up on the sync thread while the forecast
+    # request is awaited. Cache lookups for the forecast also queue on that
+    # thread, so only the wait on the weather API overlaps validation.
+    serializer = PlantWateringSerializer(data=data)
+    weather_data, valid = await asyncio.gather(
+        WeatherService.aget_weather_forecast(), sync_to_async(serializer.is_valid)())
+    if not valid:
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    data = await sync_to_async(_save_watering)(serializer, weather_data)
+    return JsonResponse(data, status=status.HTTP_201_CREATED)
+
 
-        return Response(weather_data)
+@csrf_exempt
+async def watering_collection(request, *args, **kwargs):
+    """
+    /api/watering/. Creating is async so waiting on the weather API doesn't
+    hold a worker thread; listing stays on ``PlantWateringViewSet``.
+    """
+    if request.method == 'POST':
+        return await _create_watering(request)
+    return await sync_to_async(_watering_list)(request, *args, **kwargs)
 
 
+@require_GET
+async def weather_forecast(request):
+    """
+    Get weather forecast and watering recommendations
+    GET /api/watering/weather_forecast/
+    """
+    weather_data = await WeatherService.aget_weather_forecast()
+    if weather_data is None:
+        return JsonResponse(
+            {"error": "Failed to fetch weather data"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
 
+    # Add watering recommendation
+    next_watering = WeatherService.calculate_next_watering(weather_data=weather_data)
+    weather_data['next_recommended_watering'] = next_watering.strftime(
+        '%Y-%m-%d')
+    return JsonResponse(weather_data)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 23:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plants', '0005_alter_plants_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plants',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -9,6 +9,7 @@ class Plants(models.Model):
     width = models.FloatField()
     description = models.TextField()
     image = models.URLField(max_length=500, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.species}"
@@ -1,8 +1,35 @@
 from rest_framework import serializers
+from uploads.processing import variant_urls
 from .models import Plants
 
 
 class PlantSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Plants
-        fields = '__all__'
+        # updated_at only backs the conditional GET validators
+        exclude = ['updated_at']
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image)
+
+
+class PlantWateringSummarySerializer(PlantSerializer):
+    """
+    ``PlantSerializer`` plus the plant's latest watering, read from the
+    ``latest_*`` annotations of ``with_watering_summary``
+    """
+    watering_summary = serializers.SerializerMethodField()
+
+    def get_watering_summary(self, obj):
+        if obj.latest_watering_date is None:
+            return None
+        dates = serializers.DateTimeField()
+        return {
+            'watering_date': dates.to_representation(obj.latest_watering_date),
+            'next_watering_date': (dates.to_representation(obj.latest_next_watering_date)
+                                   if obj.latest_next_watering_date else None),
+            'amount_ml': obj.latest_amount_ml,
+            'is_completed': obj.latest_is_completed,
+        }
@@ -7,6 +7,8 @@ from authentication.models import CustomUser
 from plant_watering.models import PlantWatering
 from django.utils import timezone
 from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 pytestmark = pytest.mark.django_db
 
@@ -233,6 +235,57 @@ def test_watering_record_endpoint(client, authenticated_user):
     assert data[1]["notes"] == "First watering"
 
 
+def _daily_waterings(plant, days):
+    start = timezone.now() - timedelta(days=days)
+    return [
+        PlantWatering.objects.create(
+            plant=plant, watering_date=start + timedelta(days=day), amount_ml=100.0)
+        for day in range(days)
+    ]
+
+
+def test_watering_record_filters_a_date_range(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    waterings = _daily_waterings(plant, 10)
+
+    url = reverse("plant-watering-record", kwargs={"pk": plant.id})
+    response = client.get(url, {
+        "from": waterings[3].watering_date.isoformat(),
+        "to": waterings[5].watering_date.isoformat()})
+
+    assert response.status_code == 200
+    assert [row["id"] for row in response.json()] == [
+        waterings[5].id, waterings[4].id, waterings[3].id]
+    assert client.get(url, {"from": "last week"}).status_code == 400
+
+
+def test_watering_record_pages_with_a_cursor(client, authenticated_user):
+    from Backend.query_plans import assert_indexed_queries, query_plan
+
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    waterings = _daily_waterings(plant, 7)
+
+    url = reverse("plant-watering-record", kwargs={"pk": plant.id})
+    seen, params = [], {"page_size": 3}
+    with assert_indexed_queries() as context:
+        while url:
+            data = client.get(url, params).json()
+            seen.extend(row["id"] for row in data["results"])
+            url, params = data["next"], None
+
+    assert seen == [watering.id for watering in reversed(waterings)]
+    assert data["results"][0]["plant_name"] == "Fern"
+    page = next(query["sql"] for query in context.captured_queries
+                if "LIMIT" in query["sql"] and "plant_watering" in query["sql"])
+    assert not any("TEMP B-TREE" in line for line in query_plan(page))
+
+
 # ------------------------------------------------------
 # CUSTOM ACTION: upload_image
 # ------------------------------------------------------
@@ -339,3 +392,139 @@ def test_update_plant_partial(client, authenticated_user):
     # Other fields should remain unchanged
     assert plant.species == "Original Species"
     assert plant.age == 1
+
+
+# ------------------------------------------------------
+# Conditional GET (ETag / Last-Modified)
+# ------------------------------------------------------
+
+def test_plant_list_304_until_plant_changes(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+
+    url = reverse("plant-list")
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    plant.name = "Boston Fern"
+    plant.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_watering_record_304(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=100.0)
+
+    url = reverse("plant-watering-record", kwargs={"pk": plant.id})
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=150.0)
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_watering_record_uses_indexes(client, authenticated_user):
+    from Backend.query_plans import assert_indexed_queries
+
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=100.0)
+
+    url = reverse("plant-watering-record", kwargs={"pk": plant.id})
+    with assert_indexed_queries():
+        assert client.get(url).status_code == 200
+
+
+# ------------------------------------------------------
+# LIST WITH WATERING SUMMARY
+# ------------------------------------------------------
+
+def test_list_plants_with_watering_summary(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    watered = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    dry = Plants.objects.create(
+        name="Cactus", species="Cactus", age=3, height=8.0, width=4.0,
+        description="desc")
+    now = timezone.now()
+    PlantWatering.objects.create(
+        plant=watered, watering_date=now - timedelta(days=4), amount_ml=100.0,
+        is_completed=True)
+    PlantWatering.objects.create(
+        plant=watered, watering_date=now - timedelta(days=1),
+        next_watering_date=now + timedelta(days=2), amount_ml=250.0)
+
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(reverse("plant-list"), {"include": "watering_summary"})
+
+    assert response.status_code == 200
+    plants = {plant["id"]: plant for plant in response.json()}
+    summary = plants[watered.id]["watering_summary"]
+    assert summary["amount_ml"] == 250.0
+    assert summary["is_completed"] is False
+    assert summary["watering_date"].startswith((now - timedelta(days=1)).date().isoformat())
+    assert summary["next_watering_date"].startswith((now + timedelta(days=2)).date().isoformat())
+    assert plants[dry.id]["watering_summary"] is None
+    # Plants and their summaries come from a single SELECT
+    selects = [query["sql"] for query in context.captured_queries
+               if query["sql"].startswith('SELECT "plants_plants"')]
+    assert len(selects) == 1
+    assert "plant_watering_plantwatering" in selects[0]
+
+
+def test_list_plants_without_include_has_no_summary(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+
+    response = client.get(reverse("plant-list"))
+
+    assert "watering_summary" not in response.json()[0]
+
+
+def test_watering_summary_lookups_use_the_plant_date_index(client, authenticated_user):
+    from Backend.query_plans import query_plan
+
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=100.0)
+
+    with CaptureQueriesContext(connection) as context:
+        client.get(reverse("plant-list"), {"include": "watering_summary"})
+
+    sql = next(query["sql"] for query in context.captured_queries if "latest_" in query["sql"])
+    plan = query_plan(sql)
+    # One index probe per summary field, no sorting of a plant's history
+    assert sum("watering_plant_date_idx" in line for line in plan) == 4
+    assert not any("TEMP B-TREE" in line for line in plan)
+
+
+def test_watering_summary_list_304_until_a_watering_changes(client, authenticated_user):
+    client.force_authenticate(user=authenticated_user)
+    plant = Plants.objects.create(
+        name="Fern", species="Fern", age=1, height=10.0, width=5.0,
+        description="desc")
+
+    url = reverse("plant-list")
+    params = {"include": "watering_summary"}
+    etag = client.get(url, params)["ETag"]
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    PlantWatering.objects.create(
+        plant=plant, watering_date=timezone.now(), amount_ml=100.0)
+    assert client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code == 200
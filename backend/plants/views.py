@@ -2,17 +2,71 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-import cloudinary.uploader
+from uploads.processing import upload_image
+from django.db.models import OuterRef, Subquery
+from Backend.conditional import (
+    ConditionalGetMixin, collection_validators, combine_validators, conditional_response)
+from Backend.params import query_datetime
 from .models import Plants
-from .serializers import PlantSerializer
-from plant_watering.serializers import PlantWateringSerializer
+from .serializers import PlantSerializer, PlantWateringSummarySerializer
+from plant_watering.models import PlantWatering
+from plant_watering.pagination import WateringHistoryPagination
+from plant_watering.serializers import PlantWateringValuesSerializer
 
 
-class PlantViewSet(viewsets.ModelViewSet):
+def with_watering_summary(plants):
+    """
+    Annotate ``plants`` with their latest watering as ``latest_<field>``.
+
+    One correlated subquery per field, all in the same SELECT; each is a
+    single probe of ``watering_plant_date_idx``. ``id`` breaks ties so every
+    field comes from the same watering.
+    """
+    latest = PlantWatering.objects.filter(
+        plant=OuterRef('pk')).order_by('-watering_date', '-id')
+    return plants.annotate(**{
+        f'latest_{field}': Subquery(latest.values(field)[:1])
+        for field in ('watering_date', 'next_watering_date', 'amount_ml', 'is_completed')
+    })
+
+
+class PlantViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Plants.objects.all()
     serializer_class = PlantSerializer
     permission_classes = [IsAuthenticated]
 
+    def _includes_watering_summary(self):
+        includes = self.request.query_params.get('include', '').split(',')
+        return self.action == 'list' and 'watering_summary' in includes
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self._includes_watering_summary():
+            queryset = with_watering_summary(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self._includes_watering_summary():
+            return PlantWateringSummarySerializer
+        return super().get_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        """
+        ``?include=watering_summary`` adds each plant's latest watering
+        (``watering_summary``, null if it has none) from the same query.
+        """
+        if not self._includes_watering_summary():
+            return super().list(request, *args, **kwargs)
+        # The summaries change with the waterings, not the plants
+        plants = self.filter_queryset(self.get_queryset())
+        validators = combine_validators(
+            collection_validators(plants, user=request.user),
+            collection_validators(
+                PlantWatering.objects.filter(plant__in=plants), user=request.user))
+        return conditional_response(
+            request, validators,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
     @action(detail=True, methods=["get"])
     def watering_record(self, request, pk=None):
         """
@@ -20,11 +74,32 @@ class PlantViewSet(viewsets.ModelViewSet):
 
         URL: GET /api/plants/{pk}/watering_record/
         Returns watering records ordered by date (newest first).
+        ``from``/``to`` (ISO 8601) bound watering_date; sending ``cursor``
+        or ``page_size`` pages through them with keyset pagination.
         """
         plant = self.get_object()
-        records = plant.watering_schedules.all().order_by('-watering_date')
-        serializer = PlantWateringSerializer(records, many=True)
-        return Response(serializer.data)
+        params = request.query_params
+        try:
+            start = query_datetime(params, 'from')
+            end = query_datetime(params, 'to')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        records = plant.watering_schedules.order_by('-watering_date', '-id')
+        if start is not None:
+            records = records.filter(watering_date__gte=start)
+        if end is not None:
+            records = records.filter(watering_date__lte=end)
+        return self.conditional_list(
+            request, records, lambda: self._watering_page(request, records))
+
+    def _watering_page(self, request, records):
+        rows = PlantWateringValuesSerializer.project(records)
+        paginator = WateringHistoryPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        if page is None:
+            return Response(PlantWateringValuesSerializer(rows).data)
+        return paginator.get_paginated_response(PlantWateringValuesSerializer(page).data)
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def upload_image(self, request):
@@ -37,18 +112,12 @@ class PlantViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Upload to Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                image_file,
-                folder='greencare/plants',
-                resource_type='image'
+            # Downscale, re-encode and upload with responsive variants
+            return Response(
+                upload_image(image_file, folder='greencare/plants'),
+                status=status.HTTP_200_OK
             )
 
-            return Response({
-                'image_url': upload_result['secure_url'],
-                'public_id': upload_result['public_id']
-            }, status=status.HTTP_200_OK)
-
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 00:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predict', '0002_detectionresult_groq_raw_response'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='detectionresult',
+            index=models.Index(fields=['user', '-created_at'], name='detection_user_created_idx'),
+        ),
+    ]
@@ -17,5 +17,12 @@ class DetectionResult(models.Model):
     groq_raw_response = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Detection history
+            models.Index(fields=['user', '-created_at'],
+                         name='detection_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.disease or 'Healthy'}"
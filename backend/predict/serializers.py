@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from Backend.projections import ValuesSerializer
 from .models import DetectionResult
 
 class DetectionResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = DetectionResult
         fields = '__all__'
+
+
+class DetectionResultValuesSerializer(ValuesSerializer):
+    """``DetectionResultSerializer`` output for the history list, from ``values()``"""
+    model = DetectionResult
+    fields = ('id', 'user', 'image_url', 'status', 'disease', 'confidence',
+              'recommendations', 'groq_raw_response', 'created_at')
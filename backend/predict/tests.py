@@ -1,3 +1,114 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import Mock, patch
 
-# Create your tests here.
+import numpy as np
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from predict.models import DetectionResult
+from uploads.models import DirectUpload
+
+pytestmark = pytest.mark.django_db
+
+IMAGE_URL = "https://res.cloudinary.com/test-cloud/image/upload/v1/greencare/predict/leaf.jpg"
+# Index of "Cassava__healthy" in classes.json, so no AI recommendations are requested
+HEALTHY_CLASS = 4
+
+
+# ------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(
+        email="owner@test.com", password="password123", role="plant_owner")
+
+
+@pytest.fixture
+def other_user(db):
+    return CustomUser.objects.create_user(
+        email="other@test.com", password="password123", role="plant_owner")
+
+
+def _direct_upload(user, status="verified"):
+    return DirectUpload.objects.create(
+        user=user, purpose="predict", public_id="greencare/predict/leaf",
+        secure_url=IMAGE_URL, status=status,
+        expires_at=timezone.now() + timedelta(minutes=10))
+
+
+def _jpeg_bytes():
+    buffer = BytesIO()
+    PILImage.new("RGB", (32, 32), color="green").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def model():
+    """The trained model and TensorFlow helpers, replaced by stand-ins"""
+    preds = np.zeros(46)
+    preds[HEALTHY_CLASS] = 0.9
+    model = Mock()
+    model.predict.return_value = [preds]
+    keras_image = Mock()
+    keras_image.img_to_array.side_effect = lambda img: np.asarray(img, dtype=float)
+
+    with patch("predict.views.TENSORFLOW_AVAILABLE", True), \
+            patch("predict.views.np", np, create=True), \
+            patch("predict.views.keras_image", keras_image, create=True), \
+            patch("predict.views.get_model", return_value=model):
+        yield model
+
+
+# ------------------------------------------------------
+# PREDICT FROM A DIRECT UPLOAD
+# ------------------------------------------------------
+
+@patch("predict.views.requests.get")
+def test_predict_from_verified_upload(mock_get, client, user, model):
+    mock_get.return_value = Mock(content=_jpeg_bytes(), raise_for_status=Mock())
+    upload = _direct_upload(user)
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse("predict-predict"), {"upload_id": upload.id}, format="json")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+    mock_get.assert_called_once_with(IMAGE_URL, timeout=10)
+    model.predict.assert_called_once()
+    assert DetectionResult.objects.get(user=user).image_url == IMAGE_URL
+
+
+@patch("predict.views.requests.get")
+def test_predict_rejects_another_users_upload(mock_get, client, user, other_user, model):
+    upload = _direct_upload(other_user)
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse("predict-predict"), {"upload_id": upload.id}, format="json")
+
+    assert response.status_code == 400
+    mock_get.assert_not_called()
+    assert not DetectionResult.objects.exists()
+
+
+@patch("predict.views.requests.get")
+def test_predict_rejects_unverified_upload(mock_get, client, user, model):
+    upload = _direct_upload(user, status="pending")
+    client.force_authenticate(user=user)
+
+    response = client.post(reverse("predict-predict"), {"upload_id": upload.id}, format="json")
+
+    assert response.status_code == 400
+    assert response.json()["error"] == "Unknown or unverified upload."
+    mock_get.assert_not_called()
@@ -1,6 +1,9 @@
 import os
 import json
 import traceback
+from io import BytesIO
+
+import requests
 
 from django.conf import settings
 from rest_framework import viewsets, status
@@ -8,9 +11,10 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-import cloudinary.uploader
 from PIL import Image
 
+from uploads.processing import upload_image
+
 # Try to import TensorFlow - fail gracefully if not available
 try:
     import tensorflow as tf
@@ -31,8 +35,11 @@ except ImportError:
     print("Warning: openai package not installed. AI recommendations will be unavailable.")
     print("Install with: pip install openai")
 
+from Backend.conditional import (
+    collection_validators, conditional_response, object_validators)
+from uploads.models import DirectUpload
 from .models import DetectionResult
-from .serializers import DetectionResultSerializer
+from .serializers import DetectionResultSerializer, DetectionResultValuesSerializer
 
 # === Paths to model and classes ===
 MODEL_PATH = os.path.join(settings.BASE_DIR, "predict",
@@ -90,8 +97,12 @@ class DetectionResultViewSet(viewsets.ViewSet):
         try:
             detections = DetectionResult.objects.filter(
                 user=user).order_by("-created_at")
-            serializer = DetectionResultSerializer(detections, many=True)
-            return Response(serializer.data)
+            # Detection results are immutable, so created_at is the change marker
+            validators = collection_validators(
+                detections, field="created_at", user=user)
+            return conditional_response(
+                request, validators,
+                lambda: Response(DetectionResultValuesSerializer.serialize(detections)))
         except Exception as e:
             print("Error fetching history:", e)
             traceback.print_exc()
@@ -114,6 +125,12 @@ class DetectionResultViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        validators = object_validators(
+            detection, field="created_at", user=request.user)
+        return conditional_response(
+            request, validators, lambda: self._history_detail_response(detection))
+
+    def _history_detail_response(self, detection):
         # Parse recommendations from Groq response if stored as raw text
         recommendations = detection.recommendations or []
         if not isinstance(recommendations, list):
@@ -142,20 +159,30 @@ class DetectionResultViewSet(viewsets.ViewSet):
 
         user = request.user
         img_file = request.FILES.get("image")
+        upload_id = request.data.get("upload_id")
 
-        if not img_file:
+        if not img_file and not upload_id:
             return Response({"error": "Image file is required."}, status=400)
 
         try:
             # -----------------------------
             # 1) Upload to Cloudinary
             # -----------------------------
-            upload_result = cloudinary.uploader.upload(
-                img_file,
-                folder="greencare/predict",
-                resource_type="image"
-            )
-            image_url = upload_result.get("secure_url")
+            if img_file:
+                # Stored downscaled; the model still reads the original below
+                image_url = upload_image(img_file, folder="greencare/predict")["image_url"]
+            else:
+                # Already uploaded straight to Cloudinary via /api/uploads/sign/
+                direct_upload = DirectUpload.objects.filter(
+                    pk=upload_id, user=user, purpose="predict", status="verified"
+                ).first()
+                if direct_upload is None:
+                    return Response(
+                        {"error": "Unknown or unverified upload."}, status=400)
+                image_url = direct_upload.secure_url
+                image_response = requests.get(image_url, timeout=10)
+                image_response.raise_for_status()
+                img_file = BytesIO(image_response.content)
 
             # -----------------------------
             # 2) Load & preprocess image
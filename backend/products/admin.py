@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Product, ProductImage, Order
+from django.db import transaction
+from .models import (
+    Product, ProductImage, Order, CloudinaryAssetDeletion, ProductNeighbors,
+    RecommendationRun, SellerSalesRollup)
+from .services import OrderStatusService, SalesRollupService
 
 
 class ProductImageInline(admin.TabularInline):
@@ -33,3 +37,48 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ['product__name', 'buyer__email', 'seller__email']
     readonly_fields = ['created_at', 'updated_at', 'total_price']
     list_editable = ['status']
+
+    def save_model(self, request, obj, form, change):
+        if {'product', 'quantity'} & set(form.changed_data):
+            # total_price is read-only here, so keep it in line with the order
+            obj.total_price = obj.product.price * obj.quantity
+        # Keep the sales rollups in step with orders edited here
+        with transaction.atomic():
+            if change:
+                OrderStatusService.save(
+                    obj, lambda: super(OrderAdmin, self).save_model(request, obj, form, change))
+            else:
+                super().save_model(request, obj, form, change)
+                SalesRollupService.record([obj])
+
+    def delete_model(self, request, obj):
+        OrderStatusService.delete(Order.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        OrderStatusService.delete(queryset)
+
+
+@admin.register(CloudinaryAssetDeletion)
+class CloudinaryAssetDeletionAdmin(admin.ModelAdmin):
+    list_display = ['public_id', 'created_at']
+    search_fields = ['public_id']
+
+
+@admin.register(SellerSalesRollup)
+class SellerSalesRollupAdmin(admin.ModelAdmin):
+    list_display = ['seller', 'product', 'day', 'status',
+                    'order_count', 'units', 'revenue']
+    list_filter = ['status', 'day']
+    search_fields = ['seller__email', 'product__name']
+
+
+@admin.register(ProductNeighbors)
+class ProductNeighborsAdmin(admin.ModelAdmin):
+    list_display = ['product', 'updated_at']
+    search_fields = ['product__name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(RecommendationRun)
+class RecommendationRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'finished_at', 'full', 'products_updated']
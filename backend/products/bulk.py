@@ -0,0 +1,368 @@
+"""
+Bulk product import/export for sellers, and order/sales exports.
+
+Imports stream CSV or JSONL rows, validate them in chunks and upsert each
+chunk with a single ``bulk_create(update_conflicts=True)`` keyed on the
+seller's ``sku``, which every imported row must have. Exports stream rows
+with ``.iterator(chunk_size=...)`` so memory stays flat regardless of
+catalogue size.
+"""
+
+import csv
+import io
+import json
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import MAX_PRODUCT_IMAGES, CloudinaryAssetDeletion, Product, ProductImage
+from .services import ProductImageService
+
+IMPORT_CHUNK_SIZE = 500
+EXPORT_CHUNK_SIZE = 2000
+ORDER_EXPORT_FIELDS = ['id', 'created_at', 'status', 'product_id', 'product_name',
+                       'sku', 'quantity', 'total_price', 'buyer_email',
+                       'seller_email', 'shipping_address', 'notes']
+# Rows per chunk handed to the response when streaming order exports
+EXPORT_ROWS_PER_CHUNK = 500
+EXPORT_FIELDS = ['sku', 'name', 'description', 'price',
+                 'category', 'stock_quantity', 'image_urls']
+# Separator for the image_urls column in CSV files
+CSV_IMAGE_SEPARATOR = '|'
+UPSERT_FIELDS = ['name', 'description', 'price',
+                 'category', 'stock_quantity', 'updated_at']
+# Spreadsheet apps run CSV cells starting with these as formulas
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# Characters XML 1.0 doesn't allow, even escaped
+_XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+class ProductImportRowSerializer(serializers.ModelSerializer):
+    # Rows are upserted on (owner, sku); without a sku a re-import would
+    # create the product again, since NULL never conflicts
+    sku = serializers.CharField(max_length=64)
+    image_urls = serializers.ListField(
+        child=serializers.URLField(),
+        required=False,
+        max_length=MAX_PRODUCT_IMAGES
+    )
+
+    class Meta:
+        model = Product
+        fields = ['sku', 'name', 'description', 'price',
+                  'category', 'stock_quantity', 'image_urls']
+        # Uniqueness is resolved by the upsert, not by per-row queries
+        validators = []
+
+
+def _csv_rows(stream):
+    for row in csv.DictReader(stream):
+        urls = (row.get('image_urls') or '').strip()
+        if urls:
+            row['image_urls'] = [
+                u.strip() for u in urls.split(CSV_IMAGE_SEPARATOR) if u.strip()]
+        else:
+            row.pop('image_urls', None)
+        yield row
+
+
+def _jsonl_rows(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield {'__error__': f'Invalid JSON: {e}'}
+
+
+def _until_unreadable(rows):
+    """
+    Pass rows through; text that isn't UTF-8 or malformed CSV becomes an
+    error row and ends the file, since the reader can't resume after it.
+    """
+    try:
+        yield from rows
+    except UnicodeDecodeError:
+        yield {'__error__': 'File is not UTF-8 text; rows from here on were not read'}
+    except csv.Error as e:
+        yield {'__error__': f'Malformed CSV ({e}); rows from here on were not read'}
+
+
+def read_rows(fileobj, file_format):
+    """Yield dict rows from a binary or text file object"""
+    if isinstance(fileobj.read(0), bytes):
+        # Django's UploadedFile wraps the real file object in .file
+        fileobj = io.TextIOWrapper(
+            getattr(fileobj, 'file', fileobj), encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        return _until_unreadable(_csv_rows(fileobj))
+    if file_format == 'jsonl':
+        return _until_unreadable(_jsonl_rows(fileobj))
+    raise ValueError(f'Unsupported format: {file_format}')
+
+
+def _upsert_chunk(owner, chunk, report):
+    """Validate one chunk of (row_number, row) pairs and upsert the valid rows"""
+    valid = []
+    for row_number, row in chunk:
+        if '__error__' in row:
+            report['errors'].append(
+                {'row': row_number, 'errors': {'row': [row['__error__']]}})
+            continue
+        serializer = ProductImportRowSerializer(data=row)
+        if serializer.is_valid():
+            valid.append(serializer.validated_data)
+        else:
+            report['errors'].append(
+                {'row': row_number, 'errors': serializer.errors})
+
+    if not valid:
+        return
+
+    # Later rows win when a sku appears twice in the same chunk
+    by_sku = {data['sku']: data for data in valid}
+    valid = list(by_sku.values())
+
+    existing = set(Product.objects.filter(
+        owner=owner, sku__in=list(by_sku)).values_list('sku', flat=True))
+
+    with_images, without_images = [], []
+    for data in valid:
+        image_urls = data.pop('image_urls', None)
+        product = Product(owner=owner, **data)
+        if image_urls is None:
+            without_images.append(product)
+        else:
+            product.image = image_urls[0] if image_urls else None
+            product._import_image_urls = image_urls
+            with_images.append(product)
+
+    with transaction.atomic():
+        # Rows without image_urls keep whatever images the product already has
+        if without_images:
+            without_images = Product.objects.bulk_create(
+                without_images,
+                update_conflicts=True,
+                unique_fields=['owner', 'sku'],
+                update_fields=UPSERT_FIELDS,
+            )
+        if with_images:
+            with_images = Product.objects.bulk_create(
+                with_images,
+                update_conflicts=True,
+                unique_fields=['owner', 'sku'],
+                update_fields=UPSERT_FIELDS + ['image'],
+            )
+            replaced = ProductImage.objects.filter(
+                product_id__in=[p.pk for p in with_images])
+            # Assets re-attached below are skipped when the queue is flushed
+            CloudinaryAssetDeletion.queue(
+                replaced.values_list('public_id', flat=True))
+            replaced.delete()
+            ProductImage.objects.bulk_create([
+                image
+                for p in with_images
+                for image in ProductImageService.build(p, p._import_image_urls)
+            ])
+
+    products = without_images + with_images
+    updated = sum(1 for p in products if p.sku in existing)
+    report['updated'] += updated
+    report['created'] += len(products) - updated
+
+
+def import_products(owner, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Upsert products for ``owner`` from an iterable of dict rows.
+
+    Returns ``{'created': n, 'updated': n, 'errors': [{'row': i, 'errors': {...}}]}``
+    where ``row`` is the 1-based data row number.
+    """
+    report = {'created': 0, 'updated': 0, 'errors': []}
+    chunk = []
+    for row_number, row in enumerate(rows, start=1):
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            _upsert_chunk(owner, chunk, report)
+            chunk = []
+    if chunk:
+        _upsert_chunk(owner, chunk, report)
+    return report
+
+
+def _export_records(queryset):
+    queryset = queryset.order_by('pk').prefetch_related('images')
+    for product in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'sku': product.sku,
+            'name': product.name,
+            'description': product.description,
+            'price': str(product.price),
+            'category': product.category,
+            'stock_quantity': product.stock_quantity,
+            'image_urls': [image.image_url for image in product.images.all()],
+        }
+
+
+class _Echo:
+    """File-like object whose write() just hands the value back (for csv.writer)"""
+
+    def write(self, value):
+        return value
+
+
+def export_products(queryset, file_format):
+    """Yield the queryset as CSV or JSONL text chunks"""
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for record in _export_records(queryset):
+            record['image_urls'] = CSV_IMAGE_SEPARATOR.join(record['image_urls'])
+            yield writer.writerow([record[field] for field in EXPORT_FIELDS])
+    elif file_format == 'jsonl':
+        for record in _export_records(queryset):
+            yield json.dumps(record) + '\n'
+    else:
+        raise ValueError(f'Unsupported format: {file_format}')
+
+
+def _order_rows(queryset):
+    queryset = queryset.select_related('product', 'buyer', 'seller').order_by(
+        '-created_at', '-id')
+    for order in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            order.id,
+            order.created_at.isoformat(),
+            order.status,
+            order.product_id,
+            order.product.name,
+            order.product.sku or '',
+            order.quantity,
+            order.total_price,
+            order.buyer.email,
+            order.seller.email,
+            order.shipping_address or '',
+            order.notes or '',
+        ]
+
+
+def _csv_cell(value):
+    # Buyers write notes and addresses; keep them from running as formulas
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_chunks(header, rows):
+    """Yield the header immediately, then EXPORT_ROWS_PER_CHUNK rows at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    buffer.seek(0)
+    buffer.truncate()
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(map(_csv_cell, row))
+        if index % EXPORT_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ZipStream:
+    """Unseekable sink for ZipFile; ``drain()`` hands back what was written"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        text = escape(_XML_INVALID_CHARS.sub('', str(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+    return f'<c><v>{value}</v></c>'
+
+
+def _xlsx_row(values):
+    return ('<row>' + ''.join(map(_xlsx_cell, values)) + '</row>').encode()
+
+
+def _xlsx_chunks(header, rows):
+    """
+    Yield an XLSX workbook as it is written. The worksheet is streamed row by
+    row into the zip (inline strings, no shared-string table to hold in memory).
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>')
+            sheet.write(_xlsx_row(header))
+            yield stream.drain()
+            for index, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if index % EXPORT_ROWS_PER_CHUNK == 0:
+                    yield stream.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield stream.drain()
+
+
+def export_orders(queryset, file_format):
+    """Yield the orders as CSV text or XLSX bytes chunks"""
+    if file_format == 'csv':
+        return _csv_chunks(ORDER_EXPORT_FIELDS, _order_rows(queryset))
+    if file_format == 'xlsx':
+        return _xlsx_chunks(ORDER_EXPORT_FIELDS, _order_rows(queryset))
+    raise ValueError(f'Unsupported format: {file_format}')
@@ -0,0 +1,127 @@
+"""
+Write-buffered product view counters and trending scores.
+
+Views are counted in memory per process and written every
+``VIEW_COUNTER_FLUSH_INTERVAL`` seconds by a daemon thread (and once more at
+exit) as a single ``UPDATE ... SET view_count = view_count + CASE id ... END``
+per batch, so a hot product never takes a row lock per request. A killed
+worker loses at most one flush interval of views. Flushes leave
+``updated_at`` alone, so conditional-GET caches stay valid.
+
+Popularity decays exponentially with ``POPULARITY_HALF_LIFE_HOURS``. Rather
+than rewriting every row as time passes, each view is weighted by
+``exp((t - POPULARITY_EPOCH) / tau)`` and the column stores the natural log
+of the weighted sum. Ordering by it equals ordering by the decayed count at
+any moment, and the log keeps the values small indefinitely.
+"""
+
+import atexit
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Case, F, FloatField, PositiveBigIntegerField, Value, When
+from django.db.models.functions import Exp, Greatest, Ln
+from django.utils import timezone
+
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+POPULARITY_EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+# Products per UPDATE statement
+FLUSH_BATCH_SIZE = 200
+
+
+def view_weight(views, at):
+    """ln(views * exp((at - epoch) / tau)), the log-space weight of ``views`` at ``at``"""
+    tau = settings.POPULARITY_HALF_LIFE_HOURS * 3600 / math.log(2)
+    return math.log(views) + (at - POPULARITY_EPOCH).total_seconds() / tau
+
+
+def _log_add(column, increment):
+    """ln(exp(column) + exp(increment)), shifted so exp() can't overflow"""
+    top = Greatest(column, increment)
+    return top + Ln(Exp(column - top) + Exp(increment - top))
+
+
+class ViewCounterBuffer:
+    """Per-process buffer of ``{product_id: views}``"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flusher_pid = None
+
+    def record(self, product_id, views=1):
+        interval = settings.VIEW_COUNTER_FLUSH_INTERVAL
+        with self._lock:
+            self._counts[product_id] += views
+            # Threads don't survive fork(), so start one per worker process
+            if interval > 0 and self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                threading.Thread(
+                    target=self._run, name='view-counter-flush', daemon=True).start()
+        if interval <= 0:
+            # Unbuffered mode: write through on the caller's connection
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def flush(self):
+        """Write the buffered views; returns the number of products updated"""
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        items = sorted(counts.items())
+        now = timezone.now()
+
+        for start in range(0, len(items), FLUSH_BATCH_SIZE):
+            batch = items[start:start + FLUSH_BATCH_SIZE]
+            try:
+                Product.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                    view_count=F('view_count') + Case(
+                        *[When(pk=pk, then=Value(views)) for pk, views in batch],
+                        output_field=PositiveBigIntegerField()),
+                    popularity=_log_add(F('popularity'), Case(
+                        *[When(pk=pk, then=Value(view_weight(views, now)))
+                          for pk, views in batch],
+                        output_field=FloatField())),
+                )
+            except Exception:
+                # Keep what wasn't written for the next flush
+                with self._lock:
+                    self._counts.update(dict(items[start:]))
+                raise
+        return len(items)
+
+    def _run(self):
+        while True:
+            interval = settings.VIEW_COUNTER_FLUSH_INTERVAL
+            time.sleep(interval if interval > 0 else 1)
+            if interval <= 0:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing product view counts failed")
+            finally:
+                close_old_connections()
+
+
+view_counter = ViewCounterBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Flushing product view counts at exit failed")
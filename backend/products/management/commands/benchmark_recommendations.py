@@ -0,0 +1,38 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from products.recommendations import TOP_K, purchase_matrix, similar_products
+
+
+class Command(BaseCommand):
+    help = "Time the recommendation computation on synthetic orders (no database)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000)
+        parser.add_argument('--buyers', type=int, default=100_000)
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        # Zipf-like popularity so a few products dominate, as in real sales
+        weights = 1.0 / np.arange(1, options['products'] + 1)
+        product_ids = rng.choice(
+            options['products'], size=options['orders'], p=weights / weights.sum())
+        buyer_ids = rng.integers(0, options['buyers'], size=options['orders'])
+
+        started = time.perf_counter()
+        X, _, products = purchase_matrix(buyer_ids, product_ids)
+        built = time.perf_counter()
+        lists = sum(1 for _ in similar_products(
+            X, np.arange(len(products)), k=options['top_k']))
+        finished = time.perf_counter()
+
+        self.stdout.write(
+            f"{options['orders']} orders, {X.nnz} buyer/product pairs, "
+            f"{len(products)} products\n"
+            f"matrix: {built - started:.2f}s, similarity + top-{options['top_k']}: "
+            f"{finished - built:.2f}s ({lists} lists)")
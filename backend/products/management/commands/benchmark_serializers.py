@@ -0,0 +1,71 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from authentication.models import CustomUser
+from products.models import Order, Product, ProductImage
+from products.serializers import (
+    OrderSerializer, OrderValuesSerializer, ProductSerializer, ProductValuesSerializer)
+
+
+class Command(BaseCommand):
+    help = ("Compare list serialization throughput of the model serializers and the "
+            "values() serializers on synthetic rows (rolled back afterwards)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def _best(self, serialize, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def _seed(self, rows):
+        seller = CustomUser.objects.create_user(
+            email='benchmark-seller@example.com', password=None,
+            first_name='Bench', last_name='Seller', role='seller')
+        buyer = CustomUser.objects.create_user(
+            email='benchmark-buyer@example.com', password=None)
+        products = Product.objects.bulk_create(
+            Product(name=f'Product {i}', description='Synthetic', price=Decimal('9.99'),
+                    category='plants', stock_quantity=10, owner=seller,
+                    image=f'https://example.com/{i}.jpg')
+            for i in range(rows))
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, image_url=f'https://example.com/{i}.jpg')
+            for i, product in enumerate(products))
+        Order.objects.bulk_create(
+            Order(product=product, buyer=buyer, seller=seller, quantity=1,
+                  total_price=product.price)
+            for product in products)
+        return seller
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+
+        with transaction.atomic():
+            seller = self._seed(rows)
+            products = Product.objects.filter(owner=seller)
+            orders = Order.objects.filter(seller=seller)
+            cases = [
+                ('products', lambda: ProductSerializer(
+                    products.select_related('owner').prefetch_related('images'),
+                    many=True).data,
+                 lambda: ProductValuesSerializer.serialize(products)),
+                ('orders', lambda: OrderSerializer(
+                    orders.select_related('product', 'buyer', 'seller'), many=True).data,
+                 lambda: OrderValuesSerializer.serialize(orders)),
+            ]
+            for name, model_serializer, values_serializer in cases:
+                before = self._best(model_serializer, repeat)
+                after = self._best(values_serializer, repeat)
+                self.stdout.write(
+                    f"{name}: {rows / before:,.0f} rows/s -> {rows / after:,.0f} rows/s "
+                    f"({before / after:.1f}x)")
+            transaction.set_rollback(True)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products.recommendations import MIN_SUPPORT, TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Rebuild \"frequently bought together\" lists from orders (incremental by default)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute every product instead of only changed ones')
+        parser.add_argument('--top-k', type=int, default=TOP_K)
+        parser.add_argument('--min-support', type=int, default=MIN_SUPPORT,
+                            help='Minimum number of shared buyers')
+
+    def handle(self, *args, **options):
+        written = build_recommendations(
+            full=options['full'], k=options['top_k'], min_support=options['min_support'])
+        self.stdout.write(self.style.SUCCESS(f"Updated {written} neighbour lists"))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import CustomUser
+from products.bulk import IMPORT_CHUNK_SIZE, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Upsert a seller's products from a CSV or JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--owner', required=True,
+                            help='Email of the seller who owns the products')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'],
+                            help='File format (defaults to the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            owner = CustomUser.objects.get(email=options['owner'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user with email {options['owner']}")
+
+        path = options['path']
+        file_format = options['file_format'] or path.rsplit('.', 1)[-1].lower()
+
+        with open(path, 'rb') as fileobj:
+            try:
+                rows = read_rows(fileobj, file_format)
+            except ValueError as e:
+                raise CommandError(str(e))
+            report = import_products(owner, rows, chunk_size=options['chunk_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']}, updated {report['updated']}, "
+            f"{len(report['errors'])} rows rejected"))
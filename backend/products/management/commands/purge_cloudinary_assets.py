@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from products.services import CloudinaryCleanupService
+
+
+class Command(BaseCommand):
+    help = "Delete queued, no longer referenced images from Cloudinary in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=CloudinaryCleanupService.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        deleted = CloudinaryCleanupService.flush(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} Cloudinary assets"))
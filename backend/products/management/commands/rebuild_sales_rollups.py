@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import CustomUser
+from products.services import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily seller sales rollups from the orders table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', help="Only rebuild this seller (email)")
+
+    def handle(self, *args, **options):
+        seller = None
+        if options['seller']:
+            try:
+                seller = CustomUser.objects.get(email=options['seller'])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"No user with email {options['seller']}")
+
+        written = SalesRollupService.rebuild(seller=seller)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup rows"))
@@ -1,5 +1,6 @@
 from django.db import models
 from authentication.models import CustomUser
+from uploads.processing import with_variants
 
 
 class Product(models.Model):
@@ -11,6 +12,9 @@ class Product(models.Model):
     ]
 
     name = models.CharField(max_length=200)
+    sku = models.CharField(
+        max_length=64, blank=True, null=True,
+        help_text="Seller's stock keeping unit, used by bulk import")
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
@@ -20,6 +24,10 @@ class Product(models.Model):
     owner = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name='products',
         null=True, blank=True)
+    view_count = models.PositiveBigIntegerField(default=0)
+    # ln of the exponentially decayed view count, relative to a fixed epoch
+    # (see products/counters.py); only meaningful for ordering
+    popularity = models.FloatField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,6 +36,27 @@ class Product(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['owner', 'sku'], name='unique_product_sku_per_owner'),
+        ]
+        indexes = [
+            # Default list ordering
+            models.Index(fields=['-created_at'], name='product_created_idx'),
+            # ?category= and ?owner= lists, my_products
+            models.Index(fields=['category', '-created_at'],
+                         name='product_category_created_idx'),
+            models.Index(fields=['owner', '-created_at'],
+                         name='product_owner_created_idx'),
+            # ?ordering=trending
+            models.Index(fields=['-popularity', '-id'], name='product_popularity_idx'),
+            # Index-only max(updated_at) for the list ETag
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
+
+
+# NOTE: Should match the MAX_IMAGES constant in the frontend ProductForm component.
+MAX_PRODUCT_IMAGES = 5
 
 
 class ProductImage(models.Model):
@@ -45,11 +74,37 @@ class ProductImage(models.Model):
 
     class Meta:
         ordering = ['order', 'created_at']
+        indexes = [
+            # Images prefetched per product, already in display order
+            models.Index(fields=['product', 'order', 'created_at'],
+                         name='productimage_product_order_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - Image {self.order}"
 
 
+class CloudinaryAssetDeletion(models.Model):
+    """Cloudinary assets no longer referenced, waiting to be deleted in batches"""
+    public_id = models.CharField(max_length=200, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return self.public_id
+
+    @classmethod
+    def queue(cls, public_ids):
+        # Responsive variants go with their full-size image
+        public_ids = [public_id for public_id in with_variants(public_ids) if public_id]
+        if public_ids:
+            cls.objects.bulk_create(
+                [cls(public_id=public_id) for public_id in public_ids],
+                ignore_conflicts=True)
+
+
 class Order(models.Model):
     """Model to store product orders"""
     STATUS_CHOICES = [
@@ -58,6 +113,13 @@ class Order(models.Model):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    # Status changes allowed by the bulk transition endpoint
+    TRANSITIONS = {
+        'pending': {'processing', 'completed', 'cancelled'},
+        'processing': {'completed', 'cancelled'},
+        'completed': set(),
+        'cancelled': set(),
+    }
 
     product = models.ForeignKey(
         Product,
@@ -85,6 +147,20 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # my_orders / buyer order history
+            models.Index(fields=['buyer', '-created_at'],
+                         name='order_buyer_created_idx'),
+            # my_sales, optionally filtered by status
+            models.Index(fields=['seller', 'status', '-created_at'],
+                         name='order_seller_status_idx'),
+            # Admin order list, optionally filtered by status
+            models.Index(fields=['-created_at'], name='order_created_idx'),
+            models.Index(fields=['status', '-created_at'],
+                         name='order_status_created_idx'),
+            # Incremental recommendation runs and the admin list ETag
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Order {self.id} - {self.product.name} by {self.buyer.email}"
@@ -94,3 +170,75 @@ class Order(models.Model):
         if not self.total_price:
             self.total_price = self.product.price * self.quantity
         super().save(*args, **kwargs)
+
+
+class SellerSalesRollup(models.Model):
+    """
+    Daily sales totals per (seller, product, day, status).
+
+    Maintained incrementally by ``SalesRollupService`` in the same
+    transaction as each order change; ``rebuild_sales_rollups`` recomputes
+    it from ``Order``.
+    """
+    seller = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='sales_rollups'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='sales_rollups'
+    )
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['seller', 'product', 'day', 'status'],
+                name='unique_sales_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['seller', 'day'], name='rollup_seller_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.seller_id} / {self.product_id} / {self.day} / {self.status}"
+
+
+class ProductNeighbors(models.Model):
+    """
+    Precomputed "frequently bought together" list for a product.
+
+    ``neighbors`` is ``[[product_id, score], ...]`` by descending cosine
+    similarity, written by the ``build_recommendations`` job.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='neighbors'
+    )
+    neighbors = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Neighbors of {self.product_id}"
+
+
+class RecommendationRun(models.Model):
+    """One run of the recommendation job; the last one is the watermark"""
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+    full = models.BooleanField(default=False)
+    products_updated = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Recommendation run at {self.started_at}"
@@ -0,0 +1,185 @@
+"""
+Item-item "frequently bought together" recommendations.
+
+Orders are reduced to a binary buyer x product sparse matrix ``X`` (1 when
+the buyer has a non-cancelled order for the product). The cosine similarity
+of products i and j is ``C[i, j] / sqrt(n[i] * n[j])``, where ``C = X.T @ X``
+counts shared buyers and ``n`` is each product's buyer count. Similarity rows
+are computed in blocks, pruned to the top k and stored in
+``ProductNeighbors``, so serving them is a primary-key lookup.
+
+Incremental runs only recompute the rows that can have changed: products
+with orders created or updated since the last run, plus every product
+co-purchased with them. They load just the purchases of those products'
+buyers, which is all a row needs; the buyer counts of their neighbours come
+from one aggregate query over all orders.
+"""
+
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from scipy import sparse
+
+from .models import Order, ProductNeighbors, RecommendationRun
+
+TOP_K = 20
+# Products need at least this many shared buyers to be related
+MIN_SUPPORT = 2
+BLOCK_SIZE = 1024
+FETCH_CHUNK_SIZE = 10000
+WRITE_BATCH_SIZE = 1000
+
+
+def purchase_matrix(buyer_ids, product_ids):
+    """
+    Binary CSR buyer x product matrix from parallel id arrays.
+
+    Returns ``(X, buyers, products)``; ``buyers[row]`` and ``products[column]``
+    are the ids behind each row and column.
+    """
+    buyers, buyer_codes = np.unique(buyer_ids, return_inverse=True)
+    products, product_codes = np.unique(product_ids, return_inverse=True)
+    X = sparse.csr_matrix(
+        (np.ones(len(buyer_codes), dtype=np.int32), (buyer_codes, product_codes)),
+        shape=(len(buyers), len(products)))
+    # Repeat purchases count once
+    X.sum_duplicates()
+    X.data[:] = 1
+    return X, buyers, products
+
+
+def similar_products(X, columns, k=TOP_K, min_support=MIN_SUPPORT, block_size=BLOCK_SIZE,
+                     buyer_counts=None):
+    """
+    Yield ``(column, neighbor_columns, scores)`` for each of ``columns``,
+    best first, keeping at most ``k`` neighbours per product.
+
+    ``X`` must hold every buyer of ``columns``. When it holds only those,
+    pass each column's overall ``buyer_counts``; by default they are counted
+    from ``X``.
+    """
+    if buyer_counts is None:
+        buyer_counts = np.asarray(X.sum(axis=0)).ravel()
+    by_product = X.T.tocsr()
+
+    for start in range(0, len(columns), block_size):
+        block = columns[start:start + block_size]
+        # Shared-buyer counts for this block of products against all products
+        shared = (by_product[block] @ X).tocsr()
+        for row, column in enumerate(block):
+            lo, hi = shared.indptr[row], shared.indptr[row + 1]
+            neighbors, counts = shared.indices[lo:hi], shared.data[lo:hi]
+            keep = (neighbors != column) & (counts >= min_support)
+            neighbors, counts = neighbors[keep], counts[keep]
+
+            scores = counts / np.sqrt(
+                float(buyer_counts[column]) * buyer_counts[neighbors])
+            if len(scores) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                neighbors, scores = neighbors[top], scores[top]
+            # Highest score first; ties broken by column for stable output
+            order = np.lexsort((neighbors, -scores))
+            yield column, neighbors[order], scores[order]
+
+
+def _pairs(orders):
+    pairs = orders.order_by().values_list('buyer_id', 'product_id').distinct()
+    flat = np.fromiter(
+        chain.from_iterable(pairs.iterator(chunk_size=FETCH_CHUNK_SIZE)),
+        dtype=np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def _ids(orders, field):
+    ids = orders.order_by().values_list(field, flat=True).distinct()
+    return np.fromiter(ids.iterator(chunk_size=FETCH_CHUNK_SIZE), dtype=np.int64)
+
+
+def _buyer_counts(orders, products):
+    """
+    Distinct buyers in ``orders`` of each product bought in the ``products``
+    orders, as an array aligned with their sorted ids
+    """
+    counts = dict(orders.filter(product_id__in=products.values('product_id')).values(
+        'product_id').annotate(buyers=Count('buyer_id', distinct=True)).values_list(
+        'product_id', 'buyers').order_by('product_id'))
+    return np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+
+
+def _touched(live, since):
+    """
+    Purchase matrix for an incremental run, covering only what orders
+    changed since ``since`` can affect.
+
+    Returns ``(X, products, columns, buyer_counts, dirty)``: ``columns`` are
+    the rows to recompute and ``dirty`` every product id whose row may have
+    changed, including products left without purchases.
+    """
+    changed = Order.objects.filter(updated_at__gte=since).order_by()
+    # The changed products, everything co-purchased with them, and everything
+    # else bought by the buyers involved (a cancelled purchase lowers their
+    # shared counts)
+    involved = live.filter(
+        Q(buyer_id__in=changed.values('buyer_id'))
+        | Q(buyer_id__in=live.filter(
+            product_id__in=changed.values('product_id')).values('buyer_id')))
+    dirty = np.union1d(_ids(changed, 'product_id'), _ids(involved, 'product_id'))
+
+    # A row needs every purchase of every buyer of its product
+    neighborhood = live.filter(buyer_id__in=live.filter(
+        Q(product_id__in=changed.values('product_id'))
+        | Q(product_id__in=involved.values('product_id'))).values('buyer_id'))
+    X, _, products = purchase_matrix(*_pairs(neighborhood))
+    columns = np.intersect1d(
+        products, dirty, assume_unique=True, return_indices=True)[1]
+    return X, products, columns, _buyer_counts(live, neighborhood), dirty
+
+
+def build_recommendations(full=False, k=TOP_K, min_support=MIN_SUPPORT):
+    """
+    Recompute and store neighbour lists; incremental unless ``full`` or
+    this is the first run. Returns the number of lists written.
+    """
+    started = timezone.now()
+    last_run = RecommendationRun.objects.first()
+    full = full or last_run is None
+
+    live = Order.objects.exclude(status='cancelled').order_by()
+
+    if full:
+        X, _, products = purchase_matrix(*_pairs(live))
+        columns = np.arange(len(products))
+        buyer_counts = None
+        emptied = np.array([], dtype=np.int64)
+    else:
+        X, products, columns, buyer_counts, dirty = _touched(live, last_run.started_at)
+        # Products whose last order was cancelled have no purchases left
+        emptied = np.setdiff1d(dirty, products)
+
+    rows = [
+        ProductNeighbors(
+            product_id=int(products[column]),
+            neighbors=[[int(products[n]), round(float(s), 4)]
+                       for n, s in zip(neighbors, scores)])
+        for column, neighbors, scores in similar_products(
+            X, columns, k, min_support, buyer_counts=buyer_counts)
+    ]
+    rows.extend(ProductNeighbors(product_id=int(product_id), neighbors=[])
+                for product_id in emptied)
+
+    with transaction.atomic():
+        if full:
+            ProductNeighbors.objects.all().delete()
+        ProductNeighbors.objects.bulk_create(
+            rows,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['neighbors', 'updated_at'],
+        )
+        RecommendationRun.objects.create(
+            started_at=started, full=full, products_updated=len(rows))
+    return len(rows)
@@ -1,34 +1,67 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Coalesce, Concat
 from rest_framework import serializers
-from .models import Product, ProductImage, Order
+from Backend.projections import ValuesSerializer
+from .models import MAX_PRODUCT_IMAGES, Product, ProductImage, Order
+from .services import (
+    InsufficientStock, ProductImageService, SalesRollupService, StockService)
 from authentication.models import CustomUser
+from uploads.processing import variant_urls
+
+# Upper bound on orders changed by one bulk status request
+BULK_STATUS_MAX_ORDERS = 500
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image_url', 'public_id', 'order']
+        fields = ['id', 'image_url', 'public_id', 'order', 'variants']
         read_only_fields = ['id']
 
+    def get_variants(self, obj):
+        return variant_urls(obj.image_url)
+
 
 class ProductSerializer(serializers.ModelSerializer):
     owner_name = serializers.SerializerMethodField()
     owner_email = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     images = ProductImageSerializer(many=True, read_only=True)
     image_urls = serializers.ListField(
         child=serializers.URLField(),
         write_only=True,
         required=False,
-        # NOTE: This value (max_length=5) should match the MAX_IMAGES constant in the frontend ProductForm component.
-        max_length=5,
+        max_length=MAX_PRODUCT_IMAGES,
         help_text="List of image URLs (max 5)"
     )
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'price', 'category', 'image',
-                  'images', 'image_urls', 'stock_quantity', 'owner', 'owner_name', 'owner_email',
+        fields = ['id', 'name', 'sku', 'description', 'price', 'category', 'image',
+                  'image_variants', 'images', 'image_urls', 'stock_quantity', 'owner', 'owner_name', 'owner_email',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at', 'images']
+        # The (owner, sku) constraint is checked in validate_sku; DRF's
+        # generated validator would otherwise default a missing owner to None
+        validators = []
+
+    def validate_sku(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        owner = self.instance.owner if self.instance else getattr(request, 'user', None)
+        duplicates = Product.objects.filter(owner=owner, sku=value)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if owner is not None and duplicates.exists():
+            raise serializers.ValidationError(
+                'You already have a product with this SKU')
+        return value
 
     def get_owner_name(self, obj):
         if not obj.owner:
@@ -40,20 +73,18 @@ class ProductSerializer(serializers.ModelSerializer):
             return "no-email@example.com"
         return obj.owner.email
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj.image)
+
     def create(self, validated_data):
         image_urls = validated_data.pop('image_urls', [])
-        product = Product.objects.create(**validated_data)
-
-        for index, url in enumerate(image_urls):
-            ProductImage.objects.create(
-                product=product,
-                image_url=url,
-                order=index
-            )
-
         if image_urls:
-            product.image = image_urls[0]
-            product.save()
+            validated_data['image'] = image_urls[0]
+
+        with transaction.atomic():
+            product = Product.objects.create(**validated_data)
+            ProductImage.objects.bulk_create(
+                ProductImageService.build(product, image_urls))
 
         return product
 
@@ -63,21 +94,47 @@ class ProductSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
-        if image_urls is not None:
-            instance.images.all().delete()
+        with transaction.atomic():
+            if image_urls is not None:
+                ProductImageService.sync(instance, image_urls)
+                # The dropped images are queued for deletion, so the cover goes too
+                instance.image = image_urls[0] if image_urls else None
 
-            for index, url in enumerate(image_urls):
-                ProductImage.objects.create(
-                    product=instance,
-                    image_url=url,
-                    order=index
-                )
+            instance.save()
+        return instance
 
-            if image_urls:
-                instance.image = image_urls[0]
 
-        instance.save()
-        return instance
+def _display_name(user):
+    """SQL version of the ``get_*_name`` methods for the ``user`` relation"""
+    return Case(
+        When(**{f'{user}__isnull': True}, then=Value('Anonymous')),
+        When(**{f'{user}__first_name': ''}, then=F(f'{user}__email')),
+        default=Concat(f'{user}__first_name', Value(' '), f'{user}__last_name'),
+        output_field=CharField())
+
+
+class ProductValuesSerializer(ValuesSerializer):
+    """``ProductSerializer`` output for list endpoints, from ``values()``"""
+    model = Product
+    fields = ('id', 'name', 'sku', 'description', 'price', 'category', 'image',
+              'stock_quantity', 'owner', 'created_at', 'updated_at')
+    annotations = {
+        'owner_name': _display_name('owner'),
+        'owner_email': Coalesce('owner__email', Value('no-email@example.com')),
+    }
+
+    def extend(self, data):
+        images = defaultdict(list)
+        for image in ProductImage.objects.filter(
+                product_id__in=[item['id'] for item in data]).values(
+                'product_id', 'id', 'image_url', 'public_id', 'order'):
+            product_id = image.pop('product_id')
+            image['variants'] = variant_urls(image['image_url'])
+            images[product_id].append(image)
+
+        for item in data:
+            item['image_variants'] = variant_urls(item['image'])
+            item['images'] = images[item['id']]
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -118,8 +175,8 @@ class OrderSerializer(serializers.ModelSerializer):
         product = data.get('product')
         quantity = data.get('quantity', 1)
 
-        # Check if product has enough stock
-        if product.stock_quantity < quantity:
+        # Check if product has enough stock (updates only touch status and notes)
+        if product is not None and product.stock_quantity < quantity:
             raise serializers.ValidationError({
                 'quantity': f'Only {product.stock_quantity} items available in stock'
             })
@@ -134,11 +191,102 @@ class OrderSerializer(serializers.ModelSerializer):
         validated_data['seller'] = product.owner
         validated_data['total_price'] = product.price * quantity
 
-        # Create order
-        order = Order.objects.create(**validated_data)
-
-        # Reduce stock
-        product.stock_quantity -= quantity
-        product.save()
+        # Reduce stock with a conditional UPDATE so concurrent orders can't oversell
+        with transaction.atomic():
+            try:
+                StockService.reserve(product.pk, quantity)
+            except InsufficientStock as exc:
+                raise serializers.ValidationError({'quantity': str(exc)})
+            order = Order.objects.create(**validated_data)
+            SalesRollupService.record([order])
 
         return order
+
+
+class OrderValuesSerializer(ValuesSerializer):
+    """``OrderSerializer`` output for list endpoints, from ``values()``"""
+    model = Order
+    fields = ('id', 'product', 'buyer', 'seller', 'quantity', 'total_price', 'status',
+              'shipping_address', 'notes', 'created_at', 'updated_at')
+    annotations = {
+        'product_name': F('product__name'),
+        'product_image': F('product__image'),
+        'product_price': F('product__price'),
+        'buyer_name': _display_name('buyer'),
+        'buyer_email': F('buyer__email'),
+        'seller_name': _display_name('seller'),
+        'seller_email': F('seller__email'),
+    }
+    representations = {
+        'product_price': serializers.DecimalField(max_digits=10, decimal_places=2),
+    }
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_STATUS_MAX_ORDERS
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class CheckoutItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """Place orders for several products at once (cart checkout)"""
+    items = CheckoutItemSerializer(many=True, allow_empty=False)
+    shipping_address = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(
+        required=False, allow_blank=True, allow_null=True)
+
+    def validate_items(self, items):
+        # Merge duplicate lines, keeping the cart order
+        quantities = {}
+        for item in items:
+            quantities[item['product']] = quantities.get(
+                item['product'], 0) + item['quantity']
+
+        products = Product.objects.select_related(
+            'owner').in_bulk(list(quantities))
+        missing = [pk for pk in quantities if pk not in products]
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid product ids: {missing}')
+        orphaned = [pk for pk in quantities if products[pk].owner is None]
+        if orphaned:
+            raise serializers.ValidationError(
+                f'Products without a seller cannot be ordered: {orphaned}')
+
+        return [(products[pk], quantity) for pk, quantity in quantities.items()]
+
+    def create(self, validated_data):
+        lines = validated_data['items']
+        buyer = validated_data['buyer']
+
+        with transaction.atomic():
+            try:
+                StockService.reserve_many(
+                    {product.pk: quantity for product, quantity in lines})
+            except InsufficientStock as exc:
+                raise serializers.ValidationError(
+                    {'items': {exc.product_id: str(exc)}})
+
+            orders = Order.objects.bulk_create([
+                Order(
+                    product=product,
+                    buyer=buyer,
+                    seller=product.owner,
+                    quantity=quantity,
+                    total_price=product.price * quantity,
+                    shipping_address=validated_data.get('shipping_address'),
+                    notes=validated_data.get('notes'),
+                )
+                for product, quantity in lines
+            ])
+            SalesRollupService.record(orders)
+            return orders
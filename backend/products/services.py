@@ -0,0 +1,483 @@
+import logging
+from collections import defaultdict, deque
+from datetime import timedelta
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import cloudinary.api
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from uploads.processing import upload_image, with_variants
+from uploads.services import cloudinary_public_id
+from .models import (
+    CloudinaryAssetDeletion, Order, Product, ProductImage, SellerSalesRollup)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_BATCH_SIZE = 1000
+
+# Shared, bounded pool so concurrent requests can't spawn unbounded threads
+_upload_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_UPLOAD_MAX_WORKERS,
+    thread_name_prefix='cloudinary-upload')
+
+
+class InsufficientStock(Exception):
+    """Raised when a product cannot cover the requested quantity"""
+
+    def __init__(self, product_id, available):
+        self.product_id = product_id
+        self.available = available
+        super().__init__(
+            f'Only {available} items available in stock')
+
+
+class StockService:
+    """
+    Stock changes are done as single conditional UPDATE statements
+    (``SET stock = stock - n WHERE stock >= n``) so concurrent buyers
+    can never oversell, and only the stock column is rewritten.
+    """
+
+    @staticmethod
+    def reserve(product_id, quantity):
+        """Atomically take ``quantity`` units, raising InsufficientStock if short"""
+        updated = Product.objects.filter(
+            pk=product_id, stock_quantity__gte=quantity
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            available = Product.objects.filter(
+                pk=product_id).values_list('stock_quantity', flat=True).first()
+            raise InsufficientStock(product_id, available or 0)
+
+    @staticmethod
+    def release(product_id, quantity):
+        """Atomically give ``quantity`` units back to the product"""
+        Product.objects.filter(pk=product_id).update(
+            stock_quantity=F('stock_quantity') + quantity,
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def release_many(quantities):
+        """Give stock back for ``{product_id: quantity}`` in one UPDATE"""
+        if not quantities:
+            return
+        Product.objects.filter(pk__in=list(quantities)).update(
+            stock_quantity=F('stock_quantity') + Case(
+                *[When(pk=product_id, then=Value(quantity))
+                  for product_id, quantity in sorted(quantities.items())],
+                output_field=IntegerField()),
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def reserve_many(quantities):
+        """
+        Reserve stock for ``{product_id: quantity}`` all-or-nothing.
+
+        Must run inside a transaction; products are updated in id order so
+        overlapping checkouts always take row locks in the same order.
+        """
+        assert transaction.get_connection().in_atomic_block, \
+            'reserve_many() must be called inside transaction.atomic()'
+        for product_id in sorted(quantities):
+            StockService.reserve(product_id, quantities[product_id])
+
+
+class SalesRollupService:
+    """
+    Keep ``SellerSalesRollup`` in step with orders.
+
+    Call it inside the transaction that changes the orders. Deltas are summed
+    per (seller, product, day, status) bucket and applied as
+    ``SET n = n + delta`` updates, so concurrent writers never lose counts.
+    """
+
+    @staticmethod
+    def _bucket(order, order_status):
+        return (order.seller_id, order.product_id,
+                timezone.localdate(order.created_at), order_status)
+
+    @staticmethod
+    def _apply(deltas):
+        for (seller_id, product_id, day, order_status), delta in deltas.items():
+            order_count, units, revenue = delta
+            if not (order_count or units or revenue):
+                continue
+            bucket = SellerSalesRollup.objects.filter(
+                seller_id=seller_id, product_id=product_id,
+                day=day, status=order_status)
+            changes = {
+                'order_count': F('order_count') + order_count,
+                'units': F('units') + units,
+                'revenue': F('revenue') + revenue,
+            }
+            if bucket.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    SellerSalesRollup.objects.create(
+                        seller_id=seller_id, product_id=product_id,
+                        day=day, status=order_status, order_count=order_count,
+                        units=units, revenue=revenue)
+            except IntegrityError:
+                # Another transaction created the bucket first
+                bucket.update(**changes)
+
+    @staticmethod
+    def _add(deltas, order, order_status, sign):
+        delta = deltas[SalesRollupService._bucket(order, order_status)]
+        delta[0] += sign
+        delta[1] += sign * order.quantity
+        delta[2] += sign * order.total_price
+
+    @staticmethod
+    def record(orders):
+        """Add newly created orders to their buckets"""
+        deltas = defaultdict(lambda: [0, 0, Decimal('0')])
+        for order in orders:
+            SalesRollupService._add(deltas, order, order.status, 1)
+        SalesRollupService._apply(deltas)
+
+    @staticmethod
+    def remove(orders):
+        """Take deleted orders out of their buckets"""
+        deltas = defaultdict(lambda: [0, 0, Decimal('0')])
+        for order in orders:
+            SalesRollupService._add(deltas, order, order.status, -1)
+        SalesRollupService._apply(deltas)
+
+    @staticmethod
+    def transition(changes):
+        """Move orders between status buckets: ``[(order, old, new), ...]``"""
+        deltas = defaultdict(lambda: [0, 0, Decimal('0')])
+        for order, old_status, new_status in changes:
+            if old_status == new_status:
+                continue
+            SalesRollupService._add(deltas, order, old_status, -1)
+            SalesRollupService._add(deltas, order, new_status, 1)
+        SalesRollupService._apply(deltas)
+
+    @staticmethod
+    def change(changes):
+        """
+        Apply edited orders: ``[(old, new), ...]`` where ``old`` is the order
+        as stored before the edit. Any of status, product, seller, quantity
+        and total price may differ.
+        """
+        deltas = defaultdict(lambda: [0, 0, Decimal('0')])
+        for old, new in changes:
+            SalesRollupService._add(deltas, old, old.status, -1)
+            SalesRollupService._add(deltas, new, new.status, 1)
+        SalesRollupService._apply(deltas)
+
+    @staticmethod
+    def rebuild(seller=None):
+        """
+        Recompute the rollups from ``Order`` (for one seller, or everyone).
+
+        Returns the number of buckets written.
+        """
+        orders = Order.objects.all()
+        rollups = SellerSalesRollup.objects.all()
+        if seller is not None:
+            orders = orders.filter(seller=seller)
+            rollups = rollups.filter(seller=seller)
+
+        buckets = orders.order_by().annotate(
+            day=TruncDate('created_at')
+        ).values('seller_id', 'product_id', 'day', 'status').annotate(
+            order_count=Count('id'),
+            units=Sum('quantity'),
+            revenue=Sum('total_price'),
+        )
+
+        with transaction.atomic():
+            rollups.delete()
+            created = SellerSalesRollup.objects.bulk_create(
+                (SellerSalesRollup(**bucket) for bucket in buckets.iterator()),
+                batch_size=ROLLUP_BATCH_SIZE)
+        return len(created)
+
+
+class OrderStatusService:
+
+    @staticmethod
+    def save(order, save):
+        """
+        Run ``save()`` for an edited order and apply the edit to the sales
+        rollups. Must run inside a transaction; the stored row is locked and
+        read first, so status, product, quantity or price may all change.
+        """
+        assert transaction.get_connection().in_atomic_block, \
+            'save() must be called inside transaction.atomic()'
+        old = Order.objects.select_for_update().get(pk=order.pk)
+        order = save() or order
+        SalesRollupService.change([(old, order)])
+        return order
+
+    @staticmethod
+    def delete(orders):
+        """Delete the ``orders`` queryset and take it out of the sales rollups"""
+        with transaction.atomic():
+            deleted = list(orders.select_for_update())
+            Order.objects.filter(pk__in=[order.pk for order in deleted]).delete()
+            SalesRollupService.remove(deleted)
+        return len(deleted)
+
+    @staticmethod
+    def bulk_transition(user, order_ids, new_status):
+        """
+        Move many orders to ``new_status`` at once.
+
+        Ownership and ``Order.TRANSITIONS`` are checked with one locking read,
+        the eligible orders are changed with a single UPDATE, and stock for
+        cancellations is restored with one aggregated update. Returns one
+        outcome per requested id, in request order.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        with transaction.atomic():
+            orders = Order.objects.select_for_update().filter(pk__in=order_ids)
+            if user.role != 'admin':
+                orders = orders.filter(seller=user)
+            orders = orders.in_bulk()
+
+            outcomes, eligible = {}, []
+            for order_id in order_ids:
+                order = orders.get(order_id)
+                if order is None:
+                    outcomes[order_id] = {'id': order_id, 'ok': False, 'error': 'Not found'}
+                elif new_status not in Order.TRANSITIONS[order.status]:
+                    outcomes[order_id] = {
+                        'id': order_id, 'ok': False,
+                        'error': f'Cannot change a {order.status} order to {new_status}'}
+                else:
+                    eligible.append(order)
+
+            if eligible:
+                # Status guard repeated in the UPDATE in case the row lock is a no-op
+                sources = [s for s, targets in Order.TRANSITIONS.items() if new_status in targets]
+                updated = Order.objects.filter(
+                    pk__in=[order.pk for order in eligible], status__in=sources
+                ).update(status=new_status, updated_at=timezone.now())
+                if updated != len(eligible):
+                    # Another request changed some of them after the read, and
+                    # the UPDATE can't tell which; undo it rather than release
+                    # stock for orders this call didn't move
+                    transaction.set_rollback(True)
+                    for order in eligible:
+                        outcomes[order.pk] = {
+                            'id': order.pk, 'ok': False,
+                            'error': 'Order was changed by another request, try again'}
+                    return [outcomes[order_id] for order_id in order_ids]
+
+                if new_status == 'cancelled':
+                    released = defaultdict(int)
+                    for order in eligible:
+                        released[order.product_id] += order.quantity
+                    StockService.release_many(released)
+                SalesRollupService.transition(
+                    (order, order.status, new_status) for order in eligible)
+
+            for order in eligible:
+                outcomes[order.pk] = {
+                    'id': order.pk, 'ok': True,
+                    'previous_status': order.status, 'status': new_status}
+
+        return [outcomes[order_id] for order_id in order_ids]
+
+
+# Annotation names can't shadow the rollup's own columns
+_ROLLUP_SUMS = {
+    'total_orders': Sum('order_count'),
+    'total_units': Sum('units'),
+    'total_revenue': Sum('revenue'),
+}
+
+
+def _totals(row):
+    return {
+        'orders': row.get('total_orders') or 0,
+        'units': row.get('total_units') or 0,
+        # SQLite's SUM drops the decimal scale
+        'revenue': str(Decimal(row.get('total_revenue') or 0).quantize(Decimal('0.01'))),
+    }
+
+
+def sales_report(seller, start, end, product_id=None, order_status=None):
+    """
+    Seller sales between ``start`` and ``end`` (inclusive dates), answered
+    from the daily rollups: per day (zero-filled), per product and per status.
+    """
+    rollups = SellerSalesRollup.objects.filter(
+        seller=seller, day__range=(start, end)).order_by()
+    if product_id is not None:
+        rollups = rollups.filter(product_id=product_id)
+    if order_status:
+        rollups = rollups.filter(status=order_status)
+
+    by_day = {
+        row['day']: _totals(row)
+        for row in rollups.values('day').annotate(**_ROLLUP_SUMS)
+    }
+    no_sales = _totals({})
+    days = (start + timedelta(days=n) for n in range((end - start).days + 1))
+    by_product = rollups.values('product_id', 'product__name').annotate(
+        **_ROLLUP_SUMS).order_by('-total_revenue', 'product_id')
+
+    return {
+        'from': start,
+        'to': end,
+        'totals': _totals(rollups.aggregate(**_ROLLUP_SUMS)),
+        'days': [{'day': day, **by_day.get(day, no_sales)} for day in days],
+        'products': [
+            {'product': row['product_id'], 'product_name': row['product__name'],
+             **_totals(row)}
+            for row in by_product
+        ],
+        'statuses': {
+            row['status']: _totals(row)
+            for row in rollups.values('status').annotate(**_ROLLUP_SUMS)
+        },
+    }
+
+
+class ProductImageService:
+
+    @staticmethod
+    def build(product, image_urls, start=0):
+        """Unsaved ProductImage rows for ``image_urls`` (for bulk_create)"""
+        return [
+            ProductImage(
+                product=product,
+                image_url=url,
+                public_id=cloudinary_public_id(url),
+                order=start + index
+            )
+            for index, url in enumerate(image_urls)
+        ]
+
+    @staticmethod
+    def sync(product, image_urls):
+        """
+        Make the product's images match ``image_urls`` with an ordered diff.
+
+        Unchanged images keep their row, moved ones get one bulk order update,
+        new ones are bulk-created and removed ones bulk-deleted, with their
+        Cloudinary assets queued for deletion.
+        """
+        pool = defaultdict(deque)
+        for image in product.images.all():
+            pool[image.image_url].append(image)
+
+        to_create, to_move = [], []
+        for index, url in enumerate(image_urls):
+            if pool[url]:
+                image = pool[url].popleft()
+                if image.order != index:
+                    image.order = index
+                    to_move.append(image)
+            else:
+                to_create.extend(ProductImageService.build(product, [url], start=index))
+        removed = [image for images in pool.values() for image in images]
+
+        with transaction.atomic():
+            if removed:
+                ProductImage.objects.filter(
+                    pk__in=[image.pk for image in removed]).delete()
+                CloudinaryAssetDeletion.queue(
+                    image.public_id for image in removed)
+            if to_move:
+                ProductImage.objects.bulk_update(to_move, ['order'])
+            if to_create:
+                ProductImage.objects.bulk_create(to_create)
+
+
+class CloudinaryCleanupService:
+    # Cloudinary's delete_resources accepts at most 100 public ids per call
+    BATCH_SIZE = 100
+
+    @staticmethod
+    def flush(batch_size=BATCH_SIZE):
+        """
+        Delete queued assets from Cloudinary in batches.
+
+        Assets that are referenced again (e.g. re-attached to a product) are
+        dropped from the queue without being deleted. Returns the number of
+        assets deleted; a failed batch stays queued for the next run.
+        """
+        deleted = 0
+        while True:
+            batch = list(CloudinaryAssetDeletion.objects.values_list(
+                'public_id', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+
+            in_use = set(with_variants(ProductImage.objects.filter(
+                public_id__in=batch).values_list('public_id', flat=True)))
+            to_delete = [public_id for public_id in batch if public_id not in in_use]
+
+            if to_delete:
+                try:
+                    cloudinary.api.delete_resources(to_delete)
+                except Exception as e:
+                    logger.warning("Cloudinary batch deletion failed: %s", e)
+                    return deleted
+
+            CloudinaryAssetDeletion.objects.filter(public_id__in=batch).delete()
+            deleted += len(to_delete)
+
+    @staticmethod
+    def queue_late_upload(future):
+        """
+        Done-callback for an upload the caller stopped waiting for: nothing
+        will reference the asset, so it is queued for deletion.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            CloudinaryAssetDeletion.queue([future.result()['public_id']])
+        except Exception as e:
+            logger.warning("Could not queue late upload for deletion: %s", e)
+
+
+class CloudinaryUploadService:
+
+    @staticmethod
+    def upload_many(files, folder, timeout=None):
+        """
+        Process and upload files concurrently on the shared thread pool.
+
+        Returns one result per file, in the original order: either
+        ``{'name', 'image_url', 'public_id', 'variants'}`` or ``{'name', 'error'}``.
+        ``timeout`` bounds the whole batch, counted from submission.
+        """
+        timeout = timeout or settings.IMAGE_UPLOAD_TIMEOUT
+        futures = [
+            _upload_executor.submit(upload_image, image_file, folder)
+            for image_file in files
+        ]
+        _, pending = wait(futures, timeout=timeout)
+        for future in pending:
+            # A running upload can't be stopped; clean up after it instead
+            if not future.cancel():
+                future.add_done_callback(CloudinaryCleanupService.queue_late_upload)
+
+        results = []
+        for image_file, future in zip(files, futures):
+            name = getattr(image_file, 'name', None)
+            if future in pending:
+                results.append({'name': name, 'error': 'Upload timed out'})
+            elif future.exception() is not None:
+                results.append({'name': name, 'error': str(future.exception())})
+            else:
+                results.append({'name': name, **future.result()})
+        return results
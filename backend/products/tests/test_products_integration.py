@@ -6,7 +6,8 @@ from products.models import Product, Order, ProductImage
 from authentication.models import CustomUser
 from django.utils import timezone
 from decimal import Decimal
-from io import BytesIO
+from io import BytesIO, StringIO
+from django.core.management import call_command
 from PIL import Image as PILImage
 
 pytestmark = pytest.mark.django_db
@@ -21,6 +22,12 @@ def client():
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def unbuffered_view_counts(settings):
+    # Write product views through rather than starting the flush thread
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = 0
+
+
 @pytest.fixture
 def seller(db):
     return CustomUser.objects.create_user(
@@ -838,3 +845,1588 @@ def test_order_buyer_and_seller_names(client, buyer, product):
     # Buyer has first_name and last_name
     assert data['buyer_name'] == 'Jane Buyer'
     assert data['buyer_email'] == buyer.email
+
+
+# ------------------------------------------------------
+# Conditional GET (ETag / Last-Modified)
+# ------------------------------------------------------
+
+def test_product_list_returns_etag_and_304(client, product):
+    url = reverse('product-list')
+    response = client.get(url)
+
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert not response.has_header('Last-Modified')
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response.content == b''
+
+
+def test_product_list_etag_changes_after_update(client, product):
+    url = reverse('product-list')
+    etag = client.get(url)['ETag']
+
+    product.name = 'Renamed'
+    product.save()
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+
+def test_product_list_etag_changes_after_delete(client, seller, product):
+    Product.objects.create(
+        name="Second", description="d", price="1.00",
+        category="tools", owner=seller)
+    url = reverse('product-list')
+    etag = client.get(url)['ETag']
+
+    product.delete()
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_product_list_ignores_if_modified_since_after_delete(client, seller, product):
+    latest = Product.objects.create(
+        name="Second", description="d", price="1.00",
+        category="tools", owner=seller)
+    url = reverse('product-list')
+    # The newest change the client has seen in the list
+    since = client.get(reverse('product-detail', kwargs={'pk': latest.pk}))['Last-Modified']
+
+    # Deleting an older row leaves max(updated_at) as it was
+    product.delete()
+
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_product_list_etag_depends_on_filters(client, product):
+    url = reverse('product-list')
+    etag = client.get(url)['ETag']
+
+    response = client.get(url + '?category=tools', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+
+def test_product_detail_304(client, product):
+    url = reverse('product-detail', kwargs={'pk': product.pk})
+    etag = client.get(url)['ETag']
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+def test_my_sales_304(client, seller, buyer, product):
+    Order.objects.create(
+        product=product, buyer=buyer, seller=seller,
+        quantity=1, total_price=Decimal('50.00'))
+    client.force_authenticate(user=seller)
+    url = reverse('order-my-sales')
+    etag = client.get(url)['ETag']
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+
+# ------------------------------------------------------
+# Atomic stock + cart checkout
+# ------------------------------------------------------
+
+@pytest.fixture
+def second_product(seller):
+    return Product.objects.create(
+        name="Second Product",
+        description="Another one",
+        price=Decimal("5.00"),
+        category="tools",
+        stock_quantity=3,
+        owner=seller
+    )
+
+
+def test_checkout_creates_orders_and_reserves_stock(client, buyer, product, second_product):
+    client.force_authenticate(user=buyer)
+
+    url = reverse('order-checkout')
+    data = {
+        'items': [
+            {'product': product.id, 'quantity': 2},
+            {'product': second_product.id, 'quantity': 3},
+            {'product': product.id, 'quantity': 1},
+        ],
+        'shipping_address': '1 Cart Street'
+    }
+    response = client.post(url, data, format='json')
+
+    assert response.status_code == 201
+    body = response.json()
+    assert [o['product'] for o in body] == [product.id, second_product.id]
+    assert body[0]['quantity'] == 3
+    assert Decimal(body[0]['total_price']) == Decimal('150.00')
+    assert Order.objects.filter(buyer=buyer).count() == 2
+
+    product.refresh_from_db()
+    second_product.refresh_from_db()
+    assert product.stock_quantity == 7
+    assert second_product.stock_quantity == 0
+
+
+def test_checkout_is_all_or_nothing(client, buyer, product, second_product):
+    client.force_authenticate(user=buyer)
+
+    url = reverse('order-checkout')
+    data = {'items': [
+        {'product': product.id, 'quantity': 2},
+        {'product': second_product.id, 'quantity': 4},
+    ]}
+    response = client.post(url, data, format='json')
+
+    assert response.status_code == 400
+    assert 'items' in response.json()
+    assert Order.objects.count() == 0
+    product.refresh_from_db()
+    assert product.stock_quantity == 10
+
+
+def test_checkout_rejects_unknown_product(client, buyer):
+    client.force_authenticate(user=buyer)
+
+    response = client.post(
+        reverse('order-checkout'),
+        {'items': [{'product': 999999, 'quantity': 1}]},
+        format='json')
+
+    assert response.status_code == 400
+
+
+def test_cancel_order_twice_restores_stock_once(client, buyer, product):
+    order = Order.objects.create(
+        product=product, buyer=buyer, seller=product.owner,
+        quantity=4, total_price=Decimal('200.00'))
+    client.force_authenticate(user=buyer)
+    url = reverse('order-detail', kwargs={'pk': order.pk})
+
+    assert client.delete(url).status_code == 200
+    assert client.delete(url).status_code == 400
+
+    product.refresh_from_db()
+    assert product.stock_quantity == 14
+
+
+@pytest.mark.django_db(transaction=True)
+def test_no_oversell_with_100_parallel_buyers(seller):
+    """100 buyers race for 25 units; exactly 25 orders may be placed"""
+    import threading
+    import time
+    from django.db import connection, OperationalError
+
+    stock = 25
+    MAX_ATTEMPTS = 10
+    product = Product.objects.create(
+        name="Hot item", description="d", price=Decimal("1.00"),
+        category="plants", stock_quantity=stock, owner=seller)
+    buyers = [
+        CustomUser.objects.create_user(
+            email=f"racer{i}@test.com", password=None, role="plant_owner")
+        for i in range(100)
+    ]
+
+    barrier = threading.Barrier(len(buyers))
+    results = []
+
+    def bought(user):
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return Order.objects.filter(product=product, buyer=user).exists()
+            except OperationalError:
+                time.sleep(0.01 * (attempt + 1))
+        raise AssertionError(f"could not read {user.email}'s orders")
+
+    def buy(user):
+        api = APIClient()
+        api.force_authenticate(user=user)
+        barrier.wait()
+        try:
+            # SQLite reports lock contention as an error instead of blocking;
+            # the atomic block rolled the attempt back, so retry a few times.
+            for attempt in range(MAX_ATTEMPTS):
+                try:
+                    status_code = api.post(
+                        reverse('order-list'),
+                        {'product': product.id, 'quantity': 1},
+                        format='json').status_code
+                except OperationalError:
+                    status_code = 500
+                if status_code != 500:
+                    break
+                # The error can also hit after the order committed; retrying
+                # then would buy twice
+                if bought(user):
+                    status_code = 201
+                    break
+                time.sleep(0.01 * (attempt + 1))
+            results.append(status_code)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=buy, args=(u,)) for u in buyers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    product.refresh_from_db()
+    # Lock errors can also hit after commit (while rendering the response),
+    # so the invariant is checked on the database rather than on responses.
+    orders = Order.objects.filter(product=product)
+    assert product.stock_quantity == 0
+    assert orders.count() == stock
+    # Nobody bought twice, and every buyer got a definite answer
+    assert orders.values('buyer').distinct().count() == stock
+    assert 500 not in results
+    assert results.count(201) == stock
+    assert results.count(400) == len(buyers) - stock
+
+
+# ------------------------------------------------------
+# Bulk import / export
+# ------------------------------------------------------
+
+def _upload(name, content):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    return SimpleUploadedFile(name, content.encode(), content_type='text/plain')
+
+
+def test_bulk_import_csv_upserts_and_reports_errors(client, seller):
+    Product.objects.create(
+        name="Old name", sku="SKU-1", description="d", price="1.00",
+        category="plants", stock_quantity=1, owner=seller)
+    client.force_authenticate(user=seller)
+
+    csv_content = (
+        "sku,name,description,price,category,stock_quantity,image_urls\n"
+        "SKU-1,New name,desc,9.99,plants,4,https://example.com/a.jpg|https://example.com/b.jpg\n"
+        "SKU-2,Rake,desc,15.00,tools,7,\n"
+        "SKU-3,Broken,desc,not-a-price,tools,1,\n"
+    )
+    response = client.post(
+        reverse('product-bulk-import'),
+        {'file': _upload('catalogue.csv', csv_content)},
+        format='multipart')
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['created'] == 1
+    assert report['updated'] == 1
+    assert [e['row'] for e in report['errors']] == [3]
+    assert 'price' in report['errors'][0]['errors']
+
+    updated = Product.objects.get(owner=seller, sku='SKU-1')
+    assert updated.name == 'New name'
+    assert updated.stock_quantity == 4
+    assert updated.image == 'https://example.com/a.jpg'
+    assert list(updated.images.values_list('image_url', flat=True)) == [
+        'https://example.com/a.jpg', 'https://example.com/b.jpg']
+    assert Product.objects.filter(owner=seller).count() == 2
+
+
+def test_bulk_import_jsonl(client, seller):
+    client.force_authenticate(user=seller)
+    jsonl = (
+        '{"sku": "J1", "name": "Pot", "description": "d", "price": "3.00", "category": "tools"}\n'
+        'not json\n'
+    )
+    response = client.post(
+        reverse('product-bulk-import'),
+        {'file': _upload('catalogue.jsonl', jsonl)},
+        format='multipart')
+
+    assert response.status_code == 200
+    assert response.json()['created'] == 1
+    assert response.json()['errors'][0]['row'] == 2
+
+
+def test_bulk_import_reports_unreadable_files(client, seller):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    client.force_authenticate(user=seller)
+    latin1 = (
+        "sku,name,description,price,category,stock_quantity\n"
+        "L1,Pot,d,3.00,tools,1\n"
+        "L2,Caf\u00e9 table,d,3.00,tools,1\n"
+    ).encode('latin-1')
+    response = client.post(
+        reverse('product-bulk-import'),
+        {'file': SimpleUploadedFile('catalogue.csv', latin1)},
+        format='multipart')
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report['created'] == 0
+    assert 'UTF-8' in report['errors'][0]['errors']['row'][0]
+
+    malformed = "sku,name\nM1," + "x" * 200000 + "\n"
+    response = client.post(
+        reverse('product-bulk-import'),
+        {'file': _upload('catalogue.csv', malformed)},
+        format='multipart')
+
+    assert response.status_code == 200
+    assert 'Malformed CSV' in response.json()['errors'][0]['errors']['row'][0]
+    assert not Product.objects.filter(owner=seller).exists()
+
+
+def test_bulk_import_requires_a_sku(client, seller):
+    client.force_authenticate(user=seller)
+    csv_content = (
+        "sku,name,description,price,category,stock_quantity\n"
+        ",No sku,d,2.00,plants,1\n"
+        "S1,Seeds,d,2.00,plants,1\n"
+    )
+
+    for _ in range(2):
+        response = client.post(
+            reverse('product-bulk-import'),
+            {'file': _upload('catalogue.csv', csv_content)},
+            format='multipart')
+        assert response.status_code == 200
+        assert [e['row'] for e in response.json()['errors']] == [1]
+        assert 'sku' in response.json()['errors'][0]['errors']
+
+    assert list(Product.objects.filter(owner=seller).values_list('sku', flat=True)) == ['S1']
+
+
+def test_bulk_import_requires_seller(client, buyer):
+    client.force_authenticate(user=buyer)
+    response = client.post(
+        reverse('product-bulk-import'),
+        {'file': _upload('catalogue.csv', 'sku,name\n')},
+        format='multipart')
+
+    assert response.status_code == 403
+
+
+def test_export_streams_csv_and_jsonl(client, seller, product):
+    import json
+
+    product.sku = 'SKU-9'
+    product.save()
+    ProductImage.objects.create(
+        product=product, image_url='https://example.com/x.jpg', order=0)
+    client.force_authenticate(user=seller)
+
+    response = client.get(reverse('product-export'))
+    assert response.status_code == 200
+    assert response.streaming
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0].startswith('sku,name')
+    assert lines[1].startswith('SKU-9,Test Product')
+
+    response = client.get(reverse('product-export') + '?file_format=jsonl')
+    record = json.loads(b''.join(response.streaming_content).decode())
+    assert record['sku'] == 'SKU-9'
+    assert record['image_urls'] == ['https://example.com/x.jpg']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_streams_under_asgi(seller):
+    """The ASGI handler gets the export chunk by chunk, not buffered in full"""
+    import asyncio
+    from asgiref.sync import async_to_sync
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from Backend.asgi import application
+    from products import views
+
+    Product.objects.bulk_create([
+        Product(name=f"Bulk {i}", sku=f"B{i}", description="d", price="1.00",
+                category="plants", stock_quantity=1, owner=seller)
+        for i in range(300)
+    ])
+    pulled, body, pulled_at_first_body = [], [], []
+
+    def counting_export(*args):
+        for chunk in views_export(*args):
+            pulled.append(chunk)
+            yield chunk
+
+    requested = []
+
+    async def receive():
+        if not requested:
+            requested.append(True)
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            if not body:
+                pulled_at_first_body.append(len(pulled))
+            body.append(message["body"])
+
+    token = str(RefreshToken.for_user(seller).access_token)
+    path = reverse('product-export')
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"file_format=csv", "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())],
+        "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+    }
+    views_export = views.export_products
+    with patch.object(views, 'export_products', counting_export):
+        async_to_sync(application)(scope, receive, send)
+
+    lines = b''.join(body).decode().splitlines()
+    assert len(lines) == 301 and len(pulled) == 301
+    assert pulled_at_first_body[0] < len(pulled)
+
+
+def test_import_products_command(seller, tmp_path):
+    from django.core.management import call_command
+
+    path = tmp_path / 'catalogue.csv'
+    path.write_text(
+        "sku,name,description,price,category,stock_quantity\n"
+        "C1,Seeds,d,2.00,plants,100\n")
+
+    call_command('import_products', str(path), owner=seller.email)
+
+    assert Product.objects.get(owner=seller, sku='C1').stock_quantity == 100
+
+
+def test_put_without_owner_keeps_owner(client, seller, product):
+    client.force_authenticate(user=seller)
+    url = reverse('product-detail', kwargs={'pk': product.pk})
+    data = {
+        'name': 'Renamed', 'description': product.description,
+        'price': str(product.price), 'category': product.category,
+    }
+
+    assert client.put(url, data, format='json').status_code == 200
+    product.refresh_from_db()
+    assert product.owner == seller
+
+
+def test_duplicate_sku_rejected(client, seller, product):
+    product.sku = 'DUP'
+    product.save()
+    client.force_authenticate(user=seller)
+    data = {
+        'name': 'Other', 'sku': 'DUP', 'description': 'd',
+        'price': '1.00', 'category': 'tools',
+    }
+
+    response = client.post(reverse('product-list'), data, format='json')
+
+    assert response.status_code == 400
+    assert 'sku' in response.json()
+
+
+# ------------------------------------------------------
+# Diff-based image updates
+# ------------------------------------------------------
+
+CLOUD = 'https://res.cloudinary.com/demo/image/upload/v1700000000/greencare/products'
+
+
+def _product_update_payload(product, image_urls):
+    return {
+        'name': product.name,
+        'description': product.description,
+        'price': str(product.price),
+        'category': product.category,
+        'stock_quantity': product.stock_quantity,
+        'image_urls': image_urls,
+    }
+
+
+def test_update_images_keeps_unchanged_rows(client, seller, product):
+    client.force_authenticate(user=seller)
+    url = reverse('product-detail', kwargs={'pk': product.pk})
+    client.put(url, _product_update_payload(
+        product, [f'{CLOUD}/a.jpg', f'{CLOUD}/b.jpg', f'{CLOUD}/c.jpg']), format='json')
+    ids = {i.image_url: i.pk for i in product.images.all()}
+
+    response = client.put(url, _product_update_payload(
+        product, [f'{CLOUD}/c.jpg', f'{CLOUD}/a.jpg', f'{CLOUD}/d.jpg']), format='json')
+
+    assert response.status_code == 200
+    images = list(product.images.all())
+    assert [i.image_url for i in images] == [
+        f'{CLOUD}/c.jpg', f'{CLOUD}/a.jpg', f'{CLOUD}/d.jpg']
+    assert [i.order for i in images] == [0, 1, 2]
+    # c and a were moved, not re-created
+    assert images[0].pk == ids[f'{CLOUD}/c.jpg']
+    assert images[1].pk == ids[f'{CLOUD}/a.jpg']
+    assert images[2].public_id == 'greencare/products/d'
+
+    product.refresh_from_db()
+    assert product.image == f'{CLOUD}/c.jpg'
+    from products.models import CloudinaryAssetDeletion
+    assert list(CloudinaryAssetDeletion.objects.values_list(
+        'public_id', flat=True)) == ['greencare/products/b']
+
+
+@patch('cloudinary.api.delete_resources')
+def test_clearing_images_drops_the_cover_before_purge(mock_delete, client, seller, product):
+    from products.services import CloudinaryCleanupService
+
+    client.force_authenticate(user=seller)
+    url = reverse('product-detail', kwargs={'pk': product.pk})
+    client.put(url, _product_update_payload(
+        product, [f'{CLOUD}/a.jpg', f'{CLOUD}/b.jpg']), format='json')
+
+    response = client.put(url, _product_update_payload(product, []), format='json')
+
+    assert response.status_code == 200
+    assert response.json()['image'] is None
+    product.refresh_from_db()
+    assert product.image is None
+    assert not product.images.exists()
+
+    assert CloudinaryCleanupService.flush() == 2
+    assert sorted(mock_delete.call_args.args[0]) == [
+        'greencare/products/a', 'greencare/products/b']
+
+
+@patch('cloudinary.api.delete_resources')
+def test_purge_cloudinary_assets_batches_and_skips_reused(mock_delete, product):
+    from django.core.management import call_command
+    from products.models import CloudinaryAssetDeletion
+
+    ProductImage.objects.create(
+        product=product, image_url=f'{CLOUD}/kept.jpg',
+        public_id='greencare/products/kept', order=0)
+    CloudinaryAssetDeletion.queue(
+        ['greencare/products/kept'] + [f'greencare/products/old{i}' for i in range(5)])
+
+    call_command('purge_cloudinary_assets', batch_size=3)
+
+    deleted = [pid for call in mock_delete.call_args_list for pid in call.args[0]]
+    assert sorted(deleted) == [f'greencare/products/old{i}' for i in range(5)]
+    assert all(len(call.args[0]) <= 3 for call in mock_delete.call_args_list)
+    assert CloudinaryAssetDeletion.objects.count() == 0
+
+
+@patch('cloudinary.api.delete_resources', side_effect=Exception('down'))
+def test_purge_cloudinary_assets_keeps_failed_batch(mock_delete):
+    from products.services import CloudinaryCleanupService
+    from products.models import CloudinaryAssetDeletion
+
+    CloudinaryAssetDeletion.queue(['greencare/products/x'])
+
+    assert CloudinaryCleanupService.flush() == 0
+    assert CloudinaryAssetDeletion.objects.count() == 1
+
+
+# ------------------------------------------------------
+# Parallel multi-image upload
+# ------------------------------------------------------
+
+def _jpeg(name):
+    image_file = BytesIO()
+    PILImage.new('RGB', (10, 10), color='green').save(image_file, 'JPEG')
+    image_file.seek(0)
+    image_file.name = name
+    return image_file
+
+
+def _fake_upload(delay=0.0, fail_for=()):
+    import time
+
+    def upload(image_file, **kwargs):
+        time.sleep(delay)
+        stem = image_file.name.rsplit('.', 1)[0]
+        if stem.rsplit('_', 1)[0] in fail_for:
+            raise Exception('boom')
+        return {
+            'secure_url': f'{CLOUD}/{stem}.jpg',
+            'public_id': f'greencare/products/{stem}',
+        }
+    return upload
+
+
+@patch('cloudinary.uploader.upload')
+def test_upload_images_runs_in_parallel_and_keeps_order(mock_upload, client, seller):
+    import time
+
+    mock_upload.side_effect = _fake_upload(delay=0.3)
+    client.force_authenticate(user=seller)
+
+    started = time.monotonic()
+    response = client.post(
+        reverse('product-upload-images'),
+        {'images': [_jpeg(f'img{i}.jpg') for i in range(5)]},
+        format='multipart')
+    elapsed = time.monotonic() - started
+
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [r['public_id'] for r in results] == [
+        f'greencare/products/img{i}_full' for i in range(5)]
+    assert elapsed < 1.2
+
+
+@patch('cloudinary.uploader.upload')
+def test_upload_images_attaches_to_product(mock_upload, client, seller, product):
+    mock_upload.side_effect = _fake_upload()
+    ProductImage.objects.create(
+        product=product, image_url=f'{CLOUD}/first.jpg', order=0)
+    client.force_authenticate(user=seller)
+
+    response = client.post(
+        reverse('product-upload-images'),
+        {'images': [_jpeg('a.jpg'), _jpeg('b.jpg')], 'product': product.id},
+        format='multipart')
+
+    assert response.status_code == 200
+    assert [i['image_url'] for i in response.json()['product']['images']] == [
+        f'{CLOUD}/first.jpg', f'{CLOUD}/a_full.jpg', f'{CLOUD}/b_full.jpg']
+    images = response.json()['product']['images']
+    assert images[0]['variants'] == {}
+    assert images[1]['variants']['thumb'].endswith('/greencare/products/a_thumb.jpg')
+
+
+@patch('cloudinary.uploader.upload')
+def test_upload_images_rejects_too_many_for_product(mock_upload, client, seller, product):
+    for i in range(4):
+        ProductImage.objects.create(
+            product=product, image_url=f'{CLOUD}/e{i}.jpg', order=i)
+    client.force_authenticate(user=seller)
+
+    response = client.post(
+        reverse('product-upload-images'),
+        {'images': [_jpeg('a.jpg'), _jpeg('b.jpg')], 'product': product.id},
+        format='multipart')
+
+    assert response.status_code == 400
+    mock_upload.assert_not_called()
+
+
+@patch('cloudinary.uploader.upload')
+def test_upload_images_partial_failure_attaches_nothing(mock_upload, client, seller, product):
+    from products.models import CloudinaryAssetDeletion
+
+    mock_upload.side_effect = _fake_upload(fail_for={'b'})
+    client.force_authenticate(user=seller)
+
+    response = client.post(
+        reverse('product-upload-images'),
+        {'images': [_jpeg('a.jpg'), _jpeg('b.jpg')], 'product': product.id},
+        format='multipart')
+
+    assert response.status_code == 502
+    results = response.json()['results']
+    assert 'public_id' in results[0]
+    assert results[1]['error'] == 'boom'
+    assert product.images.count() == 0
+    assert list(CloudinaryAssetDeletion.objects.values_list(
+        'public_id', flat=True).order_by('public_id')) == [
+        'greencare/products/a_full', 'greencare/products/a_medium',
+        'greencare/products/a_thumb']
+
+
+
+@patch('cloudinary.uploader.upload')
+def test_upload_images_failure_without_product_queues_uploads(mock_upload, client, seller):
+    from products.models import CloudinaryAssetDeletion
+
+    mock_upload.side_effect = _fake_upload(fail_for={'b'})
+    client.force_authenticate(user=seller)
+
+    response = client.post(
+        reverse('product-upload-images'),
+        {'images': [_jpeg('a.jpg'), _jpeg('b.jpg')]},
+        format='multipart')
+
+    assert response.status_code == 502
+    assert CloudinaryAssetDeletion.objects.filter(
+        public_id='greencare/products/a_full').exists()
+
+
+@patch('products.services.CloudinaryAssetDeletion.queue')
+@patch('cloudinary.uploader.upload')
+def test_upload_many_shares_one_deadline_and_queues_late_uploads(mock_upload, mock_queue):
+    import threading
+    import time
+    from products.services import CloudinaryUploadService
+
+    mock_upload.side_effect = _fake_upload(delay=0.5)
+    queued = threading.Semaphore(0)
+    mock_queue.side_effect = lambda public_ids: queued.release()
+
+    started = time.monotonic()
+    results = CloudinaryUploadService.upload_many(
+        [_jpeg(f'late{i}.jpg') for i in range(3)], folder='greencare/products',
+        timeout=0.2)
+
+    # One deadline for the batch, not one per file
+    assert time.monotonic() - started < 0.4
+    assert [r['error'] for r in results] == ['Upload timed out'] * 3
+    for _ in range(3):
+        assert queued.acquire(timeout=5)
+    assert sorted(call.args[0][0] for call in mock_queue.call_args_list) == [
+        f'greencare/products/late{i}_full' for i in range(3)]
+
+
+# ------------------------------------------------------
+# Paginated, join-optimised order feeds
+# ------------------------------------------------------
+
+def _bulk_sales(product, buyer, count):
+    """Create ``count`` sales of ``product`` with a single bulk insert"""
+    Order.objects.bulk_create(
+        (Order(product=product, buyer=buyer, seller=product.owner, quantity=1,
+               total_price=product.price,
+               status='completed' if i % 2 else 'pending')
+         for i in range(count)),
+        batch_size=5000)
+
+
+@pytest.fixture
+def large_seller_feed(product, buyer):
+    _bulk_sales(product, buyer, 100_000)
+    return product.owner
+
+
+def test_my_sales_pages_in_constant_queries(
+        client, large_seller_feed, django_assert_num_queries):
+    client.force_authenticate(user=large_seller_feed)
+    url = reverse('order-my-sales')
+
+    seen = []
+    # One aggregate for the validators, one joined page query
+    with django_assert_num_queries(2):
+        response = client.get(url, {'page_size': 100})
+    assert response.status_code == 200
+    page = response.json()
+    seen.extend(order['id'] for order in page['results'])
+
+    for _ in range(3):
+        with django_assert_num_queries(2):
+            page = client.get(page['next']).json()
+        seen.extend(order['id'] for order in page['results'])
+
+    assert len(seen) == len(set(seen)) == 400
+    assert page['results'][0]['buyer_name'] == 'Jane Buyer'
+    assert page['results'][0]['product_name'] == 'Test Product'
+
+
+def test_order_list_query_count_does_not_grow_with_rows(
+        client, product, buyer, django_assert_num_queries):
+    client.force_authenticate(user=product.owner)
+
+    _bulk_sales(product, buyer, 5)
+    with django_assert_num_queries(2):
+        assert len(client.get(reverse('order-my-sales')).json()) == 5
+
+    _bulk_sales(product, buyer, 45)
+    for url, params in ((reverse('order-my-sales'), {}),
+                        (reverse('order-list'), {'view': 'sales'}),
+                        (reverse('order-list'), {'view': 'sales', 'status': 'pending'})):
+        with django_assert_num_queries(2):
+            response = client.get(url, params)
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+
+    client.force_authenticate(user=buyer)
+    with django_assert_num_queries(2):
+        assert len(client.get(reverse('order-my-orders')).json()) == 50
+
+
+def test_my_sales_status_filter_and_page_size_cap(client, product, buyer):
+    _bulk_sales(product, buyer, 300)
+    client.force_authenticate(user=product.owner)
+
+    response = client.get(
+        reverse('order-my-sales'), {'status': 'pending', 'page_size': 1000})
+
+    results = response.json()['results']
+    assert len(results) == 150
+    assert {order['status'] for order in results} == {'pending'}
+    created = [order['created_at'] for order in results]
+    assert created == sorted(created, reverse=True)
+
+
+# ------------------------------------------------------
+# Seller sales rollups + analytics
+# ------------------------------------------------------
+
+def _rollups(seller):
+    from products.models import SellerSalesRollup
+
+    return {
+        (r.product_id, r.day, r.status): (r.order_count, r.units, r.revenue)
+        for r in SellerSalesRollup.objects.filter(seller=seller)
+        if r.order_count
+    }
+
+
+def _order(client, product, quantity):
+    response = client.post(
+        reverse('order-list'), {'product': product.id, 'quantity': quantity}, format='json')
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def test_rollups_follow_order_lifecycle(client, product, second_product, seller, buyer, admin_user):
+    today = timezone.localdate()
+    client.force_authenticate(user=buyer)
+    first = _order(client, product, 2)
+    second = _order(client, product, 1)
+    client.post(reverse('order-checkout'), {
+        'items': [{'product': product.id, 'quantity': 1},
+                  {'product': second_product.id, 'quantity': 3}]}, format='json')
+
+    assert _rollups(seller) == {
+        (product.id, today, 'pending'): (3, 4, Decimal('200.00')),
+        (second_product.id, today, 'pending'): (1, 3, Decimal('15.00')),
+    }
+
+    client.force_authenticate(user=seller)
+    client.post(reverse('order-update-status', args=[first]), {'status': 'completed'})
+    client.patch(reverse('order-detail', args=[second]), {'status': 'processing'}, format='json')
+    client.force_authenticate(user=buyer)
+    client.delete(reverse('order-detail', args=[second]))
+
+    assert _rollups(seller) == {
+        (product.id, today, 'pending'): (1, 1, Decimal('50.00')),
+        (product.id, today, 'completed'): (1, 2, Decimal('100.00')),
+        (product.id, today, 'cancelled'): (1, 1, Decimal('50.00')),
+        (second_product.id, today, 'pending'): (1, 3, Decimal('15.00')),
+    }
+
+    incremental = _rollups(seller)
+    call_command('rebuild_sales_rollups', stdout=StringIO())
+    assert _rollups(seller) == incremental
+
+
+def _admin_edit(order, **changes):
+    """Save ``order`` through OrderAdmin's change form, as the admin site does"""
+    from django.contrib import admin
+    from django.test import RequestFactory
+
+    model_admin = admin.site._registry[Order]
+    request = RequestFactory().post('/')
+    request.user = CustomUser(is_superuser=True, is_active=True)
+    data = {
+        'product': order.product_id, 'buyer': order.buyer_id, 'seller': order.seller_id,
+        'quantity': order.quantity, 'status': order.status,
+        'shipping_address': order.shipping_address or '', 'notes': order.notes or '',
+    }
+    data.update(changes)
+    form = model_admin.get_form(request, order, change=True)(data, instance=order)
+    assert form.is_valid(), form.errors
+    model_admin.save_model(request, form.save(commit=False), form, change=True)
+    return model_admin, request
+
+
+def test_admin_edits_keep_rollups_in_step(client, product, second_product, seller, buyer):
+    today = timezone.localdate()
+    client.force_authenticate(user=buyer)
+    order = Order.objects.get(pk=_order(client, product, 2))
+
+    _admin_edit(order, quantity=3)
+    assert _rollups(seller) == {(product.id, today, 'pending'): (1, 3, Decimal('150.00'))}
+
+    _admin_edit(Order.objects.get(pk=order.pk), product=second_product.id, status='processing')
+    assert _rollups(seller) == {
+        (second_product.id, today, 'processing'): (1, 3, Decimal('15.00'))}
+
+    incremental = _rollups(seller)
+    call_command('rebuild_sales_rollups', stdout=StringIO())
+    assert _rollups(seller) == incremental
+
+
+def test_admin_deletes_keep_rollups_in_step(client, product, seller, buyer):
+    today = timezone.localdate()
+    client.force_authenticate(user=buyer)
+    ids = [_order(client, product, quantity) for quantity in (1, 2, 4)]
+    model_admin, request = _admin_edit(Order.objects.get(pk=ids[0]))
+
+    model_admin.delete_model(request, Order.objects.get(pk=ids[0]))
+    assert _rollups(seller) == {(product.id, today, 'pending'): (2, 6, Decimal('300.00'))}
+
+    model_admin.delete_queryset(request, Order.objects.filter(pk__in=ids[1:]))
+    assert _rollups(seller) == {}
+
+
+def test_rebuild_command_for_one_seller(product, seller, buyer):
+    from products.models import SellerSalesRollup
+
+    _bulk_sales(product, buyer, 10)
+    assert not SellerSalesRollup.objects.exists()
+
+    out = StringIO()
+    call_command('rebuild_sales_rollups', '--seller', seller.email, stdout=out)
+
+    assert 'Wrote 2 rollup rows' in out.getvalue()
+    assert sum(count for count, _, _ in _rollups(seller).values()) == 10
+
+
+def test_sales_analytics_from_rollups(client, product, second_product, seller, buyer,
+                                      django_assert_num_queries):
+    from products.services import SalesRollupService
+
+    _bulk_sales(product, buyer, 40)
+    _bulk_sales(second_product, buyer, 4)
+    SalesRollupService.rebuild()
+    today = timezone.localdate()
+    client.force_authenticate(user=seller)
+
+    # Query count depends on the report shape, not on the number of orders
+    with django_assert_num_queries(4):
+        response = client.get(reverse('order-analytics'), {
+            'from': (today - timezone.timedelta(days=6)).isoformat(),
+            'to': today.isoformat()})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['totals'] == {'orders': 44, 'units': 44, 'revenue': '2020.00'}
+    assert len(data['days']) == 7
+    assert data['days'][0] == {
+        'day': (today - timezone.timedelta(days=6)).isoformat(),
+        'orders': 0, 'units': 0, 'revenue': '0.00'}
+    assert data['days'][-1]['orders'] == 44
+    assert [p['product'] for p in data['products']] == [product.id, second_product.id]
+    assert data['statuses']['completed']['orders'] == 22
+
+    response = client.get(reverse('order-analytics'), {
+        'product': second_product.id, 'status': 'pending'})
+    assert response.json()['totals'] == {'orders': 2, 'units': 2, 'revenue': '10.00'}
+    assert len(response.json()['days']) == 30
+
+
+@pytest.mark.parametrize('params', [
+    {'from': 'yesterday'},
+    {'from': '2025-02-30'},
+    {'from': '2025-03-02', 'to': '2025-03-01'},
+    {'from': '2020-01-01', 'to': '2025-01-01'},
+    {'status': 'lost'},
+    {'product': 'abc'},
+])
+def test_sales_analytics_rejects_bad_params(client, seller, params):
+    client.force_authenticate(user=seller)
+    assert client.get(reverse('order-analytics'), params).status_code == 400
+
+
+def test_sales_analytics_is_seller_only(client, buyer):
+    client.force_authenticate(user=buyer)
+    assert client.get(reverse('order-analytics')).status_code == 403
+
+
+# ------------------------------------------------------
+# Streaming order / sales export
+# ------------------------------------------------------
+
+def _streamed(response):
+    return b''.join(
+        chunk if isinstance(chunk, bytes) else chunk.encode()
+        for chunk in response.streaming_content)
+
+
+def _xlsx_rows(data):
+    import xml.etree.ElementTree as ET
+    import zipfile
+
+    ns = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+    with zipfile.ZipFile(BytesIO(data)) as workbook:
+        assert 'xl/workbook.xml' in workbook.namelist()
+        sheet = ET.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+    return [
+        [cell.findtext('x:v', namespaces=ns) or cell.findtext('x:is/x:t', namespaces=ns)
+         for cell in row.findall('x:c', ns)]
+        for row in sheet.find('x:sheetData', ns)
+    ]
+
+
+def test_export_sales_csv_with_filters(client, product, seller, buyer):
+    import csv
+
+    _bulk_sales(product, buyer, 1200)
+    old = Order.objects.filter(seller=seller).order_by('id')[:10]
+    Order.objects.filter(pk__in=list(old.values_list('id', flat=True))).update(
+        created_at=timezone.now() - timezone.timedelta(days=40))
+    client.force_authenticate(user=seller)
+
+    response = client.get(reverse('order-export'), {
+        'view': 'sales', 'status': 'completed',
+        'from': (timezone.localdate() - timezone.timedelta(days=7)).isoformat()})
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Disposition'] == 'attachment; filename="sales.csv"'
+    rows = list(csv.reader(_streamed(response).decode().splitlines()))
+    assert rows[0][:3] == ['id', 'created_at', 'status']
+    assert len(rows) == 1 + 595
+    assert {row[2] for row in rows[1:]} == {'completed'}
+    assert rows[1][8:10] == ['buyer@test.com', 'seller@test.com']
+
+
+def test_export_streams_header_before_querying(client, product, seller, buyer,
+                                               django_assert_num_queries):
+    _bulk_sales(product, buyer, 3)
+    client.force_authenticate(user=seller)
+    response = client.get(reverse('order-export'), {'view': 'sales'})
+    chunks = iter(response.streaming_content)
+
+    with django_assert_num_queries(0):
+        assert next(chunks).startswith(b'id,created_at')
+    # Every remaining row comes from one joined, iterated query
+    with django_assert_num_queries(1):
+        assert len(b''.join(chunks).splitlines()) == 3
+
+
+def test_export_orders_xlsx(client, product, buyer):
+    _bulk_sales(product, buyer, 3)
+    client.force_authenticate(user=buyer)
+
+    response = client.get(reverse('order-export'), {'file_format': 'xlsx'})
+
+    assert response.status_code == 200
+    assert response['Content-Disposition'] == 'attachment; filename="orders.xlsx"'
+    rows = _xlsx_rows(_streamed(response))
+    assert rows[0][0] == 'id'
+    assert len(rows) == 4
+    assert rows[1][4] == 'Test Product'
+    assert rows[1][7] == '50.00'
+
+
+def test_export_neutralises_buyer_text(client, product, buyer):
+    import csv
+
+    Order.objects.create(
+        product=product, buyer=buyer, seller=product.owner, quantity=1,
+        total_price=product.price, notes='=HYPERLINK("http://evil")',
+        shipping_address='1 Bell\x07 Street\x00')
+    client.force_authenticate(user=buyer)
+
+    response = client.get(reverse('order-export'))
+    row = list(csv.reader(_streamed(response).decode().splitlines()))[1]
+    assert row[11] == '\'=HYPERLINK("http://evil")'
+
+    response = client.get(reverse('order-export'), {'file_format': 'xlsx'})
+    row = _xlsx_rows(_streamed(response))[1]
+    assert row[10] == '1 Bell Street'
+
+
+def test_export_only_includes_own_orders(client, product, buyer, normal_user):
+    _bulk_sales(product, buyer, 3)
+    client.force_authenticate(user=normal_user)
+
+    response = client.get(reverse('order-export'))
+
+    assert len(_streamed(response).splitlines()) == 1
+
+
+@pytest.mark.parametrize('params', [
+    {'file_format': 'pdf'},
+    {'from': '2025-13-01'},
+    {'to': 'today'},
+])
+def test_export_rejects_bad_params(client, buyer, params):
+    client.force_authenticate(user=buyer)
+    assert client.get(reverse('order-export'), params).status_code == 400
+
+
+# ------------------------------------------------------
+# Bulk order status transitions
+# ------------------------------------------------------
+
+def test_bulk_status_reports_per_id_outcomes(client, product, seller, buyer, normal_user):
+    _bulk_sales(product, buyer, 4)
+    pending, processing, completed, cancelled = Order.objects.filter(
+        seller=seller).order_by('id')
+    Order.objects.filter(pk=processing.pk).update(status='processing')
+    Order.objects.filter(pk=completed.pk).update(status='completed')
+    Order.objects.filter(pk=cancelled.pk).update(status='cancelled')
+    other_seller = CustomUser.objects.create_user(
+        email='other@test.com', password='password123', role='seller')
+    foreign = Order.objects.create(
+        product=Product.objects.create(
+            name='Other', price=Decimal('1.00'), category='plants',
+            stock_quantity=1, owner=other_seller),
+        buyer=buyer, seller=other_seller, quantity=1)
+    client.force_authenticate(user=seller)
+
+    response = client.post(reverse('order-bulk-status'), {
+        'ids': [pending.id, processing.id, completed.id, cancelled.id, foreign.id, 999999],
+        'status': 'completed'}, format='json')
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data['updated'] == 2
+    assert [r['ok'] for r in data['results']] == [True, True, False, False, False, False]
+    assert data['results'][0] == {
+        'id': pending.id, 'ok': True, 'previous_status': 'pending', 'status': 'completed'}
+    assert data['results'][4]['error'] == 'Not found'
+    assert Order.objects.get(pk=foreign.pk).status == 'pending'
+    assert Order.objects.filter(seller=seller, status='completed').count() == 3
+
+
+def test_bulk_cancel_restores_stock_in_aggregate(client, product, second_product, seller, buyer,
+                                                 django_assert_max_num_queries):
+    from products.services import SalesRollupService
+
+    _bulk_sales(product, buyer, 30)
+    _bulk_sales(second_product, buyer, 3)
+    Order.objects.filter(seller=seller).update(status='pending', quantity=2)
+    SalesRollupService.rebuild()
+    ids = list(Order.objects.filter(seller=seller).values_list('id', flat=True))
+    client.force_authenticate(user=seller)
+
+    # Lock+read, one UPDATE for the orders and one for stock, then a few per
+    # rollup bucket (4 here, 2 of them new) -- none per order
+    with django_assert_max_num_queries(15):
+        response = client.post(reverse('order-bulk-status'),
+                               {'ids': ids, 'status': 'cancelled'}, format='json')
+
+    assert response.json()['updated'] == 33
+    product.refresh_from_db()
+    second_product.refresh_from_db()
+    assert product.stock_quantity == 10 + 60
+    assert second_product.stock_quantity == 3 + 6
+    assert _rollups(seller)[(product.id, timezone.localdate(), 'cancelled')] == (
+        30, 60, Decimal('1500.00'))
+    assert (product.id, timezone.localdate(), 'pending') not in _rollups(seller)
+
+
+@pytest.mark.parametrize('payload', [
+    {'ids': [], 'status': 'completed'},
+    {'ids': [1], 'status': 'shipped'},
+    {'ids': list(range(1, 502)), 'status': 'completed'},
+])
+def test_bulk_status_validates_payload(client, seller, payload):
+    client.force_authenticate(user=seller)
+    response = client.post(reverse('order-bulk-status'), payload, format='json')
+    assert response.status_code == 400
+
+
+def test_bulk_status_is_for_sellers_and_admins(client, product, buyer, admin_user):
+    _bulk_sales(product, buyer, 1)
+    order = Order.objects.get()
+
+    client.force_authenticate(user=buyer)
+    assert client.post(reverse('order-bulk-status'),
+                       {'ids': [order.id], 'status': 'cancelled'}, format='json').status_code == 403
+
+    client.force_authenticate(user=admin_user)
+    response = client.post(reverse('order-bulk-status'),
+                           {'ids': [order.id], 'status': 'processing'}, format='json')
+    assert response.json()['updated'] == 1
+
+
+@pytest.mark.parametrize('old_status, new_status', [
+    ('completed', 'pending'),
+    ('cancelled', 'processing'),
+])
+def test_single_status_change_follows_transitions(client, product, seller, buyer,
+                                                   old_status, new_status):
+    _bulk_sales(product, buyer, 1)
+    order = Order.objects.get()
+    Order.objects.filter(pk=order.pk).update(status=old_status)
+    client.force_authenticate(user=seller)
+
+    response = client.post(reverse('order-update-status', args=[order.pk]),
+                           {'status': new_status}, format='json')
+    assert response.status_code == 400
+    assert response.json()['error'] == f'Cannot change a {old_status} order to {new_status}'
+
+    response = client.patch(reverse('order-detail', args=[order.pk]) + '?view=sales',
+                            {'status': new_status}, format='json')
+    assert response.status_code == 400
+    assert Order.objects.get(pk=order.pk).status == old_status
+
+
+def test_single_cancel_restores_stock(client, product, seller, buyer):
+    _bulk_sales(product, buyer, 2)
+    first, second = Order.objects.order_by('id')
+    Order.objects.update(status='pending', quantity=3)
+    client.force_authenticate(user=seller)
+
+    response = client.post(reverse('order-update-status', args=[first.pk]),
+                           {'status': 'cancelled'}, format='json')
+    assert response.status_code == 200
+    assert response.json()['status'] == 'cancelled'
+
+    response = client.patch(reverse('order-detail', args=[second.pk]) + '?view=sales',
+                            {'status': 'cancelled', 'notes': 'Out of stock'}, format='json')
+    assert response.status_code == 200
+    assert response.json()['notes'] == 'Out of stock'
+
+    product.refresh_from_db()
+    assert product.stock_quantity == 10 + 6
+
+
+def test_bulk_transition_backs_off_when_an_order_changed_after_the_read(product, seller, buyer):
+    from django.db.models import QuerySet
+    from products.services import OrderStatusService
+
+    _bulk_sales(product, buyer, 1)
+    order = Order.objects.get()
+    Order.objects.filter(pk=order.pk).update(status='pending', quantity=2)
+    in_bulk = QuerySet.in_bulk
+
+    def read_then_cancel_elsewhere(queryset, *args, **kwargs):
+        # The row lock is a no-op on SQLite, so another cancel can land here
+        orders = in_bulk(queryset, *args, **kwargs)
+        Order.objects.filter(pk=order.pk).update(status='cancelled')
+        return orders
+
+    with patch.object(QuerySet, 'in_bulk', read_then_cancel_elsewhere):
+        outcome, = OrderStatusService.bulk_transition(seller, [order.pk], 'cancelled')
+
+    assert not outcome['ok']
+    product.refresh_from_db()
+    assert product.stock_quantity == 10
+
+
+# ------------------------------------------------------
+# Co-purchase recommendations
+# ------------------------------------------------------
+
+@pytest.fixture
+def catalogue(seller):
+    return [
+        Product.objects.create(
+            name=f'P{i}', price=Decimal('10.00'), category='plants',
+            stock_quantity=5, owner=seller)
+        for i in range(5)
+    ]
+
+
+def _buy(buyer, *products):
+    for product in products:
+        Order.objects.create(product=product, buyer=buyer, seller=product.owner,
+                             quantity=1, total_price=product.price)
+
+
+def _shoppers(count, start=0):
+    return [CustomUser.objects.create_user(email=f'shopper{i}@test.com', password=None)
+            for i in range(start, start + count)]
+
+
+def _neighbors(product):
+    from products.models import ProductNeighbors
+
+    return ProductNeighbors.objects.get(product=product).neighbors
+
+
+def test_recommendations_rank_by_cosine_with_min_support(catalogue):
+    from products.recommendations import build_recommendations
+
+    a, b, c, d, _ = catalogue
+    shoppers = _shoppers(5)
+    for shopper in shoppers[:3]:
+        _buy(shopper, a, b)
+    for shopper in shoppers[3:]:
+        _buy(shopper, a, c)
+    _buy(shoppers[0], d)
+
+    assert build_recommendations(k=5, min_support=2) == 4
+
+    # cos(a, b) = 3 / sqrt(5 * 3), cos(a, c) = 2 / sqrt(5 * 2); d shares one buyer
+    assert _neighbors(a) == [[b.id, 0.7746], [c.id, 0.6325]]
+    assert _neighbors(b) == [[a.id, 0.7746]]
+    assert _neighbors(d) == []
+
+
+def test_incremental_run_matches_full_rebuild(catalogue):
+    from products.models import ProductNeighbors, RecommendationRun
+    from products.recommendations import build_recommendations
+
+    a, b, c, d, e = catalogue
+    shoppers = _shoppers(6)
+    for shopper in shoppers[:2]:
+        _buy(shopper, a, b)
+    for shopper in shoppers[2:4]:
+        _buy(shopper, d, e)
+    build_recommendations(min_support=1)
+
+    _buy(shoppers[4], a, c)
+    Order.objects.filter(buyer=shoppers[1], product=b).update(
+        status='cancelled', updated_at=timezone.now())
+    written = build_recommendations(min_support=1)
+
+    # d and e share no buyer with the changed orders
+    assert written == 3
+    incremental = dict(ProductNeighbors.objects.values_list('product_id', 'neighbors'))
+    build_recommendations(full=True, min_support=1)
+    assert dict(ProductNeighbors.objects.values_list('product_id', 'neighbors')) == incremental
+    # b lost a buyer and c gained one: both now score 1 / sqrt(3), ties by id
+    assert incremental[a.id] == [[b.id, 0.5774], [c.id, 0.5774]]
+    assert RecommendationRun.objects.count() == 3
+
+
+def test_incremental_run_loads_only_touched_purchases(catalogue):
+    from products import recommendations
+
+    a, b, c, d, e = catalogue
+    shoppers = _shoppers(5)
+    for shopper in shoppers[:2]:
+        _buy(shopper, a, b)
+    for shopper in shoppers[2:4]:
+        _buy(shopper, d, e)
+    recommendations.build_recommendations(min_support=1)
+
+    _buy(shoppers[4], b, c)
+    with patch.object(recommendations, 'purchase_matrix',
+                      wraps=recommendations.purchase_matrix) as matrix:
+        recommendations.build_recommendations(min_support=1)
+
+    buyer_ids, product_ids = matrix.call_args.args
+    assert set(buyer_ids) == {shoppers[0].id, shoppers[1].id, shoppers[4].id}
+    assert set(product_ids) == {a.id, b.id, c.id}
+
+
+def test_incremental_runs_match_full_rebuilds_on_random_orders(seller):
+    import random
+    from products.models import ProductNeighbors
+    from products.recommendations import build_recommendations
+
+    rng = random.Random(7)
+    products = [
+        Product.objects.create(name=f'R{i}', price=Decimal('1.00'), category='plants',
+                               stock_quantity=5, owner=seller)
+        for i in range(12)
+    ]
+    shoppers = _shoppers(30)
+    build_recommendations(min_support=1)
+
+    for _ in range(4):
+        for shopper in rng.sample(shoppers, 8):
+            _buy(shopper, *rng.sample(products, 3))
+        cancelled = rng.sample(list(Order.objects.values_list('pk', flat=True)), 3)
+        Order.objects.filter(pk__in=cancelled).update(
+            status='cancelled', updated_at=timezone.now())
+
+        build_recommendations(min_support=1)
+        incremental = ProductNeighbors.objects.exclude(neighbors=[])
+        incremental = dict(incremental.values_list('product_id', 'neighbors'))
+        build_recommendations(full=True, min_support=1)
+        full = ProductNeighbors.objects.exclude(neighbors=[])
+        assert dict(full.values_list('product_id', 'neighbors')) == incremental
+
+
+def test_related_serves_stored_neighbors(client, catalogue, django_assert_num_queries):
+    from products.models import ProductNeighbors
+
+    a, b, c, d, _ = catalogue
+    Product.objects.filter(pk=d.pk).update(stock_quantity=0)
+    ProductNeighbors.objects.create(
+        product=a, neighbors=[[d.id, 0.9], [b.id, 0.8], [999999, 0.7], [c.id, 0.5]])
+
+    # Neighbour list, products (+owner), images
+    with django_assert_num_queries(3):
+        response = client.get(reverse('product-related', args=[a.id]))
+
+    assert response.status_code == 200
+    assert [(p['id'], p['score']) for p in response.json()] == [(b.id, 0.8), (c.id, 0.5)]
+    assert response.json()[0]['name'] == 'P1'
+
+    limited = client.get(reverse('product-related', args=[a.id]), {'limit': 2})
+    assert [p['id'] for p in limited.json()] == [b.id]
+    assert client.get(reverse('product-related', args=[b.id])).json() == []
+    assert client.get(reverse('product-related', args=[999999])).status_code == 404
+    assert client.get('/api/products/abc/related/').status_code == 404
+
+
+def test_build_and_benchmark_commands(catalogue):
+    shoppers = _shoppers(2)
+    for shopper in shoppers:
+        _buy(shopper, catalogue[0], catalogue[1])
+
+    out = StringIO()
+    call_command('build_recommendations', '--full', stdout=out)
+    assert 'Updated 2 neighbour lists' in out.getvalue()
+    assert [n for n, _ in _neighbors(catalogue[0])] == [catalogue[1].id]
+
+    out = StringIO()
+    call_command('benchmark_recommendations', '--orders', '5000', '--buyers', '500',
+                 '--products', '100', stdout=out)
+    assert '5000 orders' in out.getvalue()
+
+
+# ------------------------------------------------------
+# Buffered view counters + trending
+# ------------------------------------------------------
+
+def test_views_are_buffered_and_flushed_in_one_update(
+        settings, catalogue, django_assert_num_queries):
+    from products.counters import ViewCounterBuffer
+
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = 60
+    buffer = ViewCounterBuffer()
+    with patch('products.counters.threading.Thread') as thread:
+        for product in (catalogue[0], catalogue[1], catalogue[0], catalogue[0]):
+            buffer.record(product.pk)
+
+    thread.return_value.start.assert_called_once()
+    assert buffer.pending() == {catalogue[0].pk: 3, catalogue[1].pk: 1}
+    assert Product.objects.filter(view_count__gt=0).count() == 0
+
+    with django_assert_num_queries(1):
+        assert buffer.flush() == 2
+    with django_assert_num_queries(0):
+        assert buffer.flush() == 0
+
+    assert buffer.pending() == {}
+    counts = dict(Product.objects.values_list('pk', 'view_count'))
+    assert counts[catalogue[0].pk] == 3
+    assert counts[catalogue[1].pk] == 1
+
+
+def test_failed_flush_keeps_views_for_next_flush(settings, catalogue):
+    from django.db import DatabaseError
+    from products.counters import ViewCounterBuffer
+
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = 60
+    buffer = ViewCounterBuffer()
+    with patch('products.counters.threading.Thread'):
+        buffer.record(catalogue[0].pk, views=4)
+
+    with patch('products.counters.Product.objects.filter', side_effect=DatabaseError):
+        with pytest.raises(DatabaseError):
+            buffer.flush()
+    assert buffer.pending() == {catalogue[0].pk: 4}
+
+    buffer.flush()
+    assert Product.objects.get(pk=catalogue[0].pk).view_count == 4
+
+
+def test_trending_orders_by_decayed_views(client, settings, catalogue):
+    from products.counters import view_counter
+
+    settings.POPULARITY_HALF_LIFE_HOURS = 1
+    start = timezone.now()
+    old, recent = catalogue[1], catalogue[3]
+    with patch('products.counters.timezone.now', return_value=start):
+        view_counter.record(old.pk, views=10)
+    # Four half-lives later, 10 old views weigh less than 3 fresh ones
+    with patch('products.counters.timezone.now',
+               return_value=start + timezone.timedelta(hours=4)):
+        view_counter.record(recent.pk, views=3)
+
+    response = client.get(reverse('product-list') + '?ordering=trending')
+
+    assert response.status_code == 200
+    assert not response.has_header('ETag')
+    assert [item['id'] for item in response.json()] == [
+        recent.pk, old.pk, catalogue[4].pk, catalogue[2].pk, catalogue[0].pk]
+
+
+def test_retrieve_counts_views_without_changing_etag(client, product):
+    url = reverse('product-detail', kwargs={'pk': product.pk})
+    updated_at = product.updated_at
+    etag = client.get(url)['ETag']
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert client.get(reverse('product-detail', kwargs={'pk': 999999})).status_code == 404
+
+    product.refresh_from_db()
+    assert product.view_count == 2
+    assert product.updated_at == updated_at
+    assert client.get(url)['ETag'] == etag
+
+
+# ------------------------------------------------------
+# Query plans (no full table scans on hot paths)
+# ------------------------------------------------------
+
+@pytest.mark.parametrize('user, path, ordered_scans', [
+    (None, '', ('products_product',)),
+    (None, '?category=tools', ()),
+    (None, '?owner={owner}', ()),
+    (None, '?ordering=trending', ('products_product',)),
+    (None, '{product}/', ()),
+    (None, '{product}/related/', ()),
+    ('seller', 'my_products/', ()),
+    ('buyer', 'orders/', ()),
+    ('buyer', 'orders/my_orders/', ()),
+    ('seller', 'orders/?view=sales', ()),
+    ('seller', 'orders/my_sales/?status=pending', ()),
+    ('seller', 'orders/analytics/', ()),
+    ('admin_user', 'orders/', ('products_order',)),
+    ('admin_user', 'orders/?status=pending', ()),
+])
+def test_hot_paths_use_indexes(request, client, product, buyer, user, path, ordered_scans):
+    from Backend.query_plans import assert_indexed_queries
+
+    client.force_authenticate(user=buyer)
+    _order(client, product, 1)
+    client.force_authenticate(user=request.getfixturevalue(user) if user else None)
+    url = reverse('product-list') + path.format(owner=product.owner_id, product=product.pk)
+
+    with assert_indexed_queries(ordered_scans=ordered_scans):
+        assert client.get(url).status_code == 200
+
+
+def test_query_plan_harness_reports_table_scans(product):
+    from Backend.query_plans import assert_indexed_queries
+
+    with pytest.raises(AssertionError, match='SCAN products_product'):
+        with assert_indexed_queries():
+            list(Product.objects.filter(description='desc'))
+
+
+# ------------------------------------------------------
+# values() list serializers
+# ------------------------------------------------------
+
+def test_product_values_serializer_matches_model_serializer(seller, normal_user, product):
+    from products.serializers import ProductSerializer, ProductValuesSerializer
+
+    ProductImage.objects.create(
+        product=product, order=1,
+        image_url='https://res.cloudinary.com/demo/image/upload/v1/p/b_full.webp')
+    ProductImage.objects.create(product=product, order=0, image_url='https://example.com/a.jpg')
+    Product.objects.create(name='Unnamed owner', description='d', price='1.50',
+                           category='tools', owner=normal_user)
+    Product.objects.create(name='No owner', description='d', price='2.00', category='tools')
+
+    products = Product.objects.all()
+    expected = ProductSerializer(products, many=True).data
+
+    assert ProductValuesSerializer.serialize(products) == [dict(item) for item in expected]
+
+
+def test_order_values_serializer_matches_model_serializer(client, buyer, product, second_product):
+    from products.serializers import OrderSerializer, OrderValuesSerializer
+
+    client.force_authenticate(user=buyer)
+    _order(client, product, 2)
+    _order(client, second_product, 1)
+
+    orders = Order.objects.all()
+    expected = OrderSerializer(orders, many=True).data
+
+    assert OrderValuesSerializer.serialize(orders) == [dict(item) for item in expected]
+
+
+def test_benchmark_serializers_command_rolls_back(seller):
+    out = StringIO()
+    call_command('benchmark_serializers', rows=20, repeat=1, stdout=out)
+
+    assert 'products:' in out.getvalue() and 'orders:' in out.getvalue()
+    assert Product.objects.count() == 0
+
+
+def test_lean_order_feed_pages_like_before(client, product, buyer, django_assert_num_queries):
+    _bulk_sales(product, buyer, 7)
+    client.force_authenticate(user=product.owner)
+    url = reverse('order-my-sales')
+
+    seen, page_url = [], url + '?page_size=3'
+    while page_url:
+        with django_assert_num_queries(2):
+            page = client.get(page_url).json()
+        seen.extend(item['id'] for item in page['results'])
+        page_url = page['next']
+
+    assert seen == list(Order.objects.filter(seller=product.owner).order_by(
+        '-created_at', '-id').values_list('id', flat=True))
+    assert page['results'][0]['buyer_name'] == 'Jane Buyer'
@@ -417,3 +417,24 @@ class TestProductsEdgeCases:
         assert isinstance(product.price, Decimal)
         assert not isinstance(product.price, float)
         assert not isinstance(product.price, int)
+
+
+# ------------------------------------------------------
+# Cloudinary public_id parsing
+# ------------------------------------------------------
+
+class TestCloudinaryPublicId:
+
+    def test_versioned_url(self):
+        from products.services import cloudinary_public_id
+        url = 'https://res.cloudinary.com/demo/image/upload/v123/greencare/products/abc.jpg'
+        assert cloudinary_public_id(url) == 'greencare/products/abc'
+
+    def test_url_with_transformation(self):
+        from products.services import cloudinary_public_id
+        url = 'https://res.cloudinary.com/demo/image/upload/w_300,c_fill/v9/a/b.webp'
+        assert cloudinary_public_id(url) == 'a/b'
+
+    def test_non_cloudinary_url(self):
+        from products.services import cloudinary_public_id
+        assert cloudinary_public_id('https://example.com/img.jpg') is None
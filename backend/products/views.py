@@ -1,25 +1,53 @@
+from datetime import datetime, time, timedelta
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from django.core.exceptions import PermissionDenied
-from authentication.permissions import IsSellerOrReadOnly, IsSeller
-from .models import Product, Order
-from .serializers import ProductSerializer, OrderSerializer
-import cloudinary.uploader
-
-
-class ProductViewSet(viewsets.ModelViewSet):
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.utils import timezone
+from authentication.permissions import IsAdmin, IsSellerOrReadOnly, IsSeller
+from Backend.conditional import ConditionalGetMixin
+from Backend.params import query_date
+from Backend.pagination import KeysetPagination
+from Backend.projections import ValuesListMixin
+from Backend.streaming import streaming_response
+from .models import (
+    MAX_PRODUCT_IMAGES, CloudinaryAssetDeletion, Order, Product, ProductNeighbors)
+from .serializers import (
+    BulkStatusSerializer, CheckoutSerializer, OrderSerializer, OrderValuesSerializer,
+    ProductSerializer, ProductValuesSerializer)
+from .services import (
+    CloudinaryUploadService, OrderStatusService, ProductImageService,
+    SalesRollupService, StockService, sales_report)
+from .bulk import export_orders, export_products, import_products, read_rows
+from .counters import view_counter
+from uploads.processing import upload_image
+
+ANALYTICS_DEFAULT_DAYS = 30
+ANALYTICS_MAX_DAYS = 366
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class ProductViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    values_serializer_class = ProductValuesSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_permissions(self):
         """
         Set custom permissions based on action
         """
-        if self.action in ['create', 'upload_image']:
-            # Only sellers can create products and upload images
+        if self.action in ['create', 'upload_image', 'upload_images', 'bulk_import', 'export']:
+            # Only sellers can create products, upload images and import/export
             return [IsAuthenticated(), IsSeller()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             # Only owners can update/delete their products
@@ -42,8 +70,24 @@ class ProductViewSet(viewsets.ModelViewSet):
         if owner:
             queryset = queryset.filter(owner_id=owner)
 
+        if self.request.query_params.get('ordering') == 'trending':
+            queryset = queryset.order_by('-popularity', '-id')
+
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('ordering') == 'trending':
+            # Popularity changes don't touch updated_at, so the ETag can't
+            # tell when the trending order has moved on
+            return super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            view_counter.record(int(kwargs['pk']))
+        return response
+
     def perform_create(self, serializer):
         """Automatically set the owner to the current user"""
         serializer.save(owner=self.request.user)
@@ -61,12 +105,45 @@ class ProductViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("You can only delete your own products")
         instance.delete()
 
+    @action(detail=True, methods=['get'])
+    def related(self, request, pk=None):
+        """
+        Products frequently bought together with this one, best first.
+
+        Served from the lists precomputed by ``build_recommendations``;
+        ``?limit=`` caps the number returned.
+        """
+        # The neighbour list is read before the product, so check the id first
+        if not pk.isdigit():
+            raise Http404
+        neighbors = ProductNeighbors.objects.filter(
+            product_id=pk).values_list('neighbors', flat=True).first()
+        if neighbors is None:
+            get_object_or_404(Product, pk=pk)
+            neighbors = []
+
+        limit = request.query_params.get('limit', '')
+        if limit.isdigit():
+            neighbors = neighbors[:int(limit)]
+
+        # Products deleted or sold out since the job ran are skipped
+        products = Product.objects.filter(stock_quantity__gt=0).select_related(
+            'owner').prefetch_related('images').in_bulk(
+            [product_id for product_id, _ in neighbors])
+        related = []
+        for product_id, score in neighbors:
+            if product_id in products:
+                data = self.get_serializer(products[product_id]).data
+                data['score'] = score
+                related.append(data)
+        return Response(related)
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_products(self, request):
         """Get products owned by the current user (sellers only)"""
         products = Product.objects.filter(owner=request.user)
-        serializer = self.get_serializer(products, many=True)
-        return Response(serializer.data)
+        return self.conditional_list(
+            request, products, lambda: self.values_list_response(products))
 
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsSeller])
     def upload_image(self, request):
@@ -79,39 +156,143 @@ class ProductViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Upload to Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                image_file,
-                folder='greencare/products',
-                resource_type='image'
+            # Downscale, re-encode and upload with responsive variants
+            return Response(
+                upload_image(image_file, folder='greencare/products'),
+                status=status.HTTP_200_OK
             )
 
-            return Response({
-                'image_url': upload_result['secure_url'],
-                'public_id': upload_result['public_id']
-            }, status=status.HTTP_200_OK)
-
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsSeller])
+    def upload_images(self, request):
+        """
+        Upload several images to Cloudinary in parallel (sellers only).
+
+        Form fields: images (repeated, max 5) and optional product id. With a
+        product, the uploaded images are appended to it in the same call.
+        Results are returned in the order the files were sent.
+        """
+        image_files = request.FILES.getlist('images')
+        if not image_files:
+            return Response(
+                {'error': 'No images provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        product = None
+        product_id = request.data.get('product')
+        if product_id:
+            product = Product.objects.filter(pk=product_id).first()
+            if product is None:
+                return Response(
+                    {'error': 'Product not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            if product.owner != request.user:
+                raise PermissionDenied("You can only update your own products")
+            existing_urls = list(product.images.values_list('image_url', flat=True))
+        else:
+            existing_urls = []
+
+        if len(existing_urls) + len(image_files) > MAX_PRODUCT_IMAGES:
+            return Response(
+                {'error': f'A product can have at most {MAX_PRODUCT_IMAGES} images'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-class OrderViewSet(viewsets.ModelViewSet):
+        results = CloudinaryUploadService.upload_many(
+            image_files, folder='greencare/products')
+
+        if any('error' in result for result in results):
+            # The batch fails as a whole, with or without a product, so the
+            # uploads that did succeed would be orphans
+            CloudinaryAssetDeletion.queue(
+                result.get('public_id') for result in results)
+            return Response(
+                {'results': results},
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+
+        response = {'results': results}
+        if product is not None:
+            image_urls = existing_urls + [result['image_url'] for result in results]
+            with transaction.atomic():
+                ProductImageService.sync(product, image_urls)
+                product.image = image_urls[0]
+                product.save(update_fields=['image', 'updated_at'])
+            response['product'] = self.get_serializer(product).data
+
+        return Response(response, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser],
+            permission_classes=[IsAuthenticated, IsSeller])
+    def bulk_import(self, request):
+        """
+        Upsert the seller's products from a CSV or JSONL file (sellers only).
+
+        Form fields: file, file_format=csv|jsonl (defaults to the file extension).
+        Rows are matched on sku; per-row validation errors are reported back.
+        """
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {'error': 'No file provided'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = request.data.get(
+            'file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        try:
+            rows = read_rows(upload, file_format)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_products(request.user, rows)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsSeller])
+    def export(self, request):
+        """Stream the seller's products as CSV or JSONL (?file_format=csv|jsonl)"""
+        file_format = request.query_params.get('file_format', 'csv')
+        content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+        if file_format not in content_types:
+            return Response(
+                {'error': f'Unsupported format: {file_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        response = streaming_response(
+            request,
+            export_products(Product.objects.filter(owner=request.user), file_format),
+            content_type=content_types[file_format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{file_format}"'
+        return response
+
+
+class OrderViewSet(ConditionalGetMixin, ValuesListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing orders
     """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    values_serializer_class = OrderValuesSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
         """
         Filter orders based on user role
         """
         user = self.request.user
-        queryset = Order.objects.all()
+        # The serializer reads product, buyer and seller for every row
+        queryset = Order.objects.select_related('product', 'buyer', 'seller')
 
         # Filter by status if provided
         status_filter = self.request.query_params.get('status', None)
@@ -160,7 +341,36 @@ class OrderViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-        return super().update(request, *args, **kwargs)
+        new_status = request.data.get('status', instance.status)
+        with transaction.atomic():
+            if new_status != instance.status:
+                error = self._transition(request, instance, new_status)
+                if error is not None:
+                    return error
+            return super().update(request, *args, **kwargs)
+
+    def _transition(self, request, order, new_status):
+        """
+        Move one order to ``new_status`` the way ``bulk_status`` does
+        (``Order.TRANSITIONS``, stock released on cancel). Returns a 400
+        response when the order can't make the change, else None.
+        """
+        if new_status not in dict(Order.STATUS_CHOICES):
+            return Response(
+                {'error': 'Invalid status'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        outcome, = OrderStatusService.bulk_transition(request.user, [order.pk], new_status)
+        if not outcome['ok']:
+            return Response(
+                {'error': outcome['error']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            OrderStatusService.save(serializer.instance, serializer.save)
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -171,39 +381,168 @@ class OrderViewSet(viewsets.ModelViewSet):
         if instance.buyer != request.user and request.user.role != 'admin':
             raise PermissionDenied("You can only cancel your own orders")
 
-        if instance.status not in ['pending', 'processing']:
+        # Mark as cancelled instead of deleting. The status read here is part
+        # of the UPDATE's guard, so two concurrent cancels (or a cancel racing
+        # a status change) can't restore stock twice.
+        old_status = instance.status
+        with transaction.atomic():
+            cancelled = old_status in ('pending', 'processing') and Order.objects.filter(
+                pk=instance.pk, status=old_status
+            ).update(status='cancelled', updated_at=timezone.now())
+            if cancelled:
+                # Restore stock when order is cancelled
+                StockService.release(instance.product_id, instance.quantity)
+                SalesRollupService.transition([(instance, old_status, 'cancelled')])
+
+        if not cancelled:
             return Response(
                 {'error': 'Cannot cancel completed or already cancelled orders'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Restore stock when order is cancelled
-        product = instance.product
-        product.stock_quantity += instance.quantity
-        product.save()
-
-        # Mark as cancelled instead of deleting
-        instance.status = 'cancelled'
-        instance.save()
-
         return Response(
             {'message': 'Order cancelled successfully'},
             status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def checkout(self, request):
+        """
+        Place orders for several products in one transaction.
+
+        Body: {"items": [{"product": id, "quantity": n}, ...],
+               "shipping_address": "...", "notes": "..."}
+        Either every line is ordered or none is.
+        """
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save(buyer=request.user)
+        return Response(
+            OrderSerializer(orders, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def _feed(self, request, orders):
+        """Conditional, optionally keyset-paginated list of ``orders``"""
+        return self.conditional_list(
+            request, orders, lambda: self.values_list_response(orders))
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_orders(self, request):
         """Get orders made by the current user"""
         orders = Order.objects.filter(buyer=request.user)
-        serializer = self.get_serializer(orders, many=True)
-        return Response(serializer.data)
+        return self._feed(request, orders)
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def my_sales(self, request):
         """Get sales made to the current user (seller view)"""
         sales = Order.objects.filter(seller=request.user)
-        serializer = self.get_serializer(sales, many=True)
-        return Response(serializer.data)
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            sales = sales.filter(status=status_filter)
+        return self._feed(request, sales)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsSeller])
+    def analytics(self, request):
+        """
+        Sales analytics for the current seller, from the daily rollups.
+
+        Query params: from, to (YYYY-MM-DD, default the last 30 days),
+        product (id) and status.
+        """
+        params = request.query_params
+        try:
+            end = query_date(params, 'to') or timezone.localdate()
+            start = (query_date(params, 'from')
+                     or end - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1))
+        except ValueError:
+            return Response(
+                {'error': 'from and to must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start > end or (end - start).days >= ANALYTICS_MAX_DAYS:
+            return Response(
+                {'error': f'Date range must be ascending and at most {ANALYTICS_MAX_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        order_status = params.get('status')
+        if order_status and order_status not in dict(Order.STATUS_CHOICES):
+            return Response(
+                {'error': 'Invalid status'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        product_id = params.get('product')
+        if product_id is not None and not product_id.isdigit():
+            return Response(
+                {'error': 'product must be an id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(sales_report(
+            request.user, start, end,
+            product_id=int(product_id) if product_id else None,
+            order_status=order_status))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='export')
+    def export(self, request):
+        """
+        Stream orders as CSV or XLSX (?file_format=csv|xlsx).
+
+        Takes the list filters (view=orders|sales, status) plus from/to
+        dates (YYYY-MM-DD, inclusive).
+        """
+        params = request.query_params
+        file_format = params.get('file_format', 'csv')
+        content_types = {
+            'csv': 'text/csv',
+            'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        }
+        if file_format not in content_types:
+            return Response(
+                {'error': f'Unsupported format: {file_format}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            start, end = query_date(params, 'from'), query_date(params, 'to')
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Day bounds as datetimes so the created_at indexes are used
+        orders = self.get_queryset()
+        if start:
+            orders = orders.filter(created_at__gte=_day_start(start))
+        if end:
+            orders = orders.filter(created_at__lt=_day_start(end + timedelta(days=1)))
+
+        response = streaming_response(
+            request,
+            export_orders(orders, file_format),
+            content_type=content_types[file_format]
+        )
+        name = 'sales' if params.get('view') == 'sales' else 'orders'
+        response['Content-Disposition'] = f'attachment; filename="{name}.{file_format}"'
+        return response
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsSeller | IsAdmin])
+    def bulk_status(self, request):
+        """
+        Change the status of many of the seller's orders at once.
+
+        Body: {"ids": [1, 2, ...], "status": "processing"}. Returns one
+        outcome per id; orders that can't make the transition are skipped.
+        """
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = OrderStatusService.bulk_transition(
+            request.user,
+            serializer.validated_data['ids'],
+            serializer.validated_data['status']
+        )
+        return Response({
+            'updated': sum(1 for result in results if result['ok']),
+            'results': results,
+        })
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated], url_path='update_status')
     def update_status(self, request, pk=None):
@@ -214,15 +553,10 @@ class OrderViewSet(viewsets.ModelViewSet):
         if order.seller != request.user and request.user.role != 'admin':
             raise PermissionDenied("Only the seller can update order status")
 
-        new_status = request.data.get('status')
-        if new_status not in dict(Order.STATUS_CHOICES).keys():
-            return Response(
-                {'error': 'Invalid status'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        order.status = new_status
-        order.save()
+        error = self._transition(request, order, request.data.get('status'))
+        if error is not None:
+            return error
 
+        order.refresh_from_db()
         serializer = self.get_serializer(order)
         return Response(serializer.data)
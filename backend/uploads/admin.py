@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import DirectUpload
+
+
+@admin.register(DirectUpload)
+class DirectUploadAdmin(admin.ModelAdmin):
+    list_display = ['public_id', 'user', 'purpose', 'status', 'bytes', 'created_at']
+    list_filter = ['purpose', 'status', 'created_at']
+    search_fields = ['public_id', 'user__email']
+    readonly_fields = ['created_at', 'verified_at']
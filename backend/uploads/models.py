@@ -0,0 +1,36 @@
+from django.db import models
+from authentication.models import CustomUser
+
+
+class DirectUpload(models.Model):
+    """An image the client uploads straight to Cloudinary with signed parameters"""
+    PURPOSE_CHOICES = [
+        ('product', 'Product'),
+        ('plant', 'Plant'),
+        ('predict', 'Disease detection'),
+        ('profile', 'Profile picture'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('verified', 'Verified'),
+        ('rejected', 'Rejected'),
+    ]
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='direct_uploads')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    public_id = models.CharField(max_length=200, unique=True)
+    secure_url = models.URLField(max_length=500, blank=True, null=True)
+    format = models.CharField(max_length=10, blank=True, null=True)
+    bytes = models.PositiveIntegerField(blank=True, null=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default='pending')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    verified_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.public_id} ({self.status})"
@@ -0,0 +1,190 @@
+"""
+Server-side image processing before storage upload.
+
+Images are decoded once, then every size (the full image plus the thumbnail
+variants in ``IMAGE_VARIANTS``) is downscaled, stripped of metadata,
+re-encoded to ``IMAGE_OUTPUT_FORMAT`` and uploaded as one task on a shared,
+bounded thread pool. Variants are stored next to the full image as
+``<folder>/<id>_<variant>``, so their URLs can be derived from the full
+image's URL without storing them.
+"""
+
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import cloudinary.api
+import cloudinary.uploader
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+logger = logging.getLogger(__name__)
+
+FULL_VARIANT = 'full'
+FILE_EXTENSIONS = {'WEBP': 'webp', 'AVIF': 'avif', 'JPEG': 'jpg', 'PNG': 'png'}
+
+_VARIANT_URL = re.compile(
+    r'^(?P<prefix>https?://res\.cloudinary\.com/[^/]+/image/upload/)'
+    r'(?:v\d+/)?(?P<base>.+)_' + FULL_VARIANT + r'\.(?P<ext>\w+)$')
+
+# Shared, bounded pool so concurrent requests can't spawn unbounded threads.
+# Tasks only encode and upload; they never wait on other tasks in this pool.
+_processing_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_MAX_WORKERS,
+    thread_name_prefix='image-processing')
+
+
+def output_format():
+    """Configured output format, falling back to WebP without AVIF support"""
+    image_format = settings.IMAGE_OUTPUT_FORMAT.upper()
+    if image_format == 'AVIF' and not features.check('avif'):
+        return 'WEBP'
+    return image_format
+
+
+def variant_sizes():
+    """``{variant: max dimension}`` including the full image"""
+    return {FULL_VARIANT: settings.IMAGE_MAX_DIMENSION, **settings.IMAGE_VARIANTS}
+
+
+def variant_urls(image_url):
+    """
+    Responsive variant URLs for an image stored by ``upload_image``, or ``{}``
+    for images that weren't processed (legacy uploads, other hosts).
+    """
+    match = _VARIANT_URL.match(image_url or '')
+    if not match:
+        return {}
+    return {
+        name: f"{match['prefix']}{match['base']}_{name}.{match['ext']}"
+        for name in settings.IMAGE_VARIANTS
+    }
+
+
+def with_variants(public_ids):
+    """Expand full-image public_ids with the public_ids of their variants"""
+    suffix = f'_{FULL_VARIANT}'
+    expanded = []
+    for public_id in public_ids:
+        expanded.append(public_id)
+        if public_id and public_id.endswith(suffix):
+            base = public_id[:-len(suffix)]
+            expanded.extend(f'{base}_{name}' for name in settings.IMAGE_VARIANTS)
+    return expanded
+
+
+def _open(fileobj):
+    """Decode an uploaded file, or return None if it isn't a readable image"""
+    try:
+        image = Image.open(fileobj)
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        return None
+    finally:
+        fileobj.seek(0)
+
+    # Bake the EXIF orientation into the pixels before metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _encode(image, max_dimension, image_format, name):
+    """Downscale a private copy of ``image`` and re-encode it without metadata"""
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    # exif/icc_profile/xmp are only written when passed explicitly
+    image.save(buffer, image_format, quality=settings.IMAGE_QUALITY)
+    buffer.seek(0)
+    buffer.name = f'{name}.{FILE_EXTENSIONS.get(image_format, image_format.lower())}'
+    return buffer
+
+
+def _stem(fileobj):
+    name = os.path.basename(getattr(fileobj, 'name', None) or 'image')
+    return os.path.splitext(name)[0]
+
+
+def processed_file(fileobj):
+    """
+    The full-size processed image as a Django ``ContentFile``, for
+    ``ImageField`` storage. Undecodable files are returned unchanged.
+    """
+    image = _open(fileobj)
+    if image is None:
+        return fileobj
+    buffer = _encode(
+        image, settings.IMAGE_MAX_DIMENSION, output_format(), _stem(fileobj))
+    return ContentFile(buffer.getvalue(), name=buffer.name)
+
+
+def _encode_and_upload(image, max_dimension, image_format, name, public_id):
+    buffer = _encode(image, max_dimension, image_format, name)
+    return cloudinary.uploader.upload(
+        buffer,
+        public_id=public_id,
+        resource_type='image',
+        timeout=settings.IMAGE_UPLOAD_TIMEOUT
+    )
+
+
+def upload_image(fileobj, folder):
+    """
+    Process an uploaded image and store it with its variants on Cloudinary.
+
+    Returns ``{'image_url', 'public_id', 'variants': {name: url}}``. Files
+    Pillow can't decode are uploaded as-is (Cloudinary validates them) and
+    get no variants. ``fileobj`` is rewound afterwards so callers can still
+    read it.
+    """
+    image = _open(fileobj)
+    if image is None:
+        upload_result = cloudinary.uploader.upload(
+            fileobj, folder=folder, resource_type='image')
+        fileobj.seek(0)
+        return {
+            'image_url': upload_result['secure_url'],
+            'public_id': upload_result['public_id'],
+            'variants': {},
+        }
+
+    image_format, stem = output_format(), _stem(fileobj)
+    base = f'{folder}/{uuid.uuid4().hex}'
+    futures = {
+        variant: _processing_executor.submit(
+            _encode_and_upload, image.copy(), size, image_format,
+            f'{stem}_{variant}', f'{base}_{variant}')
+        for variant, size in variant_sizes().items()
+    }
+    # Wait for every task before raising so none is left running unobserved
+    errors, results = [], {}
+    for variant, future in futures.items():
+        try:
+            results[variant] = future.result()
+        except Exception as e:
+            errors.append(e)
+    if errors:
+        # Don't leave a partial set of variants behind
+        uploaded = [result['public_id'] for result in results.values()]
+        if uploaded:
+            try:
+                cloudinary.api.delete_resources(uploaded)
+            except Exception as e:
+                logger.warning("Failed to remove partial image variants: %s", e)
+        raise errors[0]
+
+    full = results.pop(FULL_VARIANT)
+    return {
+        'image_url': full['secure_url'],
+        'public_id': full['public_id'],
+        'variants': {
+            variant: result['secure_url'] for variant, result in results.items()},
+    }
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+from .models import DirectUpload
+
+
+class SignUploadSerializer(serializers.Serializer):
+    purpose = serializers.ChoiceField(choices=DirectUpload.PURPOSE_CHOICES)
+
+
+class VerifyUploadSerializer(serializers.Serializer):
+    public_id = serializers.CharField()
+    version = serializers.CharField()
+    signature = serializers.CharField()
+
+
+class DirectUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DirectUpload
+        fields = ['id', 'purpose', 'public_id', 'secure_url', 'format',
+                  'bytes', 'status', 'created_at', 'verified_at']
+        read_only_fields = fields
@@ -0,0 +1,135 @@
+import re
+import time
+import uuid
+from datetime import timedelta
+
+import cloudinary
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+from django.conf import settings
+from django.utils import timezone
+
+from .models import DirectUpload
+
+UPLOAD_FOLDERS = {
+    'product': 'greencare/products',
+    'plant': 'greencare/plants',
+    'predict': 'greencare/predict',
+    'profile': 'greencare/profiles',
+}
+ALLOWED_FORMATS = ['jpg', 'jpeg', 'png', 'webp']
+
+_CLOUDINARY_VERSION = re.compile(r'^v\d+$')
+
+
+def cloudinary_public_id(url):
+    """
+    Extract the public_id from a Cloudinary delivery URL, or None for other hosts.
+
+    https://res.cloudinary.com/<cloud>/image/upload/v17/greencare/products/abc.jpg
+    -> greencare/products/abc
+    """
+    if not url or 'res.cloudinary.com/' not in url or '/upload/' not in url:
+        return None
+    segments = url.split('/upload/', 1)[1].split('?', 1)[0].split('/')
+    # Anything before the version segment is a transformation
+    for index, segment in enumerate(segments):
+        if _CLOUDINARY_VERSION.match(segment):
+            segments = segments[index + 1:]
+            break
+    path = '/'.join(segments)
+    return path.rsplit('.', 1)[0] if '.' in segments[-1] else path
+
+
+class UploadVerificationError(Exception):
+    """Raised when a direct upload can't be accepted"""
+
+
+class DirectUploadService:
+    """
+    Signed direct-to-Cloudinary uploads.
+
+    ``sign`` hands the client short-lived upload parameters so image bytes
+    never pass through a Django worker; ``verify`` checks Cloudinary's
+    response signature and the stored asset before recording it.
+    """
+
+    @staticmethod
+    def sign(user, purpose):
+        folder = UPLOAD_FOLDERS[purpose]
+        upload = DirectUpload.objects.create(
+            user=user,
+            purpose=purpose,
+            public_id=f'{folder}/{uuid.uuid4().hex}',
+            expires_at=timezone.now() + timedelta(seconds=settings.DIRECT_UPLOAD_TTL)
+        )
+
+        config = cloudinary.config()
+        # Only signed parameters are binding; the client can't change them
+        params = {
+            'timestamp': int(time.time()),
+            'public_id': upload.public_id,
+            'allowed_formats': ','.join(ALLOWED_FORMATS),
+        }
+        params['signature'] = cloudinary.utils.api_sign_request(
+            params, config.api_secret)
+        params['api_key'] = config.api_key
+
+        return {
+            'upload_id': upload.id,
+            'upload_url': cloudinary.utils.cloudinary_api_url(
+                'upload', resource_type='image'),
+            'folder': folder,
+            'allowed_formats': ALLOWED_FORMATS,
+            'max_file_size': settings.DIRECT_UPLOAD_MAX_BYTES,
+            'expires_at': upload.expires_at,
+            'fields': params,
+        }
+
+    @staticmethod
+    def _reject(upload, message):
+        upload.status = 'rejected'
+        upload.save(update_fields=['status'])
+        raise UploadVerificationError(message)
+
+    @staticmethod
+    def verify(upload, public_id, version, signature):
+        """Record a finished upload from the fields of Cloudinary's upload response"""
+        if upload.status != 'pending':
+            raise UploadVerificationError('Upload has already been processed')
+        if public_id != upload.public_id:
+            raise UploadVerificationError('public_id does not match this upload')
+        if timezone.now() > upload.expires_at:
+            # Nothing will record the asset now, so don't leave it in storage
+            cloudinary.uploader.destroy(public_id, invalidate=True)
+            DirectUploadService._reject(upload, 'Upload signature has expired')
+        if not signature or not cloudinary.utils.verify_api_response_signature(
+                public_id, version, signature):
+            raise UploadVerificationError('Invalid Cloudinary signature')
+
+        # Size isn't part of the upload signature, so check the stored asset
+        try:
+            resource = cloudinary.api.resource(public_id)
+        except cloudinary.exceptions.NotFound:
+            DirectUploadService._reject(upload, 'Uploaded image was not found')
+        except Exception as e:
+            # Left pending, so the client can verify again
+            raise UploadVerificationError(f'Could not check the uploaded image: {e}') from e
+        if (resource.get('bytes', 0) > settings.DIRECT_UPLOAD_MAX_BYTES
+                or resource.get('format') not in ALLOWED_FORMATS):
+            cloudinary.uploader.destroy(public_id, invalidate=True)
+            DirectUploadService._reject(
+                upload,
+                f'Image must be one of {", ".join(ALLOWED_FORMATS)} and at most '
+                f'{settings.DIRECT_UPLOAD_MAX_BYTES} bytes')
+
+        upload.secure_url = resource['secure_url']
+        upload.format = resource['format']
+        upload.bytes = resource['bytes']
+        upload.status = 'verified'
+        upload.verified_at = timezone.now()
+        upload.save(update_fields=[
+            'secure_url', 'format', 'bytes', 'status', 'verified_at'])
+        return upload
@@ -0,0 +1 @@
+# Uploads tests package
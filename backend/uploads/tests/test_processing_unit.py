@@ -0,0 +1,142 @@
+from io import BytesIO
+from unittest.mock import patch
+
+import pytest
+from PIL import Image as PILImage
+
+from uploads.processing import (
+    processed_file, upload_image, variant_urls, with_variants)
+
+CLOUD = "https://res.cloudinary.com/demo/image/upload"
+
+
+def _photo(size=(2400, 1200), orientation=None, name="leaf.jpg"):
+    image = PILImage.new("RGB", size, color="green")
+    exif = PILImage.Exif()
+    exif[0x010F] = "Camera Maker"
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif.tobytes())
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+class _Recorder:
+    """Stands in for cloudinary.uploader.upload and keeps what was sent"""
+
+    def __init__(self):
+        self.uploads = {}
+
+    def __call__(self, file, **kwargs):
+        public_id = kwargs.get("public_id") or f"{kwargs['folder']}/raw"
+        self.uploads[public_id] = file.read()
+        return {
+            "public_id": public_id,
+            "secure_url": f"{CLOUD}/v1/{public_id}.webp",
+        }
+
+
+# ------------------------------------------------------
+# UPLOAD PIPELINE
+# ------------------------------------------------------
+
+def test_upload_image_downscales_and_creates_variants(settings):
+    recorder = _Recorder()
+    with patch("cloudinary.uploader.upload", side_effect=recorder):
+        result = upload_image(_photo(), folder="greencare/plants")
+
+    assert result["public_id"].startswith("greencare/plants/")
+    assert result["public_id"].endswith("_full")
+    base = result["public_id"][:-len("_full")]
+    assert set(recorder.uploads) == {
+        f"{base}_full", f"{base}_thumb", f"{base}_medium"}
+    assert set(result["variants"]) == set(settings.IMAGE_VARIANTS)
+
+    for variant, limit in (("full", settings.IMAGE_MAX_DIMENSION),
+                           *settings.IMAGE_VARIANTS.items()):
+        stored = PILImage.open(BytesIO(recorder.uploads[f"{base}_{variant}"]))
+        assert stored.format == "WEBP"
+        assert max(stored.size) == limit
+        assert not stored.getexif()
+
+
+def test_upload_image_applies_exif_orientation():
+    recorder = _Recorder()
+    with patch("cloudinary.uploader.upload", side_effect=recorder):
+        result = upload_image(
+            _photo(size=(400, 200), orientation=6), folder="greencare/plants")
+
+    stored = PILImage.open(BytesIO(recorder.uploads[result["public_id"]]))
+    assert stored.size == (200, 400)
+
+
+def test_upload_image_passes_through_undecodable_files():
+    recorder = _Recorder()
+    data = BytesIO(b"not an image")
+    data.name = "file.bin"
+    with patch("cloudinary.uploader.upload", side_effect=recorder):
+        result = upload_image(data, folder="greencare/plants")
+
+    assert result["public_id"] == "greencare/plants/raw"
+    assert result["variants"] == {}
+    assert recorder.uploads["greencare/plants/raw"] == b"not an image"
+
+
+def test_upload_image_removes_partial_variants_on_failure():
+    def flaky(file, **kwargs):
+        if kwargs["public_id"].endswith("_thumb"):
+            raise Exception("boom")
+        return {"public_id": kwargs["public_id"], "secure_url": "x"}
+
+    with patch("cloudinary.uploader.upload", side_effect=flaky), \
+            patch("cloudinary.api.delete_resources") as delete:
+        with pytest.raises(Exception, match="boom"):
+            upload_image(_photo(), folder="greencare/products")
+
+    deleted = delete.call_args[0][0]
+    assert sorted(public_id.rsplit("_", 1)[1] for public_id in deleted) == [
+        "full", "medium"]
+
+
+def test_upload_image_rewinds_file_for_callers():
+    photo = _photo(size=(64, 64))
+    with patch("cloudinary.uploader.upload", side_effect=_Recorder()):
+        upload_image(photo, folder="greencare/predict")
+
+    assert PILImage.open(photo).size == (64, 64)
+
+
+# ------------------------------------------------------
+# HELPERS
+# ------------------------------------------------------
+
+def test_variant_urls_derive_from_full_url():
+    urls = variant_urls(f"{CLOUD}/v17/greencare/plants/abc_full.webp")
+
+    assert urls == {
+        "thumb": f"{CLOUD}/greencare/plants/abc_thumb.webp",
+        "medium": f"{CLOUD}/greencare/plants/abc_medium.webp",
+    }
+
+
+@pytest.mark.parametrize("url", [
+    None, "", f"{CLOUD}/v17/greencare/plants/legacy.jpg",
+    "https://example.com/abc_full.webp"])
+def test_variant_urls_empty_for_unprocessed_images(url):
+    assert variant_urls(url) == {}
+
+
+def test_with_variants_expands_full_images_only():
+    assert with_variants(["a/x_full", "a/legacy"]) == [
+        "a/x_full", "a/x_thumb", "a/x_medium", "a/legacy"]
+
+
+def test_processed_file_returns_reencoded_content_file(settings):
+    result = processed_file(_photo(name="me.jpg"))
+
+    assert result.name == "me.webp"
+    stored = PILImage.open(BytesIO(result.read()))
+    assert max(stored.size) == settings.IMAGE_MAX_DIMENSION
+    assert not stored.getexif()
@@ -0,0 +1,308 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+import cloudinary
+import cloudinary.utils
+import pytest
+import requests
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.test import APIClient
+
+from authentication.models import CustomUser
+from uploads.models import DirectUpload
+
+pytestmark = pytest.mark.django_db
+
+CLOUD_NAME = "test-cloud"
+API_KEY = "test-key"
+API_SECRET = "test-secret"
+
+
+# ------------------------------------------------------
+# Local stand-in for the Cloudinary upload/admin API
+# ------------------------------------------------------
+
+class FakeCloudinaryHandler(BaseHTTPRequestHandler):
+    resources = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status_code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _form(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        content_type = self.headers["Content-Type"]
+        if not content_type.startswith("multipart/"):
+            from urllib.parse import parse_qsl
+            return dict(parse_qsl(body.decode())), {}
+        message = BytesParser(policy=default_policy).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        fields, files = {}, {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                files[name] = part.get_payload(decode=True)
+            else:
+                fields[name] = part.get_content().strip()
+        return fields, files
+
+    def do_POST(self):
+        fields, files = self._form()
+        if self.path.endswith("/image/destroy"):
+            self.resources.pop(fields.get("public_id"), None)
+            return self._reply(200, {"result": "ok"})
+        if not self.path.endswith("/image/upload"):
+            return self._reply(404, {"error": {"message": "not found"}})
+
+        signature = fields.pop("signature", None)
+        fields.pop("api_key", None)
+        if signature != cloudinary.utils.api_sign_request(fields, API_SECRET):
+            return self._reply(401, {"error": {"message": "Invalid Signature"}})
+        if abs(time.time() - int(fields["timestamp"])) > 3600:
+            return self._reply(400, {"error": {"message": "Stale request"}})
+
+        data = files["file"]
+        image_format = PILImage.open(BytesIO(data)).format.lower()
+        image_format = "jpg" if image_format == "jpeg" else image_format
+        if image_format not in fields["allowed_formats"].split(","):
+            return self._reply(400, {"error": {"message": "Image format not allowed"}})
+
+        public_id = fields["public_id"]
+        version = str(int(time.time()))
+        resource = {
+            "public_id": public_id,
+            "version": version,
+            "format": image_format,
+            "bytes": len(data),
+            "secure_url": f"https://res.cloudinary.com/{CLOUD_NAME}/image/upload/"
+                          f"v{version}/{public_id}.{image_format}",
+        }
+        self.resources[public_id] = resource
+        self._reply(200, dict(resource, signature=cloudinary.utils.api_sign_request(
+            {"public_id": public_id, "version": version}, API_SECRET,
+            signature_version=1)))
+
+    def do_GET(self):
+        prefix = f"/v1_1/{CLOUD_NAME}/resources/image/upload/"
+        path = self.path.split("?", 1)[0]
+        resource = self.resources.get(path[len(prefix):]) if path.startswith(prefix) else None
+        if resource is None:
+            return self._reply(404, {"error": {"message": "Resource not found"}})
+        self._reply(200, resource)
+
+
+@pytest.fixture
+def fake_cloudinary():
+    FakeCloudinaryHandler.resources = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCloudinaryHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    config = cloudinary.config()
+    saved = {key: getattr(config, key, None)
+             for key in ("cloud_name", "api_key", "api_secret", "upload_prefix")}
+    cloudinary.config(
+        cloud_name=CLOUD_NAME, api_key=API_KEY, api_secret=API_SECRET,
+        upload_prefix=f"http://127.0.0.1:{server.server_address[1]}")
+    yield FakeCloudinaryHandler
+    for key, value in saved.items():
+        setattr(config, key, value)
+    server.shutdown()
+
+
+# ------------------------------------------------------
+# Fixtures
+# ------------------------------------------------------
+
+@pytest.fixture
+def client():
+    return APIClient()
+
+
+@pytest.fixture
+def user(db):
+    return CustomUser.objects.create_user(
+        email="owner@test.com", password="password123", role="plant_owner")
+
+
+@pytest.fixture
+def seller(db):
+    return CustomUser.objects.create_user(
+        email="seller@test.com", password="password123", role="seller")
+
+
+def _jpeg_bytes(size=(32, 32)):
+    buffer = BytesIO()
+    PILImage.new("RGB", size, color="green").save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def _upload_to_cloudinary(signed, data, **overrides):
+    fields = dict(signed["fields"], **overrides)
+    return requests.post(
+        signed["upload_url"], data=fields,
+        files={"file": ("leaf.jpg", data, "image/jpeg")}, timeout=5)
+
+
+def _sign(client, purpose="plant"):
+    response = client.post(reverse("upload-sign"), {"purpose": purpose}, format="json")
+    assert response.status_code == 201
+    return response.json()
+
+
+# ------------------------------------------------------
+# SIGN + VERIFY
+# ------------------------------------------------------
+
+def test_direct_upload_flow(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+
+    assert signed["folder"] == "greencare/plants"
+    assert signed["fields"]["public_id"].startswith("greencare/plants/")
+
+    uploaded = _upload_to_cloudinary(signed, _jpeg_bytes())
+    assert uploaded.status_code == 200
+    result = uploaded.json()
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {key: result[key] for key in ("public_id", "version", "signature")},
+        format="json")
+
+    assert response.status_code == 200
+    upload = DirectUpload.objects.get(pk=signed["upload_id"])
+    assert upload.status == "verified"
+    assert upload.public_id == result["public_id"]
+    assert upload.secure_url == result["secure_url"]
+    assert upload.format == "jpg"
+
+
+def test_signed_fields_cannot_be_tampered(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+
+    uploaded = _upload_to_cloudinary(
+        signed, _jpeg_bytes(), public_id="greencare/products/hijack")
+
+    assert uploaded.status_code == 401
+
+
+def test_verify_rejects_forged_signature(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+    result = _upload_to_cloudinary(signed, _jpeg_bytes()).json()
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {"public_id": result["public_id"], "version": result["version"],
+         "signature": "0" * 40},
+        format="json")
+
+    assert response.status_code == 400
+    assert DirectUpload.objects.get(pk=signed["upload_id"]).status == "pending"
+
+
+def test_verify_rejects_and_destroys_oversized_upload(client, user, fake_cloudinary, settings):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+    data = _jpeg_bytes(size=(256, 256))
+    settings.DIRECT_UPLOAD_MAX_BYTES = len(data) - 1
+    result = _upload_to_cloudinary(signed, data).json()
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {key: result[key] for key in ("public_id", "version", "signature")},
+        format="json")
+
+    assert response.status_code == 400
+    assert DirectUpload.objects.get(pk=signed["upload_id"]).status == "rejected"
+    assert result["public_id"] not in fake_cloudinary.resources
+
+
+def test_verify_rejects_expired_upload(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+    result = _upload_to_cloudinary(signed, _jpeg_bytes()).json()
+    DirectUpload.objects.filter(pk=signed["upload_id"]).update(
+        expires_at=timezone.now() - timedelta(seconds=1))
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {key: result[key] for key in ("public_id", "version", "signature")},
+        format="json")
+
+    assert response.status_code == 400
+    assert DirectUpload.objects.get(pk=signed["upload_id"]).status == "rejected"
+    assert result["public_id"] not in fake_cloudinary.resources
+
+
+def test_verify_rejects_missing_asset(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+    result = _upload_to_cloudinary(signed, _jpeg_bytes()).json()
+    fake_cloudinary.resources.clear()
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {key: result[key] for key in ("public_id", "version", "signature")},
+        format="json")
+
+    assert response.status_code == 400
+    assert DirectUpload.objects.get(pk=signed["upload_id"]).status == "rejected"
+
+
+def test_verify_keeps_upload_pending_when_cloudinary_is_unreachable(client, user, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+    result = _upload_to_cloudinary(signed, _jpeg_bytes()).json()
+    cloudinary.config(upload_prefix="http://127.0.0.1:1")
+
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {key: result[key] for key in ("public_id", "version", "signature")},
+        format="json")
+
+    assert response.status_code == 400
+    assert DirectUpload.objects.get(pk=signed["upload_id"]).status == "pending"
+
+
+def test_verify_other_users_upload_is_404(client, user, seller, fake_cloudinary):
+    client.force_authenticate(user=user)
+    signed = _sign(client)
+
+    client.force_authenticate(user=seller)
+    response = client.post(
+        reverse("upload-verify", args=[signed["upload_id"]]),
+        {"public_id": "x", "version": "1", "signature": "y"}, format="json")
+
+    assert response.status_code == 404
+
+
+def test_only_sellers_sign_product_uploads(client, user, seller, fake_cloudinary):
+    client.force_authenticate(user=user)
+    response = client.post(reverse("upload-sign"), {"purpose": "product"}, format="json")
+    assert response.status_code == 403
+
+    client.force_authenticate(user=seller)
+    assert _sign(client, purpose="product")["folder"] == "greencare/products"
+
+
+def test_sign_requires_authentication(client):
+    response = client.post(reverse("upload-sign"), {"purpose": "plant"}, format="json")
+    assert response.status_code == 401
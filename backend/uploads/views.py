@@ -0,0 +1,57 @@
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import DirectUpload
+from .serializers import (
+    DirectUploadSerializer, SignUploadSerializer, VerifyUploadSerializer)
+from .services import DirectUploadService, UploadVerificationError
+
+
+class DirectUploadViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    # -----------------------------
+    # POST /api/uploads/sign/
+    # -----------------------------
+    @action(detail=False, methods=["post"])
+    def sign(self, request):
+        """
+        Issue short-lived signed parameters for a direct Cloudinary upload.
+
+        The client POSTs the file together with ``fields`` to ``upload_url``,
+        then calls verify/ with the public_id, version and signature from
+        Cloudinary's response.
+        """
+        serializer = SignUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        purpose = serializer.validated_data['purpose']
+
+        # Only sellers can upload product images
+        if purpose == 'product' and request.user.role != 'seller':
+            raise PermissionDenied("Only sellers can upload product images")
+
+        return Response(
+            DirectUploadService.sign(request.user, purpose),
+            status=status.HTTP_201_CREATED
+        )
+
+    # -----------------------------
+    # POST /api/uploads/<id>/verify/
+    # -----------------------------
+    @action(detail=True, methods=["post"])
+    def verify(self, request, pk=None):
+        """Verify a finished direct upload and record its public_id"""
+        upload = get_object_or_404(DirectUpload, pk=pk, user=request.user)
+        serializer = VerifyUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            upload = DirectUploadService.verify(upload, **serializer.validated_data)
+        except UploadVerificationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(DirectUploadSerializer(upload).data, status=status.HTTP_200_OK)